@@ -0,0 +1,108 @@
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+from app.models import Log, User
+from app.logger import logger
+
+# Сбрасываем буфер в logs, когда набралось AUDIT_BATCH_SIZE событий
+# или прошло AUDIT_FLUSH_INTERVAL секунд с последнего сброса
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+# Сверх этого события отбрасываются, чтобы не раздувать память при медленной БД
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "10000"))
+
+
+class AuditSink:
+    """Буферизует события действий пользователей и пишет их в logs пачками.
+
+    Вместо INSERT на каждое действие — один multi-row INSERT на батч,
+    из фонового потока, вне транзакции запроса.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL, max_buffer: int = AUDIT_MAX_BUFFER):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def record(self, action: str, user_id: int = None, details: str = None):
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(
+                {"user_id": user_id, "action": action, "details": details, "created_at": datetime.now()}
+            )
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            for start in range(0, len(rows), self.batch_size):
+                self._write(rows[start:start + self.batch_size])
+
+    def _write(self, rows: list):
+        try:
+            with self.session_factory() as db:
+                try:
+                    db.execute(insert(Log), rows)
+                    db.commit()
+                except IntegrityError:
+                    # Пользователя успели удалить, пока событие лежало в буфере
+                    db.rollback()
+                    ids = {r["user_id"] for r in rows if r["user_id"] is not None}
+                    alive = set(db.scalars(select(User.user_id).where(User.user_id.in_(ids))))
+                    rows = [{**r, "user_id": r["user_id"] if r["user_id"] in alive else None} for r in rows]
+                    db.execute(insert(Log), rows)
+                    db.commit()
+            self.written += len(rows)
+        except Exception:
+            self.failed += len(rows)
+            logger.exception("Audit flush failed, %s events lost", len(rows))
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buffer), "written": self.written,
+                "dropped": self.dropped, "failed": self.failed}
+
+
+audit = AuditSink()
+
+
+def audit_event(action: str, user_id: int = None, details: str = None):
+    audit.record(action, user_id, details)
@@ -0,0 +1,88 @@
+import os
+import threading
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, get_db
+from app.logger import logger
+import app.crud.sessions as sessions_crud
+import app.crud.user as users_crud
+import app.crud.roles as roles_crud
+
+# Период фоновой очистки просроченных сессий (секунды) и размер пачки DELETE
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "1000"))
+
+ADMIN_ROLE = "admin"
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer),
+                     db: Session = Depends(get_db)):
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    user_id = sessions_crud.resolve_token(db, credentials.credentials)
+    user = users_crud.get_user(db, user_id) if user_id else None
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+
+def is_admin(db: Session, user) -> bool:
+    role = roles_crud.get_role(db, user.role_id)
+    return bool(role) and role.name == ADMIN_ROLE
+
+
+def require_admin(user=Depends(get_current_user), db: Session = Depends(get_db)):
+    if not is_admin(db, user):
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return user
+
+
+def require_owner_or_admin(user_id: int, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """Маршруты /{user_id}: менять данные может сам пользователь или администратор."""
+    if user.user_id != user_id and not is_admin(db, user):
+        raise HTTPException(status_code=403, detail="Not allowed to modify another user")
+    return user
+
+
+class SessionSweeper:
+    """Фоновый поток, периодически удаляющий просроченные сессии."""
+
+    def __init__(self, session_factory=SessionLocal, interval: float = SESSION_SWEEP_INTERVAL,
+                 batch_size: int = SESSION_SWEEP_BATCH):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> int:
+        try:
+            with self.session_factory() as db:
+                return sessions_crud.delete_expired_sessions(db, self.batch_size)
+        except Exception:
+            logger.exception("Session sweep failed")
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+sweeper = SessionSweeper()
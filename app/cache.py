@@ -0,0 +1,198 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory | redis | none
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "10000"))
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheBackend:
+    """Интерфейс кэша: значения — простые dict/list, ключи — строки."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float = None):
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    def get(self, key: str):
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value, ttl: float = None):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+
+class TTLCache(CacheBackend):
+    """In-process кэш с TTL и вытеснением по LRU."""
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                    self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return item[0]
+
+    def set(self, key: str, value, ttl: float = None):
+        expires = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.stats.invalidations += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache(CacheBackend):
+    """Кэш поверх общего хранилища (Redis и т.п.), разделяемого воркерами.
+
+    client должен уметь get(key), set(key, value, px=milliseconds) и delete(*keys)
+    с bytes-значениями — как redis.Redis.
+    """
+
+    def __init__(self, client, ttl: float = CACHE_TTL, prefix: str = "nra:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key: str, value, ttl: float = None):
+        # Миллисекунды: ex=int(...) обнулил бы TTL меньше секунды
+        self.client.set(self.prefix + key, pickle.dumps(value), px=max(1, int((ttl or self.ttl) * 1000)))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*(self.prefix + k for k in keys))
+            self.stats.invalidations += len(keys)
+
+
+class InMemorySharedStore:
+    """Фейковый клиент общего хранилища для тестов (подмножество API redis)."""
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None or (item[1] is not None and item[1] < time.monotonic()):
+            self._data.pop(key, None)
+            return None
+        return item[0]
+
+    def set(self, key, value, px=None):
+        self._data[key] = (value, time.monotonic() + px / 1000 if px else None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+
+def make_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    if backend == "memory":
+        return TTLCache()
+    if backend == "redis":
+        # Общий для всех воркеров; redis нужен только с этим бэкендом
+        import redis
+        return SharedCache(redis.Redis.from_url(CACHE_REDIS_URL))
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend!r} (expected memory, redis or none)")
+
+
+cache = make_cache()
+
+
+def cache_get(key: str):
+    return cache.get(key)
+
+
+def cache_set(key: str, value, ttl: float = None):
+    cache.set(key, value, ttl)
+
+
+def invalidate(*keys: str):
+    cache.delete(*keys)
+
+
+def row_to_dict(obj, exclude=()) -> dict:
+    return {
+        attr.key: getattr(obj, attr.key)
+        for attr in sa_inspect(obj).mapper.column_attrs
+        if attr.key not in exclude
+    }
+
+
+def detached_from_dict(model, data: dict):
+    """Строит detached-объект из снимка кэша, не обращаясь к БД.
+
+    Его можно прикрепить к сессии через merge(obj, load=False); колонки,
+    которых нет в снимке, догрузятся лениво при первом обращении.
+    """
+    obj = model(**data)
+    make_transient_to_detached(obj)
+    return obj
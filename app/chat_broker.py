@@ -0,0 +1,58 @@
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+
+# Сколько сообщений может накопиться у одного подписчика, прежде чем мы
+# начнём их отбрасывать (клиент догонит пропущенное через ?since_id=)
+CHAT_SUBSCRIBER_QUEUE = int(os.getenv("CHAT_SUBSCRIBER_QUEUE", "100"))
+
+
+class ChatBroker:
+    """In-process pub/sub по chat session_id.
+
+    publish() можно вызывать из любого потока (sync-обработчики работают в
+    threadpool): доставка в очередь подписчика идёт через его event loop.
+    Подписчики одного воркера получают сообщения, отправленные через этот же
+    воркер; для нескольких воркеров нужен общий брокер с тем же интерфейсом.
+    """
+
+    def __init__(self, queue_size: int = CHAT_SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self, session_id: int):
+        queue = asyncio.Queue(self.queue_size)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(entry)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(session_id, set())
+                subscribers.discard(entry)
+                if not subscribers:
+                    self._subscribers.pop(session_id, None)
+
+    def _deliver(self, queue: asyncio.Queue, payload):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def publish(self, session_id: int, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, payload)
+        return len(subscribers)
+
+    def subscriber_count(self, session_id: int) -> int:
+        return len(self._subscribers.get(session_id, ()))
+
+
+broker = ChatBroker()
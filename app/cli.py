@@ -0,0 +1,56 @@
+"""Консольные команды бэкенда.
+
+    python -m app.cli import-users partners.csv      # колонки email,password,role_id
+    python -m app.cli import-users partners.ndjson
+"""
+import argparse
+import csv
+import json
+import sys
+from pydantic import ValidationError
+from app.database import SessionLocal
+from app.schemas import UserCreate
+from app.crud.user import bulk_create_users, BULK_BATCH_SIZE
+
+
+def read_users(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = list(csv.DictReader(f))
+    return [UserCreate(**record) for record in records]
+
+
+def import_users(args):
+    try:
+        users = read_users(args.file)
+    except ValidationError as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        return 1
+    with SessionLocal() as db:
+        report = bulk_create_users(db, users, batch_size=args.batch_size)
+    print(f"created={report['created']} duplicates={report['duplicates']} invalid_roles={report['invalid_roles']}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for row in report["results"]:
+                f.write(json.dumps(row) + "\n")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import-users", help="bulk import users from CSV or NDJSON")
+    p.add_argument("file")
+    p.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    p.add_argument("--report", help="write per-row results as NDJSON to this file")
+    p.set_defaults(handler=import_users)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Условные запросы: ETag из версии строки, If-None-Match -> 304, If-Match -> 412.
+
+ETag — "<первичный ключ>-<version>": version растёт на 1 при каждом изменении
+через API (crud.writes.versioned_update), поэтому тег сильный. Первичный ключ
+в теге отличает запись, пересозданную после удаления (версия снова 1): ключи
+AUTO_INCREMENT не переиспользуются. У другого представления того же ресурса
+(?include=role) свой тег: "<ключ>-<version>-<представление>", иначе клиент
+получил бы 304 на тело, которого у него нет.
+Версию при If-None-Match читаем из БД (SELECT version по ключу), а не из
+кэша процесса: кэш другого воркера не знает о чужих изменениях.
+Last-Modified не отдаём: у секундной метки времени две записи за секунду
+неразличимы, а If-None-Match всё равно важнее If-Modified-Since (RFC 9110).
+"""
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Клиент кэширует у себя, но перед использованием переспрашивает; общим кэшам — нельзя
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(row_id: int, version: int, representation: str = None) -> str:
+    if representation:
+        return f'"{row_id}-{version}-{representation}"'
+    return f'"{row_id}-{version}"'
+
+
+def _tags(header: str) -> list:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _parse(tag: str):
+    """'"12-3"' -> (12, 3); слабый, чужой тег или тег другого представления -> None."""
+    if len(tag) < 2 or tag[0] != '"' or tag[-1] != '"':
+        return None
+    row_id, _, version = tag[1:-1].partition("-")
+    if not row_id.isdigit() or not version.isdigit():
+        return None
+    return int(row_id), int(version)
+
+
+def revalidating(request: Request) -> bool:
+    """Клиент прислал If-None-Match — стоит сверить ETag до загрузки строки."""
+    return "if-none-match" in request.headers
+
+
+def not_modified(request: Request, etag: str):
+    """-> ответ 304, если ETag совпал с If-None-Match (слабое сравнение), иначе None."""
+    header = request.headers.get("if-none-match")
+    if header is None or etag is None:
+        return None
+    tags = _tags(header)
+    if "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def if_match(request: Request):
+    """If-Match -> [(первичный ключ, версия)] для versioned_update; None — без условия.
+
+    "*" — любая версия существующей записи, то же, что без заголовка.
+    Сравнение сильное: W/-теги и чужие теги не подходят ни к одной версии.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return None
+    tags = _tags(header)
+    if "*" in tags:
+        return None
+    return [parsed for parsed in map(_parse, tags) if parsed is not None]
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1 @@
+from app.crud.user import UserRepository, AsyncUserRepository
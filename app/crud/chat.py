@@ -0,0 +1,47 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models import ChatSession, ChatMessage
+from app.schemas import ChatMessageCreate
+from app.logger import logger
+from app.audit import audit_event
+from app.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+
+def create_chat_session(db: Session, user_id: int):
+    chat = ChatSession(user_id=user_id)
+    db.add(chat)
+    db.commit()
+    db.refresh(chat)
+    logger.info("Chat session started: id=%s, user=%s", chat.session_id, user_id)
+    audit_event("chat_session_started", user_id, f"chat_session_id={chat.session_id}")
+    return chat
+
+def get_chat_session(db: Session, session_id: int):
+    return db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+
+def create_message(db: Session, message: ChatMessageCreate, user_id: int):
+    db_message = ChatMessage(session_id=message.session_id, user_id=user_id, message=message.message)
+    db.add(db_message)
+    db.commit()
+    db.refresh(db_message)
+    logger.info("Chat message sent: id=%s, session=%s", db_message.message_id, db_message.session_id)
+    return db_message
+
+def _message_key(message: ChatMessage):
+    return [message.sent_at.isoformat(), message.message_id]
+
+def get_messages(db: Session, session_id: int, after: list = None, since_id: int = None,
+                 limit: int = DEFAULT_PAGE_SIZE):
+    """Сообщения сессии по времени отправки.
+
+    after — ключ курсора [sent_at, message_id] для постраничного чтения,
+    since_id — вернуть только сообщения новее указанного (догонка после
+    переподключения). Оба варианта идут по индексу (session_id, sent_at, message_id).
+    """
+    query = db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+    if since_id is not None:
+        query = query.filter(ChatMessage.message_id > since_id)
+    if after is not None:
+        after = (datetime.fromisoformat(after[0]), after[1])
+    columns = (ChatMessage.sent_at, ChatMessage.message_id)
+    messages = keyset(query, columns, after, limit).all()
+    return make_page(messages, limit, key=_message_key)
@@ -0,0 +1,75 @@
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import Favorite
+from app.logger import logger
+from app.audit import audit_event
+from app.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from app.cache import cache_get, cache_set, invalidate
+
+# Сколько известных ответов "в избранном / нет" держим на пользователя
+FAVORITES_CACHE_MAX = 5000
+
+def _membership_key(user_id: int) -> str:
+    return f"favorites:{user_id}"
+
+def get_favorite(db: Session, user_id: int, recipe_hash: str):
+    return db.query(Favorite).filter(Favorite.user_id == user_id, Favorite.recipe_hash == recipe_hash).first()
+
+def add_favorite(db: Session, user_id: int, recipe_hash: str):
+    favorite = get_favorite(db, user_id, recipe_hash)
+    if favorite:
+        return favorite
+    favorite = Favorite(user_id=user_id, recipe_hash=recipe_hash)
+    db.add(favorite)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Параллельный запрос успел добавить тот же рецепт
+        db.rollback()
+        return get_favorite(db, user_id, recipe_hash)
+    db.refresh(favorite)
+    invalidate(_membership_key(user_id))
+    logger.info("Favorite added: user=%s, recipe=%s", user_id, recipe_hash)
+    audit_event("favorite_added", user_id, f"recipe_hash={recipe_hash}")
+    return favorite
+
+def remove_favorite(db: Session, user_id: int, recipe_hash: str):
+    favorite = get_favorite(db, user_id, recipe_hash)
+    if not favorite:
+        logger.warning("Favorite remove failed: user=%s, recipe=%s", user_id, recipe_hash)
+        return None
+    db.delete(favorite)
+    db.commit()
+    invalidate(_membership_key(user_id))
+    logger.info("Favorite removed: user=%s, recipe=%s", user_id, recipe_hash)
+    audit_event("favorite_removed", user_id, f"recipe_hash={recipe_hash}")
+    return favorite
+
+def get_favorites(db: Session, user_id: int, after: list = None, limit: int = DEFAULT_PAGE_SIZE):
+    query = db.query(Favorite).filter(Favorite.user_id == user_id)
+    if after is not None:
+        after = (datetime.fromisoformat(after[0]), after[1])
+    columns = (Favorite.created_at, Favorite.favorite_id)
+    favorites = keyset(query, columns, after, limit, descending=True).all()
+    return make_page(favorites, limit, key=lambda f: [f.created_at.isoformat(), f.favorite_id])
+
+def check_favorites(db: Session, user_id: int, recipe_hashes: list) -> dict:
+    """recipe_hash -> в избранном ли, для целой страницы рецептов.
+
+    Известные ответы берутся из кэша пользователя; для остальных — один
+    запрос WHERE user_id = ? AND recipe_hash IN (...) по UNIQUE(user_id, recipe_hash).
+    """
+    known = cache_get(_membership_key(user_id)) or {}
+    unknown = [h for h in set(recipe_hashes) if h not in known]
+    if unknown:
+        found = {
+            h for (h,) in db.query(Favorite.recipe_hash)
+            .filter(Favorite.user_id == user_id, Favorite.recipe_hash.in_(unknown))
+        }
+        # Новый словарь, а не мутация: значение могло прийти из общего кэша
+        known = {**known, **{h: h in found for h in unknown}}
+        if len(known) > FAVORITES_CACHE_MAX:
+            known = {h: known[h] for h in recipe_hashes}
+        cache_set(_membership_key(user_id), known)
+    return {h: known[h] for h in recipe_hashes}
@@ -1,42 +1,85 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from models import UserPreference
-from schemas import UserPreferenceCreate, UserPreferenceUpdate
-from logger import logger
+from app.models import UserPreference
+from app.schemas import UserPreferenceCreate, UserPreferenceUpdate
+from app.logger import logger
+from app.crud.writes import versioned_update, check_version, delete_returning
+from app.audit import audit_event
+from app.cache import cache_get, cache_set, invalidate, row_to_dict, detached_from_dict
+from app.conditional import make_etag
+
+class PreferenceExists(Exception):
+    """У пользователя уже есть предпочтения (одна запись на user_id)."""
+
+
+def _preference_key(user_id: int) -> str:
+    return f"preference:{user_id}"
+
+def _forget_preference(user_id: int):
+    invalidate(_preference_key(user_id))
 
 def create_preference(db: Session, pref: UserPreferenceCreate):
     new_pref = UserPreference(**pref.dict())
     db.add(new_pref)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Может быть и нарушение внешнего ключа — тогда пробрасываем как есть
+        if not db.query(UserPreference.preference_id).filter(UserPreference.user_id == pref.user_id).first():
+            raise
+        logger.warning("Preferences already exist for user_id=%s", pref.user_id)
+        raise PreferenceExists(f"Preferences for user {pref.user_id} already exist")
     db.refresh(new_pref)
-    logger.info(f"Preferences created for user_id={new_pref.user_id}")
+    _forget_preference(new_pref.user_id)
+    logger.info("Preferences created for user_id=%s", new_pref.user_id)
+    audit_event("preferences_created", new_pref.user_id)
     return new_pref
 
 def get_preference(db: Session, user_id: int):
+    cached = cache_get(_preference_key(user_id))
+    if cached is not None:
+        return db.merge(detached_from_dict(UserPreference, cached), load=False)
     pref = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
     if pref:
-        logger.info(f"Preferences fetched for user_id={user_id}")
+        cache_set(_preference_key(user_id), row_to_dict(pref))
+        logger.info("Preferences fetched for user_id=%s", user_id)
     else:
-        logger.warning(f"Preferences not found for user_id={user_id}")
+        logger.warning("Preferences not found for user_id=%s", user_id)
     return pref
 
-def update_preference(db: Session, user_id: int, pref_data: UserPreferenceUpdate):
-    pref = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+def get_preference_etag(db: Session, user_id: int):
+    """ETag предпочтений без загрузки строки: SELECT по уникальному user_id; None — нет записи.
+
+    Не из кэша: он у каждого воркера свой (см. app/conditional.py).
+    """
+    row = db.execute(select(UserPreference.preference_id, UserPreference.version)
+                     .where(UserPreference.user_id == user_id)).first()
+    return make_etag(*row) if row is not None else None
+
+def update_preference(db: Session, user_id: int, pref_data: UserPreferenceUpdate, expected: list = None):
+    """expected — версии из If-Match (см. versioned_update); не совпали — VersionMismatch."""
+    changes = pref_data.dict(exclude_unset=True)
+    if not changes:
+        return check_version(UserPreference, get_preference(db, user_id), expected)
+    pref = versioned_update(db, UserPreference, (UserPreference.user_id == user_id,), changes, expected)
+    db.commit()
     if not pref:
-        logger.warning(f"Preference update failed: user_id={user_id}")
+        logger.warning("Preference update failed: user_id=%s", user_id)
         return None
-    for field, value in pref_data.dict(exclude_unset=True).items():
-        setattr(pref, field, value)
-    db.commit()
-    db.refresh(pref)
-    logger.info(f"Preferences updated for user_id={user_id}")
+    invalidate(_preference_key(user_id))
+    logger.info("Preferences updated for user_id=%s", user_id)
+    audit_event("preferences_updated", user_id)
     return pref
 
 def delete_preference(db: Session, user_id: int):
-    pref = db.query(UserPreference).filter(UserPreference.user_id == user_id).first()
+    pref = delete_returning(db, UserPreference, (UserPreference.user_id == user_id,))
+    db.commit()
     if not pref:
-        logger.warning(f"Preference delete failed: user_id={user_id}")
+        logger.warning("Preference delete failed: user_id=%s", user_id)
         return None
-    db.delete(pref)
-    db.commit()
-    logger.info(f"Preferences deleted for user_id={user_id}")
+    _forget_preference(user_id)
+    logger.info("Preferences deleted for user_id=%s", user_id)
+    audit_event("preferences_deleted", user_id)
     return pref
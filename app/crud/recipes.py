@@ -0,0 +1,36 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from app.models import Recipe
+from app.serialization import rows_to_dicts
+
+# Колонки, которые нужны индексу: без title — он берётся из БД только для выдачи
+INDEX_COLUMNS = (Recipe.recipe_id, Recipe.cuisine, Recipe.cooking_time, Recipe.difficulty, Recipe.updated_at)
+CARD_COLUMNS = (Recipe.recipe_id, Recipe.recipe_hash, Recipe.title, Recipe.cuisine,
+                Recipe.cooking_time, Recipe.difficulty)
+INDEX_BATCH_SIZE = 10000
+
+def get_recipes_changed_since(db: Session, since: datetime = None, after: tuple = None,
+                              limit: int = INDEX_BATCH_SIZE):
+    """Пачка строк для индекса по (updated_at, recipe_id); after — ключ последней строки прошлой пачки."""
+    query = select(*INDEX_COLUMNS)
+    if since is not None:
+        query = query.where(Recipe.updated_at >= since)
+    if after is not None:
+        query = query.where(tuple_(Recipe.updated_at, Recipe.recipe_id) > tuple_(*after))
+    return db.execute(query.order_by(Recipe.updated_at, Recipe.recipe_id).limit(limit)).all()
+
+def get_recipe_ids(db: Session, after: int = None, limit: int = INDEX_BATCH_SIZE) -> list:
+    """Пачка recipe_id по первичному ключу — только индекс, без чтения строк."""
+    query = select(Recipe.recipe_id)
+    if after is not None:
+        query = query.where(Recipe.recipe_id > after)
+    return db.scalars(query.order_by(Recipe.recipe_id).limit(limit)).all()
+
+def get_recipe_cards(db: Session, recipe_ids: list) -> list:
+    """Карточки рецептов одним запросом по первичному ключу, в порядке recipe_ids."""
+    if not recipe_ids:
+        return []
+    rows = rows_to_dicts(db.execute(select(*CARD_COLUMNS).where(Recipe.recipe_id.in_(recipe_ids))))
+    by_id = {row["recipe_id"]: row for row in rows}
+    return [by_id[recipe_id] for recipe_id in recipe_ids if recipe_id in by_id]
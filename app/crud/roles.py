@@ -1,46 +1,104 @@
+from sqlalchemy import func, exists
 from sqlalchemy.orm import Session
-from models import Role
-from schemas import RoleCreate, RoleUpdate
-from logger import logger
+from app.models import Role, User
+from app.schemas import RoleCreate, RoleUpdate
+from app.logger import logger
+from app.crud.writes import update_returning, delete_returning
+from app.audit import audit_event
+from app.pagination import keyset, make_page, clamp_limit, DEFAULT_PAGE_SIZE
+from app.cache import cache_get, cache_set, invalidate, row_to_dict, detached_from_dict
+
+# Ролей единицы и меняются редко — кэшируем таблицу целиком одним ключом
+ROLES_KEY = "roles:all"
+
+
+class RoleInUse(Exception):
+    """Роль нельзя удалить: на неё ссылаются пользователи."""
+
+
+def _role_key(role_id: int) -> str:
+    return f"role:{role_id}"
 
 def create_role(db: Session, role: RoleCreate):
     new_role = Role(name=role.name)
     db.add(new_role)
     db.commit()
     db.refresh(new_role)
-    logger.info(f"Role created: id={new_role.role_id}, name={new_role.name}")
+    invalidate(ROLES_KEY)
+    logger.info("Role created: id=%s, name=%s", new_role.role_id, new_role.name)
+    audit_event("role_created", details=f"role_id={new_role.role_id}, name={new_role.name}")
     return new_role
 
-def get_roles(db: Session):
-    roles = db.query(Role).all()
-    logger.info(f"Fetched {len(roles)} roles")
-    return roles
+def get_roles(db: Session, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE):
+    rows = cache_get(ROLES_KEY)
+    if rows is None:
+        rows = [row_to_dict(r) for r in db.query(Role).order_by(Role.role_id)]
+        cache_set(ROLES_KEY, rows)
+    if after_id is not None:
+        rows = [r for r in rows if r["role_id"] > after_id]
+    roles = [db.merge(detached_from_dict(Role, r), load=False) for r in rows[:clamp_limit(limit) + 1]]
+    page = make_page(roles, limit, key=lambda r: r.role_id)
+    logger.info("Fetched %s roles", len(page.items))
+    return page
+
+def get_roles_with_user_counts(db: Session):
+    """Роли и число пользователей в каждой — один GROUP BY вместо len(role.users) на роль."""
+    user_count = func.count(User.user_id).label("user_count")
+    rows = (db.query(Role.role_id, Role.name, user_count)
+            .outerjoin(User, User.role_id == Role.role_id)
+            .group_by(Role.role_id, Role.name)
+            .order_by(Role.role_id))
+    return [row._asdict() for row in rows]
+
+def get_rate_limit_factors(db: Session) -> dict:
+    """role_id -> rate_limit_factor для всех ролей (None — роль без лимита)."""
+    return dict(db.query(Role.role_id, Role.rate_limit_factor).all())
 
 def get_role(db: Session, role_id: int):
+    cached = cache_get(_role_key(role_id))
+    if cached is not None:
+        return db.merge(detached_from_dict(Role, cached), load=False)
     role = db.query(Role).filter(Role.role_id == role_id).first()
     if role:
-        logger.info(f"Role fetched: id={role.role_id}")
+        cache_set(_role_key(role_id), row_to_dict(role))
+        logger.info("Role fetched: id=%s", role.role_id)
     else:
-        logger.warning(f"Role not found: id={role_id}")
+        logger.warning("Role not found: id=%s", role_id)
     return role
 
+def get_role_users(db: Session, role_id: int, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Страница пользователей роли по user_id — не вся коллекция role.users.
+
+    В MySQL индекс внешнего ключа (role_id) неявно содержит user_id, так что
+    WHERE role_id = ? AND user_id > ? ORDER BY user_id идёт по нему без сортировки.
+    """
+    users = keyset(db.query(User).filter(User.role_id == role_id), User.user_id, after_id, limit).all()
+    return make_page(users, limit, key=lambda u: u.user_id)
+
 def update_role(db: Session, role_id: int, role: RoleUpdate):
-    db_role = db.query(Role).filter(Role.role_id == role_id).first()
+    if not role.name:
+        return get_role(db, role_id)
+    db_role = update_returning(db, Role, (Role.role_id == role_id,), {"name": role.name})
+    db.commit()
     if not db_role:
-        logger.warning(f"Role update failed, not found id={role_id}")
+        logger.warning("Role update failed, not found id=%s", role_id)
         return None
-    db_role.name = role.name or db_role.name
-    db.commit()
-    db.refresh(db_role)
-    logger.info(f"Role updated: id={db_role.role_id}, name={db_role.name}")
+    invalidate(_role_key(role_id), ROLES_KEY)
+    logger.info("Role updated: id=%s, name=%s", db_role.role_id, db_role.name)
+    audit_event("role_updated", details=f"role_id={db_role.role_id}, name={db_role.name}")
     return db_role
 
 def delete_role(db: Session, role_id: int):
-    db_role = db.query(Role).filter(Role.role_id == role_id).first()
+    # Без загрузки role.users: достаточно знать, есть ли ссылки
+    if db.query(exists().where(User.role_id == role_id)).scalar():
+        logger.warning("Role delete refused, role in use id=%s", role_id)
+        raise RoleInUse(f"Role {role_id} is assigned to users")
+    db_role = delete_returning(db, Role, (Role.role_id == role_id,))
+    db.commit()
     if not db_role:
-        logger.warning(f"Role delete failed, not found id={role_id}")
+        logger.warning("Role delete failed, not found id=%s", role_id)
         return None
-    db.delete(db_role)
-    db.commit()
-    logger.info(f"Role deleted: id={role_id}")
+    invalidate(_role_key(role_id), ROLES_KEY)
+    logger.info("Role deleted: id=%s", role_id)
+    audit_event("role_deleted", details=f"role_id={role_id}")
     return db_role
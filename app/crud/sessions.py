@@ -1,42 +1,118 @@
+import os
+import secrets
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from models import Session as UserSession
-from schemas import SessionCreate, SessionUpdate
-from logger import logger
+from app.models import Session as UserSession
+from app.schemas import SessionCreate, SessionUpdate
+from app.logger import logger
+from app.crud.writes import update_returning, delete_returning
+from app.audit import audit_event
+from app.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from app.cache import TTLCache
+
+# Время жизни токена, выданного при входе (секунды)
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+# Сколько секунд проверенный токен живёт в in-process кэше. Отзыв сессии на
+# других воркерах вступает в силу не позже, чем через это время
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+
+# token -> (session_id, user_id, expired_at)
+token_cache = TTLCache(maxsize=int(os.getenv("AUTH_CACHE_MAXSIZE", "50000")), ttl=AUTH_CACHE_TTL)
 
 def create_session(db: Session, session_data: SessionCreate):
     session = UserSession(**session_data.dict())
     db.add(session)
     db.commit()
     db.refresh(session)
-    logger.info(f"Session created: id={session.session_id}, user={session.user_id}")
+    logger.info("Session created: id=%s, user=%s", session.session_id, session.user_id)
+    audit_event("session_created", session.user_id, f"session_id={session.session_id}")
     return session
 
-def get_sessions(db: Session, user_id: int = None):
+def issue_session(db: Session, user_id: int, ttl: int = SESSION_TTL):
+    token = secrets.token_urlsafe(32)
+    expired_at = datetime.now() + timedelta(seconds=ttl)
+    return create_session(db, SessionCreate(user_id=user_id, token=token, expired_at=expired_at))
+
+def get_session_by_token(db: Session, token: str):
+    # token UNIQUE — поиск по индексу, без скана по user_id
+    return db.query(UserSession).filter(UserSession.token == token).first()
+
+def resolve_token(db: Session, token: str):
+    """token -> user_id для действующей сессии, иначе None."""
+    entry = token_cache.get(token)
+    if entry is None:
+        session = get_session_by_token(db, token)
+        if not session:
+            return None
+        entry = (session.session_id, session.user_id, session.expired_at)
+        token_cache.set(token, entry)
+    session_id, user_id, expired_at = entry
+    if expired_at is not None and expired_at <= datetime.now():
+        token_cache.delete(token)
+        return None
+    return user_id
+
+def cached_user_id(token: str):
+    """token -> user_id только из кэша, без БД; None — токена нет в кэше или сессия истекла."""
+    entry = token_cache.get(token)
+    if entry is None or (entry[2] is not None and entry[2] <= datetime.now()):
+        return None
+    return entry[1]
+
+def delete_expired_sessions(db: Session, batch_size: int = 1000, now: datetime = None):
+    """Удаляет просроченные сессии пачками, чтобы не держать длинных блокировок."""
+    now = now or datetime.now()
+    deleted = 0
+    while True:
+        ids = [row.session_id for row in db.query(UserSession.session_id)
+               .filter(UserSession.expired_at <= now).limit(batch_size)]
+        if not ids:
+            break
+        db.query(UserSession).filter(UserSession.session_id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            break
+    if deleted:
+        logger.info("Expired sessions deleted: %s", deleted)
+    return deleted
+
+def get_sessions(db: Session, user_id: int = None, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE):
     query = db.query(UserSession)
     if user_id:
         query = query.filter(UserSession.user_id == user_id)
-        logger.info(f"Fetched sessions for user_id={user_id}")
-    sessions = query.all()
-    return sessions
+        logger.info("Fetched sessions for user_id=%s", user_id)
+    sessions = keyset(query, UserSession.session_id, after_id, limit).all()
+    return make_page(sessions, limit, key=lambda s: s.session_id)
 
 def update_session(db: Session, session_id: int, session_data: SessionUpdate):
-    session = db.query(UserSession).filter(UserSession.session_id == session_id).first()
-    if not session:
-        logger.warning(f"Session update failed: id={session_id} not found")
+    # Старый токен нужен, чтобы выкинуть его из token_cache: RETURNING отдаёт
+    # только новые значения, поэтому здесь остаётся лёгкий SELECT одной колонки
+    old_token = db.query(UserSession.token).filter(UserSession.session_id == session_id).scalar()
+    if old_token is None:
+        logger.warning("Session update failed: id=%s not found", session_id)
         return None
-    for field, value in session_data.dict(exclude_unset=True).items():
-        setattr(session, field, value)
+    changes = session_data.dict(exclude_unset=True)
+    if not changes:
+        return db.get(UserSession, session_id)
+    session = update_returning(db, UserSession, (UserSession.session_id == session_id,), changes)
     db.commit()
-    db.refresh(session)
-    logger.info(f"Session updated: id={session.session_id}")
+    token_cache.delete(old_token)
+    if not session:
+        logger.warning("Session update failed: id=%s not found", session_id)
+        return None
+    logger.info("Session updated: id=%s", session.session_id)
+    audit_event("session_updated", session.user_id, f"session_id={session.session_id}")
     return session
 
 def delete_session(db: Session, session_id: int):
-    session = db.query(UserSession).filter(UserSession.session_id == session_id).first()
+    session = delete_returning(db, UserSession, (UserSession.session_id == session_id,))
+    db.commit()
     if not session:
-        logger.warning(f"Session delete failed: id={session_id}")
+        logger.warning("Session delete failed: id=%s", session_id)
         return None
-    db.delete(session)
-    db.commit()
-    logger.info(f"Session deleted: id={session_id}")
+    user_id = session.user_id
+    token_cache.delete(session.token)
+    logger.info("Session deleted: id=%s", session_id)
+    audit_event("session_deleted", user_id, f"session_id={session_id}")
     return session
@@ -1,51 +1,354 @@
-from sqlalchemy.orm import Session
-from models import User
-from schemas import UserCreate, UserUpdate
-from werkzeug.security import generate_password_hash
-from logger import logger
+import zlib
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import User, Role
+from app.schemas import UserCreate, UserUpdate, UserOut
+from app.logger import logger
+from app.audit import audit_event
+from app import hashing
+import app.crud.sessions as sessions_crud
+import app.crud.roles as roles_crud
+from app.crud.writes import versioned_update, check_version, delete_returning
+from app.pagination import keyset, make_page, DEFAULT_PAGE_SIZE
+from app.cache import cache_get, cache_set, invalidate, row_to_dict, detached_from_dict
+from app.conditional import make_etag
+from app.serialization import schema_columns, rows_to_dicts
+
+# Для списков: только поля UserOut, строками, а не ORM-сущностями
+USER_OUT_COLUMNS = schema_columns(User, UserOut)
+
+# Опции загрузки для get_users(options=...): роль тем же запросом (many-to-one — JOIN)
+WITH_ROLE = (joinedload(User.role),)
+
+# password_hash в кэш не кладём — он догрузится из БД, если понадобится
+USER_CACHE_EXCLUDE = ("password_hash",)
+
+def _user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def _forget_user(user_id: int):
+    invalidate(_user_key(user_id))
+
+def role_representation(role_name: str = None) -> str:
+    """Метка ?include=role для ETag: роль переименовывают без смены версии пользователя."""
+    return f"role.{zlib.crc32((role_name or '').encode()):08x}"
 
 def create_user(db: Session, user: UserCreate):
     db_user = User(
         email=user.email,
         role_id=user.role_id,
-        password_hash=generate_password_hash(user.password)
+        password_hash=hashing.hash_password(user.password)
     )
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    logger.info(f"User created: id={db_user.user_id}, email={db_user.email}")
+    logger.info("User created: id=%s, email=%s", db_user.user_id, db_user.email)
+    audit_event("user_created", db_user.user_id, f"email={db_user.email}")
     return db_user
 
-def get_user(db: Session, user_id: int):
-    user = db.query(User).filter(User.user_id == user_id).first()
+def get_users(db: Session, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, options: tuple = ()):
+    users = keyset(db.query(User).options(*options), User.user_id, after_id, limit).all()
+    return make_page(users, limit, key=lambda u: u.user_id)
+
+def _user_rows_query(with_role: bool):
+    if not with_role:
+        return select(*USER_OUT_COLUMNS)
+    return select(*USER_OUT_COLUMNS, Role.name.label("role_name")).join(User.role)
+
+def _user_row_dicts(rows, with_role: bool) -> list:
+    items = rows_to_dicts(rows)
+    if with_role:
+        for item in items:
+            item["role"] = {"role_id": item["role_id"], "name": item.pop("role_name")}
+    return items
+
+def get_user_rows(db: Session, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, with_role: bool = False):
+    rows = db.execute(keyset(_user_rows_query(with_role), User.user_id, after_id, limit))
+    return make_page(_user_row_dicts(rows, with_role), limit, key=lambda u: u["user_id"])
+
+def get_user(db: Session, user_id: int, with_role: bool = False):
+    cached = cache_get(_user_key(user_id))
+    if cached is not None:
+        user = db.merge(detached_from_dict(User, cached), load=False)
+        if with_role:
+            # Роль тоже из кэша; set_committed_value не помечает пользователя изменённым
+            set_committed_value(user, "role", roles_crud.get_role(db, user.role_id))
+        return user
+    query = db.query(User).filter(User.user_id == user_id)
+    user = query.options(*WITH_ROLE).first() if with_role else query.first()
     if user:
-        logger.info(f"User fetched: id={user.user_id}")
+        cache_set(_user_key(user_id), row_to_dict(user, exclude=USER_CACHE_EXCLUDE))
+        logger.info("User fetched: id=%s", user.user_id)
     else:
-        logger.warning(f"User not found: id={user_id}")
+        logger.warning("User not found: id=%s", user_id)
     return user
 
-def update_user(db: Session, user_id: int, user_data: UserUpdate):
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        logger.warning(f"Attempt to update non-existent user id={user_id}")
+def cached_role_id(user_id: int):
+    """role_id из кэша пользователей, без БД; None — пользователя нет в кэше."""
+    cached = cache_get(_user_key(user_id))
+    return cached["role_id"] if cached is not None else None
+
+def get_user_etag(db: Session, user_id: int, with_role: bool = False):
+    """ETag пользователя без загрузки строки: SELECT version по PK (с ролью — и её имя); None — нет такого.
+
+    Не из кэша: он у каждого воркера свой, и изменение через соседний воркер дало бы ложный 304.
+    """
+    if not with_role:
+        version = db.execute(select(User.version).where(User.user_id == user_id)).scalar()
+        return make_etag(user_id, version) if version is not None else None
+    row = db.execute(select(User.version, Role.name).outerjoin(Role, User.role_id == Role.role_id)
+                     .where(User.user_id == user_id)).first()
+    if row is None:
         return None
+    return make_etag(user_id, row.version, role_representation(row.name))
+
+def _user_changes(user_data: UserUpdate, password_hash: str = None) -> dict:
+    changes = {}
     if user_data.email:
-        user.email = user_data.email
-    if user_data.password:
-        user.password_hash = generate_password_hash(user_data.password)
+        changes["email"] = user_data.email
+    if password_hash:
+        changes["password_hash"] = password_hash
     if user_data.role_id:
-        user.role_id = user_data.role_id
+        changes["role_id"] = user_data.role_id
+    return changes
+
+def update_user(db: Session, user_id: int, user_data: UserUpdate, expected: list = None):
+    """expected — версии из If-Match (см. versioned_update); не совпали — VersionMismatch."""
+    password_hash = hashing.hash_password(user_data.password) if user_data.password else None
+    changes = _user_changes(user_data, password_hash)
+    if not changes:
+        return check_version(User, get_user(db, user_id), expected)
+    # Один UPDATE ... RETURNING вместо SELECT + UPDATE + refresh
+    user = versioned_update(db, User, (User.user_id == user_id,), changes, expected)
     db.commit()
-    db.refresh(user)
-    logger.info(f"User updated: id={user.user_id}, email={user.email}")
+    if not user:
+        logger.warning("Attempt to update non-existent user id=%s", user_id)
+        return None
+    invalidate(_user_key(user_id))
+    logger.info("User updated: id=%s, email=%s", user.user_id, user.email)
+    audit_event("user_updated", user.user_id)
+    return user
+
+# Размер одного multi-row INSERT при массовом импорте
+BULK_BATCH_SIZE = 500
+
+def _insert_ignoring_duplicates(dialect: str):
+    # Дубликат email (например, гонка с параллельной регистрацией) не валит весь батч
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(User)
+        return stmt.on_duplicate_key_update(email=stmt.inserted.email)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(User).on_conflict_do_nothing(index_elements=[User.email])
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(User).on_conflict_do_nothing(index_elements=[User.email])
+    return insert(User)
+
+def _plan_bulk(db: Session, users: list, batch_size: int):
+    """Отсеивает строки с несуществующей ролью (один IN по roles), дубликаты внутри
+    пачки и уже существующие email (один IN на батч).
+
+    Без проверки роли одна такая строка валит весь импорт ошибкой внешнего
+    ключа, а на MySQL молча пропадает и выглядит как дубликат.
+    """
+    results = [None] * len(users)
+    role_ids = {user.role_id for user in users}
+    known_roles = set(db.scalars(select(Role.role_id).where(Role.role_id.in_(role_ids)))) if role_ids else set()
+    first_seen = {}
+    for i, user in enumerate(users):
+        if user.role_id not in known_roles:
+            results[i] = {"index": i, "email": user.email, "status": "invalid_role"}
+        elif user.email in first_seen:
+            results[i] = {"index": i, "email": user.email, "status": "duplicate"}
+        else:
+            first_seen[user.email] = i
+    emails = list(first_seen)
+    for start in range(0, len(emails), batch_size):
+        batch = emails[start:start + batch_size]
+        for email, user_id in db.execute(select(User.email, User.user_id).where(User.email.in_(batch))):
+            i = first_seen.pop(email)
+            results[i] = {"index": i, "email": email, "status": "duplicate", "user_id": user_id}
+    return results, sorted(first_seen.values())
+
+def _insert_bulk(db: Session, users: list, pending: list, hashes: list, results: list, batch_size: int):
+    stmt = _insert_ignoring_duplicates(db.get_bind().dialect.name)
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        rows = [
+            {"email": users[i].email, "role_id": users[i].role_id, "password_hash": hashes[start + n]}
+            for n, i in enumerate(batch)
+        ]
+        db.execute(stmt, rows)
+        # Email мог занять параллельный запрос, пока хэшировались пароли: строка наша,
+        # только если в ней наш хэш (соль у каждого своя). Работает и без RETURNING (MySQL)
+        stored = {email: (user_id, password_hash) for email, user_id, password_hash in db.execute(
+            select(User.email, User.user_id, User.password_hash).where(User.email.in_([r["email"] for r in rows])))}
+        for row, i in zip(rows, batch):
+            user_id, password_hash = stored.get(row["email"], (None, None))
+            status = "created" if password_hash == row["password_hash"] else "duplicate"
+            results[i] = {"index": i, "email": row["email"], "status": status, "user_id": user_id}
+    db.commit()
+    counts = {status: 0 for status in ("created", "duplicate", "invalid_role")}
+    for result in results:
+        counts[result["status"]] += 1
+    created, duplicates, invalid = counts["created"], counts["duplicate"], counts["invalid_role"]
+    logger.info("Bulk import: created=%s, duplicates=%s, invalid_role=%s", created, duplicates, invalid)
+    audit_event("users_bulk_created", details=f"created={created}, duplicates={duplicates}, invalid_role={invalid}")
+    return {"created": created, "duplicates": duplicates, "invalid_roles": invalid, "results": results}
+
+def bulk_create_users(db: Session, users: list, batch_size: int = BULK_BATCH_SIZE):
+    results, pending = _plan_bulk(db, users, batch_size)
+    hashes = hashing.hasher.hash_many([users[i].password for i in pending])
+    return _insert_bulk(db, users, pending, hashes, results, batch_size)
+
+def authenticate_user(db: Session, email: str, password: str):
+    user = db.query(User).filter(User.email == email).first()
+    if not user or not hashing.verify_password(user.password_hash, password):
+        logger.warning("Failed login attempt: email=%s", email)
+        return None
+    # Параметры хэша устарели (сменился метод/стоимость) — перехэшируем при входе
+    if hashing.hasher.needs_rehash(user.password_hash):
+        user.password_hash = hashing.hash_password(password)
+        db.commit()
+        logger.info("Password rehashed: id=%s", user.user_id)
+    logger.info("User logged in: id=%s", user.user_id)
     return user
 
 def delete_user(db: Session, user_id: int):
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = delete_returning(db, User, (User.user_id == user_id,))
+    db.commit()
     if not user:
-        logger.warning(f"Attempt to delete non-existent user id={user_id}")
+        logger.warning("Attempt to delete non-existent user id=%s", user_id)
         return None
-    db.delete(user)
-    db.commit()
-    logger.info(f"User deleted: id={user_id}")
+    _forget_user(user_id)
+    logger.info("User deleted: id=%s", user_id)
+    audit_event("user_deleted", details=f"user_id={user_id}")
     return user
+
+
+class UserRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_users(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, options: tuple = ()):
+        return get_users(self.db, after_id, limit, options)
+
+    def get_user_rows(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, with_role: bool = False):
+        return get_user_rows(self.db, after_id, limit, with_role)
+
+    def get_user(self, user_id: int, with_role: bool = False):
+        return get_user(self.db, user_id, with_role)
+
+    def get_user_etag(self, user_id: int, with_role: bool = False):
+        return get_user_etag(self.db, user_id, with_role)
+
+    def create_user(self, user: UserCreate):
+        return create_user(self.db, user)
+
+    def bulk_create_users(self, users: list):
+        return bulk_create_users(self.db, users)
+
+    def update_user(self, user_id: int, user_data: UserUpdate, expected: list = None):
+        return update_user(self.db, user_id, user_data, expected)
+
+    def authenticate_user(self, email: str, password: str):
+        return authenticate_user(self.db, email, password)
+
+    def issue_session(self, user_id: int):
+        return sessions_crud.issue_session(self.db, user_id)
+
+    def delete_user(self, user_id: int):
+        return delete_user(self.db, user_id)
+
+
+class AsyncUserRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_users(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, options: tuple = ()):
+        result = await self.db.execute(keyset(select(User).options(*options), User.user_id, after_id, limit))
+        return make_page(result.scalars().all(), limit, key=lambda u: u.user_id)
+
+    async def get_user_rows(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, with_role: bool = False):
+        result = await self.db.execute(keyset(_user_rows_query(with_role), User.user_id, after_id, limit))
+        return make_page(_user_row_dicts(result, with_role), limit, key=lambda u: u["user_id"])
+
+    async def get_user(self, user_id: int, with_role: bool = False):
+        # Ленивой загрузки в async нет: роль — только через joinedload, мимо кэша
+        if with_role:
+            return await self.db.get(User, user_id, options=WITH_ROLE)
+        cached = cache_get(_user_key(user_id))
+        if cached is not None:
+            return await self.db.merge(detached_from_dict(User, cached), load=False)
+        user = await self.db.get(User, user_id)
+        if user:
+            cache_set(_user_key(user_id), row_to_dict(user, exclude=USER_CACHE_EXCLUDE))
+            logger.info("User fetched: id=%s", user.user_id)
+        else:
+            logger.warning("User not found: id=%s", user_id)
+        return user
+
+    async def create_user(self, user: UserCreate):
+        # Хэширование CPU-тяжёлое — уходит в пул процессов, event loop не блокируется
+        password_hash = await hashing.hasher.hash_async(user.password)
+        db_user = User(email=user.email, role_id=user.role_id, password_hash=password_hash)
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        logger.info("User created: id=%s, email=%s", db_user.user_id, db_user.email)
+        audit_event("user_created", db_user.user_id, f"email={db_user.email}")
+        return db_user
+
+    async def bulk_create_users(self, users: list, batch_size: int = BULK_BATCH_SIZE):
+        results, pending = await self.db.run_sync(_plan_bulk, users, batch_size)
+        hashes = await hashing.hasher.hash_many_async([users[i].password for i in pending])
+        return await self.db.run_sync(_insert_bulk, users, pending, hashes, results, batch_size)
+
+    async def get_user_etag(self, user_id: int, with_role: bool = False):
+        return await self.db.run_sync(get_user_etag, user_id, with_role)
+
+    async def update_user(self, user_id: int, user_data: UserUpdate, expected: list = None):
+        password_hash = await hashing.hasher.hash_async(user_data.password) if user_data.password else None
+        changes = _user_changes(user_data, password_hash)
+        if not changes:
+            return check_version(User, await self.get_user(user_id), expected)
+        user = await self.db.run_sync(versioned_update, User, (User.user_id == user_id,), changes, expected)
+        await self.db.commit()
+        if not user:
+            logger.warning("Attempt to update non-existent user id=%s", user_id)
+            return None
+        invalidate(_user_key(user_id))
+        logger.info("User updated: id=%s, email=%s", user.user_id, user.email)
+        audit_event("user_updated", user.user_id)
+        return user
+
+    async def authenticate_user(self, email: str, password: str):
+        result = await self.db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+        if not user or not await hashing.hasher.verify_async(user.password_hash, password):
+            logger.warning("Failed login attempt: email=%s", email)
+            return None
+        if hashing.hasher.needs_rehash(user.password_hash):
+            user.password_hash = await hashing.hasher.hash_async(password)
+            await self.db.commit()
+            logger.info("Password rehashed: id=%s", user.user_id)
+        logger.info("User logged in: id=%s", user.user_id)
+        return user
+
+    async def issue_session(self, user_id: int):
+        return await self.db.run_sync(sessions_crud.issue_session, user_id)
+
+    async def delete_user(self, user_id: int):
+        user = await self.db.run_sync(delete_returning, User, (User.user_id == user_id,))
+        await self.db.commit()
+        if not user:
+            logger.warning("Attempt to delete non-existent user id=%s", user_id)
+            return None
+        _forget_user(user_id)
+        logger.info("User deleted: id=%s", user_id)
+        audit_event("user_deleted", details=f"user_id={user_id}")
+        return user
@@ -0,0 +1,95 @@
+from sqlalchemy import and_, delete, false, inspect as sa_inspect, or_, select, update
+from sqlalchemy.orm import Session
+from app.cache import detached_from_dict
+
+# UPDATE/DELETE идут мимо identity map: объекты сессии всё равно
+# сбрасываются commit'ом (expire_on_commit), синхронизировать их незачем
+NO_SYNC = {"synchronize_session": False}
+
+
+def _columns(model) -> list:
+    return [getattr(model, attr.key) for attr in sa_inspect(model).column_attrs]
+
+
+def _row_object(model, row):
+    # detached-объект: атрибуты читаются без обращения к БД
+    return detached_from_dict(model, row._asdict()) if row else None
+
+
+def _forget_deleted(db: Session, deleted):
+    # Как после session.delete(): загруженный в сессию экземпляр удалённой
+    # строки отсоединяется, а не истекает на commit (его уже не перечитать)
+    if deleted is not None:
+        loaded = db.identity_map.get(sa_inspect(deleted).key)
+        if loaded is not None:
+            db.expunge(loaded)
+    return deleted
+
+
+class VersionMismatch(Exception):
+    """Строка есть, но её версия не та, что прислал клиент в If-Match."""
+
+
+def update_returning(db: Session, model, where: tuple, values: dict, only_if: tuple = ()):
+    """UPDATE model SET values WHERE where — одним запросом, без предварительного SELECT.
+
+    -> detached-объект с новыми значениями или None, если строки нет.
+    where должен выбирать не больше одной строки (PK/уникальный ключ).
+    only_if — дополнительные условия только для UPDATE (не для дочитывания).
+    Без RETURNING (MySQL) строка дочитывается только если UPDATE её нашёл:
+    rowcount там — число найденных, а не изменённых строк (CLIENT_FOUND_ROWS).
+    commit — на вызывающем.
+    """
+    columns = _columns(model)
+    stmt = update(model).where(*where, *only_if).values(**values).execution_options(**NO_SYNC)
+    if db.get_bind().dialect.update_returning:
+        return _row_object(model, db.execute(stmt.returning(*columns)).first())
+    if not db.execute(stmt).rowcount:
+        return None
+    return _row_object(model, db.execute(select(*columns).where(*where)).first())
+
+
+def _version_condition(model, expected: list):
+    primary_key = sa_inspect(model).primary_key[0]
+    if not expected:
+        return false()
+    return or_(*(and_(primary_key == row_id, model.version == version) for row_id, version in expected))
+
+
+def check_version(model, row, expected: list = None):
+    """Для записи без изменений: версия строки row должна быть среди expected."""
+    if row is not None and expected is not None:
+        row_id = sa_inspect(model).primary_key[0].key
+        if (getattr(row, row_id), row.version) not in expected:
+            raise VersionMismatch(f"{model.__tablename__} {getattr(row, row_id)} is at version {row.version}")
+    return row
+
+
+def versioned_update(db: Session, model, where: tuple, values: dict, expected: list = None):
+    """update_returning с увеличением model.version на 1.
+
+    expected — пары (первичный ключ, версия) из If-Match: UPDATE сработает,
+    только если строка всё ещё в одной из них (compare-and-set одним запросом,
+    без блокировок). Строки нет — None; есть, но версия другая — VersionMismatch.
+    """
+    only_if = (_version_condition(model, expected),) if expected is not None else ()
+    row = update_returning(db, model, where, {**values, "version": model.version + 1}, only_if)
+    if row is None and only_if and db.execute(select(model.version).where(*where)).first() is not None:
+        raise VersionMismatch(f"{model.__tablename__} changed since the client read it")
+    return row
+
+
+def delete_returning(db: Session, model, where: tuple):
+    """DELETE FROM model WHERE where — одним запросом; -> удалённая строка или None.
+
+    Без RETURNING строка читается до DELETE, а rowcount подтверждает, что её
+    не удалили параллельно. commit — на вызывающем.
+    """
+    columns = _columns(model)
+    stmt = delete(model).where(*where).execution_options(**NO_SYNC)
+    if db.get_bind().dialect.delete_returning:
+        return _forget_deleted(db, _row_object(model, db.execute(stmt.returning(*columns)).first()))
+    row = db.execute(select(*columns).where(*where)).first()
+    if row is None or not db.execute(stmt).rowcount:
+        return None
+    return _forget_deleted(db, _row_object(model, row))
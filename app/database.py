@@ -1,7 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from fastapi.requests import HTTPConnection
+from app.replicas import DB_REPLICA_URLS, ReplicaPool, RoutingSession, route_session
 
 # Загружаем переменные окружения из .env
 load_dotenv()
@@ -13,8 +17,155 @@ DB_PORT = os.getenv("DB_PORT", "3306")
 DB_NAME = os.getenv("DB_NAME", "nra")
 
 DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+)
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Переключатель sync/async режима (для A/B сравнения на одних и тех же эндпоинтах)
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() in ("1", "true", "yes")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def engine_options(url: str) -> dict:
+    """Параметры движка и пула из окружения (DB_POOL_*, DB_ECHO, DB_ISOLATION_LEVEL).
+
+    Размеры пула задаются на один процесс uvicorn: при N воркерах к MySQL
+    уходит до N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) соединений.
+    """
+    options = {
+        "echo": _env_bool("DB_ECHO", False),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+    isolation_level = os.getenv("DB_ISOLATION_LEVEL")
+    if isolation_level:
+        options["isolation_level"] = isolation_level
+    # SQLite (тесты) использует свои пулы без size/overflow
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            # Меньше MySQL wait_timeout, чтобы не получать "server has gone away"
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+    return options
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class _TimedPoolMixin:
+    """Считает время ожидания свободного соединения при checkout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def make_engine(url: str, **overrides):
+    options = engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = TimedQueuePool
+    options.update(overrides)
+    return create_engine(url, **options)
+
+
+def make_async_engine(url: str, **overrides):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    options = engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = TimedAsyncQueuePool
+    options.update(overrides)
+    return create_async_engine(url, **options)
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            wait_avg_ms=round(stats.wait_total / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            wait_max_ms=round(stats.wait_max * 1000, 3),
+        )
+    return status
+
+
+engine = make_engine(DATABASE_URL)
+
+# Реплики только для sync-пути: GET-запросы без недавней записи клиента читают из них
+replicas = ReplicaPool([make_engine(url) for url in DB_REPLICA_URLS])
+SessionLocal = sessionmaker(bind=engine, class_=RoutingSession, replicas=replicas,
+                            autoflush=False, autocommit=False)
+
+# Async-движок создаётся только в async-режиме: драйвер (aiomysql/asyncmy)
+# импортируется при создании движка и не нужен для sync-пути
+async_engine = None
+AsyncSessionLocal = None
+if USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = make_async_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
 
 Base = declarative_base()
+
+
+# Зависимость для sync-сессии БД (HTTP и WebSocket)
+def get_db(connection: HTTPConnection):
+    db = SessionLocal()
+    route_session(db, connection)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Зависимость для async-сессии БД
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Метод и "стоимость" хэша в формате werkzeug:
+#   scrypt:<N>:<r>:<p>  или  pbkdf2:sha256:<iterations>
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# 0 — хэшировать в текущем потоке (без пула процессов)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Сколько задач может ждать в очереди пула, прежде чем мы начнём отказывать
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+# Паролей в одной задаче пула при массовом хэшировании: одиночный hash/verify
+# ждёт за пачкой не дольше, чем HASH_WORKERS таких задач
+HASH_BULK_CHUNK = int(os.getenv("HASH_BULK_CHUNK", "8"))
+
+
+class HasherBusy(Exception):
+    """Очередь хэширования переполнена — клиенту стоит повторить позже."""
+
+
+def _hash_all(passwords: list, method: str) -> list:
+    return [generate_password_hash(password, method) for password in passwords]
+
+
+class PasswordHasher:
+    def __init__(self, method: str = PASSWORD_HASH_METHOD, workers: int = HASH_WORKERS,
+                 max_pending: int = HASH_MAX_PENDING, bulk_chunk: int = HASH_BULK_CHUNK):
+        self.method = method
+        self.workers = workers
+        self.bulk_chunk = bulk_chunk
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._prefix = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Password hashing queue is full")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        if not self.workers:
+            return generate_password_hash(password, self.method)
+        return self._submit(generate_password_hash, password, self.method).result()
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        if not self.workers:
+            return check_password_hash(password_hash, password)
+        return self._submit(check_password_hash, password_hash, password).result()
+
+    def hash_many(self, passwords: list) -> list:
+        """Хэширует пачку паролей параллельно на всех воркерах пула.
+
+        Вся пачка занимает один слот очереди. Пул — FIFO, поэтому в нём не
+        больше workers задач по bulk_chunk паролей: следующая отправляется,
+        когда готова первая, и одиночные hash/verify встают между ними, а не
+        за всей пачкой.
+        """
+        if not self.workers:
+            return _hash_all(passwords, self.method)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Password hashing queue is full")
+        try:
+            executor = self._get_executor()
+            chunks = (passwords[i:i + self.bulk_chunk] for i in range(0, len(passwords), self.bulk_chunk))
+            in_flight = deque(executor.submit(_hash_all, chunk, self.method) for chunk in islice(chunks, self.workers))
+            hashes = []
+            while in_flight:
+                hashes += in_flight.popleft().result()
+                for chunk in islice(chunks, 1):
+                    in_flight.append(executor.submit(_hash_all, chunk, self.method))
+            return hashes
+        finally:
+            self._slots.release()
+
+    async def hash_many_async(self, passwords: list) -> list:
+        return await asyncio.to_thread(self.hash_many, passwords)
+
+    async def hash_async(self, password: str) -> str:
+        if not self.workers:
+            return await asyncio.to_thread(generate_password_hash, password, self.method)
+        return await asyncio.wrap_future(self._submit(generate_password_hash, password, self.method))
+
+    async def verify_async(self, password_hash: str, password: str) -> bool:
+        if not self.workers:
+            return await asyncio.to_thread(check_password_hash, password_hash, password)
+        return await asyncio.wrap_future(self._submit(check_password_hash, password_hash, password))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        # Префикс до первого "$" — метод и параметры, с которыми хэш был создан
+        if self._prefix is None:
+            self._prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> str:
+    return hasher.hash(password)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    return hasher.verify(password_hash, password)
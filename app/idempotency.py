@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from app.cache import CacheBackend, TTLCache
+from app.logger import logger
+
+# Сколько хранится ответ на запрос с Idempotency-Key (секунды) и сколько
+# ключей помним. Хранилище по умолчанию — на воркер; для нескольких воркеров
+# передайте общее (интерфейс CacheBackend)
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAXSIZE = int(os.getenv("IDEMPOTENCY_MAXSIZE", "100000"))
+# Отметка "запрос выполняется" истекает сама, если воркер упал посреди запроса
+IDEMPOTENCY_PENDING_TTL = float(os.getenv("IDEMPOTENCY_PENDING_TTL", "60"))
+# Ответ длиннее (байт) не сохраняется: 100k ключей с отчётами bulk на сутки не помещаются в память
+IDEMPOTENCY_MAX_BODY = int(os.getenv("IDEMPOTENCY_MAX_BODY", "65536"))
+
+UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+
+def _header(scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+async def _respond(send, status: int, body: dict, headers: list = ()):
+    payload = json.dumps(body).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(payload)).encode()), *headers]})
+    await send({"type": "http.response.body", "body": payload})
+
+
+class IdempotencyMiddleware:
+    """Повтор запроса с тем же Idempotency-Key получает сохранённый ответ, а не выполняется снова.
+
+    Касается только POST/PUT/PATCH/DELETE с заголовком. Ключ привязан к
+    Authorization, так что чужой ключ не вернёт чужой ответ. Тот же ключ с
+    другим телом/путём — 422; пока первый запрос выполняется — 409.
+    Ответы 5xx не сохраняются: такой запрос можно повторить. Потоки
+    (text/event-stream) и ответы длиннее max_body тоже: повтор выполнится заново.
+    """
+
+    def __init__(self, app, store: CacheBackend = None, ttl: float = IDEMPOTENCY_TTL,
+                 max_body: int = IDEMPOTENCY_MAX_BODY):
+        self.app = app
+        self.store = store if store is not None else TTLCache(maxsize=IDEMPOTENCY_MAXSIZE, ttl=ttl)
+        self.ttl = ttl
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        key = _header(scope, b"idempotency-key") if scope["type"] == "http" else None
+        if key is None or scope["method"] not in UNSAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        body, more_body = b"", True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        owner = _header(scope, b"authorization") or b""
+        store_key = "idempotency:" + hashlib.sha256(owner + b"\0" + key).hexdigest()
+        fingerprint = hashlib.sha256(
+            b"\0".join((scope["method"].encode(), scope["path"].encode(), scope["query_string"], body))).hexdigest()
+
+        saved = self.store.get(store_key)
+        if saved is not None:
+            if saved["fingerprint"] != fingerprint:
+                await _respond(send, 422, {"detail": "Idempotency-Key was used with a different request"})
+            elif saved.get("pending"):
+                await _respond(send, 409, {"detail": "A request with this Idempotency-Key is in progress"},
+                               [(b"retry-after", b"1")])
+            else:
+                await send({"type": "http.response.start", "status": saved["status"],
+                            "headers": saved["headers"] + [REPLAYED_HEADER]})
+                await send({"type": "http.response.body", "body": saved["body"]})
+            return
+        self.store.set(store_key, {"fingerprint": fingerprint, "pending": True}, IDEMPOTENCY_PENDING_TTL)
+
+        request_sent = False
+        response = {"status": 500, "headers": [], "body": b""}
+        storable = True
+
+        async def replay_receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal storable
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+                content_type = next((value for name, value in response["headers"] if name == b"content-type"), b"")
+                storable = not content_type.startswith(b"text/event-stream")
+            elif message["type"] == "http.response.body" and storable:
+                response["body"] += message.get("body", b"")
+                if len(response["body"]) > self.max_body:
+                    # Дальше не копим: тело уже не будет сохранено
+                    storable, response["body"] = False, b""
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            self.store.delete(store_key)
+            raise
+        if response["status"] >= 500:
+            self.store.delete(store_key)
+            return
+        if not storable:
+            self.store.delete(store_key)
+            logger.info("Idempotent response not stored (stream or over %s bytes): %s %s",
+                        self.max_body, scope["method"], scope["path"])
+            return
+        self.store.set(store_key, {"fingerprint": fingerprint, **response}, self.ttl)
+        logger.info("Idempotent response stored: %s %s -> %s", scope["method"], scope["path"], response["status"])
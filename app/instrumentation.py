@@ -0,0 +1,212 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.logger import logger
+from app.metrics import registry as default_registry
+
+# Одинаковый SQL, выполненный в одном запросе столько раз и больше, — признак N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# Профилировщик включается, только если задан порог медленного запроса (мс)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """SQL одного HTTP-запроса; заполняется из обработчиков событий движка."""
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_time = 0.0
+        self.by_statement = Tally()
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list:
+        return [(sql, n) for sql, n in self.by_statement.most_common() if n >= threshold]
+
+
+_current = ContextVar("request_stats", default=None)
+_engines_instrumented = False
+
+
+def current_stats():
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.sql_time += time.perf_counter() - conn.info["query_start"].pop()
+    stats.statements += 1
+    stats.by_statement[statement] += 1
+
+
+def instrument_engines():
+    """Слушает все движки (sync, sync_engine у async, тестовые) — один раз на процесс.
+
+    Вне HTTP-запроса (фоновые потоки, CLI) обработчики ничего не делают.
+    """
+    global _engines_instrumented
+    if not _engines_instrumented:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _engines_instrumented = True
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}"
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик: раз в interval снимает стеки всех потоков.
+
+    Поток сэмплера работает, пока есть хотя бы один профилируемый запрос.
+    Стеки копятся в "folded"-формате (корень;...;лист), который понимают
+    flamegraph.pl и speedscope. Sync-обработчик выполняется в произвольном
+    потоке threadpool, поэтому в профиль запроса попадают все потоки
+    процесса — под нагрузкой в нём видны и соседние запросы.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._active = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self) -> Tally:
+        samples = Tally()
+        with self._lock:
+            self._active.append(samples)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def end(self, samples: Tally):
+        with self._lock:
+            self._active.remove(samples)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                folded = ";".join(reversed(stack))
+                for samples in active:
+                    samples[folded] += 1
+            time.sleep(self.interval)
+
+
+def dump_profile(samples: Tally, path: str) -> int:
+    """Пишет стеки в folded-формате ("стек число" на строку); -> число сэмплов."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return sum(samples.values())
+
+
+class InstrumentationMiddleware:
+    """ASGI-middleware: время по маршрутам, SQL на запрос, N+1, профиль медленных запросов.
+
+    Чистый ASGI (не BaseHTTPMiddleware), чтобы не мешать потоковым ответам
+    и отмене при отключении клиента.
+    """
+
+    def __init__(self, app, registry=default_registry, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD,
+                 profile_slow_ms: float = PROFILE_SLOW_MS, profile_dir: str = PROFILE_DIR,
+                 profile_interval: float = PROFILE_INTERVAL):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.profile_slow_ms = profile_slow_ms
+        self.profile_dir = profile_dir
+        self.sampler = StackSampler(profile_interval) if profile_slow_ms > 0 else None
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+        self.sql_statements = registry.histogram(
+            "http_request_sql_statements", "SQL statements per HTTP request", ("method", "route"),
+            buckets=STATEMENT_BUCKETS)
+        self.sql_time = registry.histogram(
+            "http_request_sql_seconds", "Time spent in SQL per HTTP request", ("method", "route"))
+        self.n_plus_one = registry.counter(
+            "http_request_n_plus_one_total", "Requests repeating one SQL statement N+ times", ("method", "route"))
+        self.profiles = registry.counter(
+            "http_slow_request_profiles_total", "Profiles dumped for slow requests", ("method", "route"))
+        instrument_engines()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        samples = self.sampler.begin() if self.sampler else None
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            if samples is not None:
+                self.sampler.end(samples)
+            self._record(scope, status, elapsed, stats, samples)
+
+    def _record(self, scope, status: int, elapsed: float, stats: RequestStats, samples):
+        # Шаблон пути (/users/{user_id}), а не сам путь — иначе метки не ограничены
+        route = scope.get("route")
+        labels = (scope["method"], route.path if route is not None else "unmatched")
+        self.requests.inc(labels + (str(status),))
+        self.duration.observe(labels, elapsed)
+        self.sql_statements.observe(labels, stats.statements)
+        self.sql_time.observe(labels, stats.sql_time)
+
+        repeated = stats.repeated(self.n_plus_one_threshold)
+        if repeated:
+            self.n_plus_one.inc(labels)
+            sql, count = repeated[0]
+            logger.warning("Possible N+1 in %s %s: %d statements, repeated %d times: %s",
+                           labels[0], labels[1], stats.statements, count, " ".join(sql.split())[:300])
+
+        if samples is not None and elapsed * 1000 >= self.profile_slow_ms:
+            name = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{labels[0]}{labels[1]}").strip("_")
+            path = os.path.join(self.profile_dir,
+                                f"{datetime.now():%Y%m%d-%H%M%S-%f}-{name}-{elapsed * 1000:.0f}ms.folded")
+            sampled = dump_profile(samples, path)
+            self.profiles.inc(labels)
+            logger.info("Slow request %s %s took %.0f ms, profile (%d samples): %s",
+                        labels[0], labels[1], elapsed * 1000, sampled, path)
@@ -1,18 +1,96 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
-logger = logging.getLogger("backend_logger")
-logger.setLevel(logging.INFO)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+# Размер очереди между потоком запроса и фоновым потоком записи
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Что делать при переполненной очереди: drop_new | drop_old | block
+LOG_DROP_POLICY = os.getenv("LOG_DROP_POLICY", "drop_new")
 
-formatter = logging.Formatter(
-    "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
-)
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s - %(message)s"
 
-file_handler = RotatingFileHandler("backend.log", maxBytes=5*1024*1024, backupCount=3)
-file_handler.setFormatter(formatter)
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
 
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler с ограниченной очередью и политикой сброса при переполнении.
+
+    Сами хендлеры (файл, консоль) работают в потоке QueueListener, поэтому
+    поток запроса не ждёт файлового I/O и ротации.
+    """
+
+    def __init__(self, log_queue, policy: str = LOG_DROP_POLICY):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.policy == "drop_old":
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+class LogListener(QueueListener):
+    def stop(self):
+        # Повторная остановка (явная + atexit) не должна падать
+        if self._thread is not None:
+            super().stop()
+
+
+def make_formatter(fmt: str = LOG_FORMAT) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logger(name: str, filename: str, backup_count: int = 3, level: str = LOG_LEVEL,
+                 fmt: str = LOG_FORMAT, queue_size: int = LOG_QUEUE_SIZE,
+                 policy: str = LOG_DROP_POLICY) -> logging.Logger:
+    formatter = make_formatter(fmt)
+
+    file_handler = RotatingFileHandler(
+        filename, maxBytes=5*1024*1024, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = LogListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    # Дописываем то, что осталось в очереди, при завершении процесса
+    atexit.register(listener.stop)
+
+    log = logging.getLogger(name)
+    log.setLevel(level)
+    log.addHandler(DroppingQueueHandler(log_queue, policy))
+    log.listener = listener
+    return log
+
+
+logger = setup_logger("backend_logger", "backend.log")
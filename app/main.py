@@ -1,15 +1,129 @@
-from fastapi import FastAPI
-from app.database import Base, engine
-from app.routers import users
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from app.database import engine, async_engine, replicas, USE_ASYNC_DB, pool_status
+from app.routers import users, users_async, export, logs, chat, favorites, recipes, roles, preferences
+from app.hashing import hasher, HasherBusy
+from app import cache, recipes as recipe_service, recipe_index, ratelimit
+from app.audit import audit
+from app.auth import sweeper
+from app.instrumentation import InstrumentationMiddleware
+from app.idempotency import IdempotencyMiddleware
+from app.ratelimit import RateLimitMiddleware
+from app.metrics import registry, gauge_lines
 
-# Создаём таблицы, если их нет
-Base.metadata.create_all(bind=engine)
+# Схема БД ведётся миграциями (alembic upgrade head), при старте её не проверяем
+app = FastAPI(title="Local Recipe Assistant API", default_response_class=ORJSONResponse)
+# Повторы POST/PUT/PATCH/DELETE с тем же Idempotency-Key получают сохранённый ответ
+app.add_middleware(IdempotencyMiddleware)
+# 429 сверх RATE_LIMITS/RATE_LIMITS_GLOBAL — раньше, чем запрос дойдёт до хэширования пароля или AI
+app.add_middleware(RateLimitMiddleware)
+# Время по маршрутам, SQL на запрос, N+1; PROFILE_SLOW_MS>0 — профили медленных запросов.
+# Добавлен последним — внешний слой, меряет и ответы из IdempotencyMiddleware
+app.add_middleware(InstrumentationMiddleware)
 
-app = FastAPI(title="Local Recipe Assistant API")
+# Подключаем маршруты (USE_ASYNC_DB=1 — async-версия тех же эндпоинтов)
+if USE_ASYNC_DB:
+    app.include_router(users_async.router)
+else:
+    app.include_router(users.router)
+app.include_router(export.router)
+app.include_router(logs.router)
+app.include_router(roles.router)
+app.include_router(chat.router)
+app.include_router(favorites.router)
+app.include_router(preferences.router)
+app.include_router(recipes.router)
 
-# Подключаем маршруты
-app.include_router(users.router)
+@app.exception_handler(HasherBusy)
+def hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.on_event("startup")
+def start_audit():
+    audit.start()
+
+@app.on_event("startup")
+def start_session_sweeper():
+    sweeper.start()
+
+@app.on_event("startup")
+def start_replica_health():
+    replicas.start()
+
+@app.on_event("startup")
+def start_rate_limiter():
+    # Множители лимитов из roles.rate_limit_factor, дальше — перечитывание в фоне
+    ratelimit.limiter.start()
+
+@app.on_event("startup")
+def start_recipe_index():
+    # Загрузка каталога в индекс рекомендаций, дальше — обновления в фоне
+    recipe_index.refresher.start()
+
+@app.on_event("shutdown")
+def shutdown_hasher():
+    hasher.shutdown()
+
+@app.on_event("shutdown")
+def stop_session_sweeper():
+    sweeper.stop()
+
+@app.on_event("shutdown")
+def stop_replica_health():
+    replicas.stop()
+
+@app.on_event("shutdown")
+def stop_rate_limiter():
+    ratelimit.limiter.stop()
+
+@app.on_event("shutdown")
+def stop_recipe_index():
+    recipe_index.refresher.stop()
+
+@app.on_event("shutdown")
+def stop_audit():
+    # Дописываем в logs всё, что осталось в буфере
+    audit.stop()
 
 @app.get("/")
 def root():
     return {"message": "API is working locally!"}
+
+@app.get("/db/pool")
+def db_pool():
+    # Статистика пула на текущий воркер — для подбора DB_POOL_SIZE/DB_MAX_OVERFLOW
+    stats = {"sync": pool_status(engine)}
+    if async_engine is not None:
+        stats["async"] = pool_status(async_engine.sync_engine)
+    if replicas:
+        stats["replicas"] = [{**status, **pool_status(engine)}
+                             for status, engine in zip(replicas.status(), replicas.engines)]
+    return stats
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"backend": type(cache.cache).__name__, **cache.cache.stats.as_dict()}
+
+@app.get("/audit/stats")
+def audit_stats():
+    return audit.stats()
+
+@app.get("/recipes/stats")
+def recipes_stats():
+    return {**recipe_service.generator.stats(), "streams_rejected": recipe_service.stream_limit.rejected,
+            "index": recipe_index.index.stats()}
+
+def collect_runtime_metrics() -> list:
+    pool = {(name,): value for name, value in pool_status(engine).items() if isinstance(value, (int, float))}
+    cache_stats = {(name,): value for name, value in cache.cache.stats.as_dict().items()
+                   if isinstance(value, (int, float))}
+    replica_health = {(status["url"],): int(status["healthy"]) for status in replicas.status()}
+    return (gauge_lines("db_pool", "Sync connection pool status", pool, ("stat",))
+            + gauge_lines("cache", "Application cache statistics", cache_stats, ("stat",))
+            + gauge_lines("db_replica_healthy", "Read replica in rotation (1) or not (0)", replica_health, ("replica",)))
+
+registry.add_collector(collect_runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,24 +1,161 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, func
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, String, Text, Enum, ForeignKey, Index, UniqueConstraint, TIMESTAMP, func, text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
 from app.database import Base
 
+
+class precise_now(FunctionElement):
+    """CURRENT_TIMESTAMP с той же точностью, что у PreciseTimestamp."""
+    type = TIMESTAMP()
+    inherit_cache = True
+
+
+@compiles(precise_now)
+def _precise_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(precise_now, "mysql")
+def _precise_now_mysql(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP(6)"
+
+
+# Время, по которому идут курсоры (время, id): TIMESTAMP в MySQL без fsp
+# округляет до секунд, и значение из курсора перестаёт совпадать с хранимым
+PreciseTimestamp = TIMESTAMP().with_variant(mysql.TIMESTAMP(fsp=6), "mysql")
+
 class Role(Base):
     __tablename__ = "roles"
     __table_args__ = {'extend_existing': True}
 
     role_id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, nullable=False)
+    # Множитель лимитов запросов на пользователя (app/ratelimit.py); NULL — без лимита
+    rate_limit_factor = Column(Float, nullable=True, default=1.0, server_default=text("1"))
 
-    users = relationship("User", back_populates="role")
+    # passive_deletes: при удалении роли не подгружать её пользователей —
+    # ссылки на роль проверяет delete_role (одним EXISTS) и внешний ключ
+    users = relationship("User", back_populates="role", passive_deletes=True)
 
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Проверка "роль используется" (EXISTS) и подсчёт пользователей по ролям
+        Index("ix_users_role_id", "role_id"),
+    )
     user_id = Column(Integer, primary_key=True, index=True)
     role_id = Column(Integer, ForeignKey("roles.role_id"), nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    # Растёт на 1 при каждом изменении через API — из неё ETag (app/conditional.py)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
     role = relationship("Role", back_populates="users")
+
+
+class Session(Base):
+    __tablename__ = "sessions"
+    __table_args__ = (
+        # Для фоновой очистки просроченных сессий
+        Index("ix_sessions_expired_at", "expired_at"),
+        # Сессии пользователя по порядку: WHERE user_id = ? AND session_id > ?
+        Index("ix_sessions_user_id_session_id", "user_id", "session_id"),
+    )
+    session_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    token = Column(String(255), unique=True, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    expired_at = Column(TIMESTAMP, nullable=True)
+
+
+class UserPreference(Base):
+    __tablename__ = "user_preferences"
+    __table_args__ = (
+        # Одна запись на пользователя: чтение/обновление/удаление идут по user_id
+        UniqueConstraint("user_id", name="uq_user_preferences_user_id"),
+    )
+    preference_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    cuisine = Column(String(100))
+    max_cooking_time = Column(Integer)
+    difficulty = Column(Enum("easy", "medium", "hard", name="difficulty"))
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
+
+class Favorite(Base):
+    __tablename__ = "favorites"
+    __table_args__ = (
+        UniqueConstraint("user_id", "recipe_hash"),
+        # Список избранного пользователя от новых к старым
+        Index("ix_favorites_user_created", "user_id", "created_at", "favorite_id"),
+    )
+    favorite_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    recipe_hash = Column(String(255), nullable=False)
+    # Как и у chat_messages: точное значение для курсора (created_at, favorite_id)
+    created_at = Column(PreciseTimestamp, default=datetime.now, server_default=precise_now())
+
+
+class Recipe(Base):
+    """Каталог рецептов для рекомендаций (индекс — app/recipe_index.py)."""
+    __tablename__ = "recipes"
+    __table_args__ = (
+        # Инкрементальное обновление индекса: WHERE (updated_at, recipe_id) > (?, ?)
+        Index("ix_recipes_updated", "updated_at", "recipe_id"),
+    )
+    recipe_id = Column(Integer, primary_key=True, index=True)
+    # Тот же ключ, что у сгенерированных рецептов и favorites.recipe_hash
+    recipe_hash = Column(String(64), unique=True, nullable=False)
+    title = Column(String(255), nullable=False)
+    cuisine = Column(String(100), nullable=False)
+    cooking_time = Column(Integer, nullable=False)
+    difficulty = Column(Enum("easy", "medium", "hard", name="difficulty"), nullable=False)
+    updated_at = Column(TIMESTAMP, default=datetime.now, onupdate=datetime.now, server_default=func.now())
+
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id", "user_id"),
+    )
+    session_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    started_at = Column(TIMESTAMP, server_default=func.now())
+    ended_at = Column(TIMESTAMP, nullable=True)
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Лента сессии по времени: WHERE session_id = ? AND (sent_at, message_id) > (?, ?)
+        Index("ix_chat_messages_session_sent", "session_id", "sent_at", "message_id"),
+        # Проверка внешнего ключа при удалении пользователя
+        Index("ix_chat_messages_user_id", "user_id"),
+    )
+    message_id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("chat_sessions.session_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    message = Column(Text, nullable=False)
+    # Время ставит приложение, хранится с микросекундами (PreciseTimestamp): значение
+    # в курсоре совпадает с хранимым, и (sent_at, message_id) > (...) не теряет сообщения
+    sent_at = Column(PreciseTimestamp, default=datetime.now, server_default=precise_now())
+
+
+class Log(Base):
+    __tablename__ = "logs"
+    __table_args__ = (
+        Index("ix_logs_user_id_log_id", "user_id", "log_id"),
+        Index("ix_logs_created_at", "created_at"),
+    )
+    log_id = Column(Integer, primary_key=True, index=True)
+    # SET NULL: записи журнала не должны мешать удалению пользователя
+    user_id = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
+    action = Column(String(255), nullable=False)
+    details = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
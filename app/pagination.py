@@ -0,0 +1,111 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, NamedTuple, Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+
+
+class PageParams(NamedTuple):
+    after: Any
+    limit: int
+
+
+def encode_cursor(key) -> str:
+    raw = json.dumps({"k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))["k"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def is_id(key) -> bool:
+    # bool — подкласс int, но первичным ключом не бывает
+    return type(key) is int
+
+
+def is_id_pair(key) -> bool:
+    """[число, id] — например, (cooking_time, recipe_id) индекса рецептов."""
+    return isinstance(key, list) and len(key) == 2 and all(map(is_id, key))
+
+
+def is_timestamp_key(key) -> bool:
+    """[ISO-время, id] — курсор по (время создания, первичный ключ)."""
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[0], str) or not is_id(key[1]):
+        return False
+    try:
+        datetime.fromisoformat(key[0])
+    except ValueError:
+        return False
+    return True
+
+
+def cursor_params(check: Callable[[Any], bool] = None):
+    """Зависимость FastAPI: ?cursor=...&limit=... -> PageParams.
+
+    check — форма ключа курсора для эндпоинта: курсор чужого эндпоинта или
+    подделанный — 400, а не 500 из глубины запроса. None — без проверки.
+    """
+    def dependency(
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ) -> PageParams:
+        try:
+            after = decode_cursor(cursor) if cursor else None
+            if after is not None and check is not None and not check(after):
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return PageParams(after, limit)
+
+    return dependency
+
+
+# Курсор — первичный ключ (users, logs)
+page_params = cursor_params(is_id)
+
+
+def keyset(query, column, after=None, limit: int = DEFAULT_PAGE_SIZE, descending: bool = False):
+    """WHERE column > after ORDER BY column LIMIT limit + 1.
+
+    Работает и для Query, и для select(). Вместо OFFSET используется индекс
+    по column, поэтому глубокие страницы стоят столько же, сколько первая.
+    Лишняя строка нужна только чтобы понять, есть ли следующая страница.
+    descending=True — от новых к старым (column < after ORDER BY column DESC).
+    column может быть кортежем колонок, тогда after — кортеж значений.
+    """
+    columns = column if isinstance(column, tuple) else (column,)
+    if after is not None:
+        # Составной ключ сравнивается как row value: (a, b) > (:a, :b)
+        key = tuple_(*columns) if len(columns) > 1 else column
+        after = tuple_(*after) if len(columns) > 1 else after
+        query = query.filter(key < after if descending else key > after)
+    order = [c.desc() if descending else c for c in columns]
+    return query.order_by(*order).limit(clamp_limit(limit) + 1)
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def make_page(rows, limit: int, key: Callable[[Any], Any]) -> Page:
+    limit = clamp_limit(limit)
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, encode_cursor(key(rows[-1])))
+    return Page(rows, None)
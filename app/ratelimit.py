@@ -0,0 +1,339 @@
+import math
+import os
+import threading
+import time
+from typing import NamedTuple
+from starlette.concurrency import run_in_threadpool
+from app.cache import TTLCache
+from app.database import SessionLocal
+from app.logger import logger
+from app.metrics import registry
+import app.crud.roles as roles_crud
+import app.crud.sessions as sessions_crud
+import app.crud.user as users_crud
+
+# Лимиты на клиента: "МЕТОД путь=запросов/секунд", через запятую. Путь — точный
+# (дорогие маршруты без параметров в пути); запросов — ёмкость корзины (всплеск)
+RATE_LIMITS = os.getenv("RATE_LIMITS", "POST /users/=10/60,POST /users/bulk=2/60,POST /users/login=20/60,"
+                                       "POST /recipes/generate=20/60,POST /recipes/generate/stream=20/60")
+# Лимиты на маршрут целиком, по всем клиентам воркера (или всем воркерам — с общим хранилищем)
+RATE_LIMITS_GLOBAL = os.getenv("RATE_LIMITS_GLOBAL", "POST /recipes/generate=300/60,"
+                                                     "POST /recipes/generate/stream=300/60")
+# Как часто перечитывать roles.rate_limit_factor (секунды)
+RATE_LIMIT_ROLES_REFRESH = float(os.getenv("RATE_LIMIT_ROLES_REFRESH", "60"))
+# Корзин в памяти воркера не больше этого: полные (давно не тронутые) выбрасываются первыми
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+rejected = registry.counter("rate_limit_rejected_total", "Requests rejected with 429 by rate limiting",
+                            ("route", "scope"))
+
+
+class Limit(NamedTuple):
+    rate: float   # токенов в секунду
+    burst: float  # ёмкость корзины
+
+
+def parse_limits(value: str) -> dict:
+    """"POST /users/=10/60,..." -> {("POST", "/users/"): Limit(10 / 60, 10)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            route, _, spec = item.rpartition("=")
+            method, path = route.split()
+            count, seconds = (float(number) for number in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"Rate limit must look like 'METHOD /path=count/seconds': {item!r}")
+        if count < 1 or seconds <= 0:
+            raise ValueError(f"Rate limit needs count >= 1 and seconds > 0: {item!r}")
+        limits[(method.upper(), path)] = Limit(count / seconds, count)
+    return limits
+
+
+class BucketStore:
+    """Хранилище корзин: take() списывает токен, если он есть.
+
+    -> (разрешено, через сколько секунд появится токен). Состояние корзины
+    задаётся вызывающим (rate, burst) — смена лимита не требует сброса.
+    """
+
+    def take(self, key: str, rate: float, burst: float) -> tuple:
+        raise NotImplementedError
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> tuple:
+    # Общий для LocalBucketStore и подделки Redis шаг алгоритма
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0.0
+    return tokens, False, (1 - tokens) / rate
+
+
+class LocalBucketStore(BucketStore):
+    """Корзины в памяти воркера: словарь и блокировка, без ввода-вывода."""
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS, clock=time.monotonic):
+        self.max_buckets = max_buckets
+        self.clock = clock
+        # key -> [токены, время обновления, время, когда корзина снова полная]
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key: str, rate: float, burst: float) -> tuple:
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_buckets:
+                    self._prune(now)
+                bucket = self._buckets[key] = [burst, now, now]
+            # То же, что _refill, без вызова функции — это горячий путь каждого запроса
+            tokens = bucket[0] + (now - bucket[1]) * rate
+            if tokens > burst:
+                tokens = burst
+            bucket[1] = now
+            if tokens >= 1:
+                tokens -= 1
+                bucket[0], bucket[2] = tokens, now + (burst - tokens) / rate
+                return True, 0.0
+            bucket[0], bucket[2] = tokens, now + (burst - tokens) / rate
+            return False, (1 - tokens) / rate
+
+    def _prune(self, now: float):
+        # Полная корзина — то же, что её отсутствие; если мало, то и самые старые
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        excess = len(self._buckets) - self.max_buckets // 2
+        for key in list(self._buckets)[:max(0, excess)]:
+            del self._buckets[key]
+
+
+# KEYS[1] — корзина; ARGV: rate, burst, now. Дробные числа — строками: Lua-числа Redis округляет
+TOKEN_BUCKET_LUA = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed, retry_after = 0, 0
+if tokens >= 1 then
+    tokens, allowed = tokens - 1, 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class SharedBucketStore(BucketStore):
+    """Корзины в Redis, общие для всех воркеров: проверка и списание — один атомарный скрипт.
+
+    client — redis.Redis или совместимый объект с eval(). Время — часы воркера
+    (time.time), поэтому часы серверов должны быть синхронизированы.
+    """
+
+    def __init__(self, client, prefix: str = "nra:rate:"):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key: str, rate: float, burst: float) -> tuple:
+        allowed, retry_after = self.client.eval(TOKEN_BUCKET_LUA, 1, self.prefix + key, rate, burst, time.time())
+        return bool(int(allowed)), float(retry_after)
+
+
+class InMemorySharedBuckets:
+    """Подделка Redis для SharedBucketStore в тестах и на одном процессе.
+
+    Lua не исполняет: eval() выполняет тот же алгоритм на Python под блокировкой.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def eval(self, script, numkeys, key, rate, burst, now):
+        with self._lock:
+            tokens, updated = self._data.get(key, (burst, now))
+            tokens, allowed, retry_after = _refill(tokens, updated, now, rate, burst)
+            self._data[key] = (tokens, now)
+        return [int(allowed), repr(retry_after)]
+
+
+class RateLimiter:
+    """Лимиты запросов: на клиента (с множителем роли) и на маршрут целиком.
+
+    Сначала проверяется корзина клиента, потом общая: запросы, отклонённые
+    по лимиту клиента, не расходуют общий лимит. Множители ролей —
+    roles.rate_limit_factor, перечитываются фоновым потоком.
+    """
+
+    def __init__(self, limits: dict = None, global_limits: dict = None, store: BucketStore = None,
+                 session_factory=SessionLocal, interval: float = RATE_LIMIT_ROLES_REFRESH):
+        self.limits = parse_limits(RATE_LIMITS) if limits is None else limits
+        self.global_limits = parse_limits(RATE_LIMITS_GLOBAL) if global_limits is None else global_limits
+        self.routes = frozenset(self.limits) | frozenset(self.global_limits)
+        # route -> (лимит клиента, общий лимит, "МЕТОД путь") — один поиск в словаре на запрос
+        self._rules = {route: (self.limits.get(route), self.global_limits.get(route), " ".join(route))
+                       for route in self.routes}
+        self.store = store if store is not None else LocalBucketStore()
+        self.session_factory = session_factory
+        self.interval = interval
+        # role_id -> множитель; роли нет в словаре — 1, None — без лимита на клиента
+        self.role_factors = {}
+        # Токены, которых нет в БД: не переспрашивать о них БД на каждом запросе
+        self.unknown_tokens = TTLCache(maxsize=RATE_LIMIT_MAX_BUCKETS, ttl=interval)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self, method: str, path: str, client: str, role_id: int = None):
+        """-> None, если запрос можно выполнить, иначе через сколько секунд повторить."""
+        rule = self._rules.get((method, path))
+        if rule is None:
+            return None
+        limit, global_limit, route = rule
+        if limit is not None:
+            factor = self.role_factors.get(role_id, 1.0)
+            if factor is not None:
+                allowed, retry_after = self.store.take(route + "|" + client, limit.rate * factor,
+                                                       max(1.0, limit.burst * factor))
+                if not allowed:
+                    rejected.inc((route, "client"))
+                    return retry_after
+        if global_limit is not None:
+            allowed, retry_after = self.store.take(route + "|*", global_limit.rate, global_limit.burst)
+            if not allowed:
+                rejected.inc((route, "global"))
+                return retry_after
+        return None
+
+    def load_roles(self) -> dict:
+        try:
+            with self.session_factory() as db:
+                factors = roles_crud.get_rate_limit_factors(db)
+        except Exception:
+            logger.exception("Rate limit factors load failed")
+            return self.role_factors
+        for role_id, factor in list(factors.items()):
+            if factor is not None and factor <= 0:
+                logger.warning("Ignoring non-positive rate_limit_factor=%s for role_id=%s", factor, role_id)
+                del factors[role_id]
+        self.role_factors = factors
+        return factors
+
+    def resolve_token(self, token: str):
+        """Токена нет в кэше (выдан другим воркером, истёк TTL) — один раз сверить с БД.
+
+        Действующий токен и его пользователь попадают в кэши, дальше identify
+        обходится без БД; неизвестный запоминается в unknown_tokens.
+        """
+        if self.unknown_tokens.get(token) is not None:
+            return None
+        try:
+            with self.session_factory() as db:
+                user_id = sessions_crud.resolve_token(db, token)
+                if user_id is not None:
+                    users_crud.get_user(db, user_id)
+        except Exception:
+            logger.exception("Rate limit token resolve failed")
+            return None
+        if user_id is None:
+            self.unknown_tokens.set(token, True)
+        return user_id
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.load_roles()
+
+    def start(self):
+        if self._thread is None:
+            self.load_roles()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rate-limit-roles", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def _header(scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def bearer_token(scope):
+    authorization = _header(scope, b"authorization")
+    if authorization:
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return token
+    return None
+
+
+def identify(scope) -> tuple:
+    """-> (ключ клиента, role_id | None) только по кэшам, без обращения к БД.
+
+    Пользователь — если его токен уже проверен (есть в кэше токенов; холодный
+    кэш заполняет RateLimiter.resolve_token), роль — из кэша пользователей.
+    Иначе клиент — IP: случайные токены не дают новых корзин. За прокси
+    нужен uvicorn --proxy-headers.
+    """
+    token = bearer_token(scope)
+    if token is not None:
+        user_id = sessions_crud.cached_user_id(token)
+        if user_id is not None:
+            return f"user:{user_id}", users_crud.cached_role_id(user_id)
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else ""), None
+
+
+async def _too_many_requests(send, retry_after: float):
+    body = b'{"detail":"Too many requests"}'
+    await send({"type": "http.response.start", "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                            (b"retry-after", str(max(1, math.ceil(retry_after))).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """429 с Retry-After для запросов сверх лимита (см. RateLimiter).
+
+    Маршрут без лимита — одна проверка по множеству; с лимитом — кэши и
+    корзины в памяти, микросекунды (benchmarks/bench_ratelimit.py). Токен не
+    из кэша — один запрос к БД в пуле потоков, дальше снова из кэша.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = None):
+        self.app = app
+        self._limiter = limiter
+
+    @property
+    def limiter(self) -> RateLimiter:
+        # По умолчанию — модульный limiter: его же запускает app.main
+        return self._limiter if self._limiter is not None else limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            current = self.limiter
+            if (scope["method"], scope["path"]) in current.routes:
+                token = bearer_token(scope)
+                if token is not None and sessions_crud.cached_user_id(token) is None:
+                    # Иначе пользователь с чужим для этого воркера токеном делил бы корзину IP
+                    await run_in_threadpool(current.resolve_token, token)
+                client, role_id = identify(scope)
+                retry_after = current.check(scope["method"], scope["path"], client, role_id)
+                if retry_after is not None:
+                    await _too_many_requests(send, retry_after)
+                    return
+        await self.app(scope, receive, send)
+
+
+limiter = RateLimiter()
@@ -0,0 +1,272 @@
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+from itertools import repeat
+from app.crud import recipes as recipes_crud
+from app.database import SessionLocal
+from app.logger import logger
+
+# Как часто подтягивать изменённые рецепты (секунды)
+RECIPE_INDEX_REFRESH = float(os.getenv("RECIPE_INDEX_REFRESH", "30"))
+# Запас назад от последнего updated_at: строки, закоммиченные позже, но со
+# старым временем, тоже попадут в индекс (повторная вставка ничего не меняет)
+RECIPE_INDEX_OVERLAP = float(os.getenv("RECIPE_INDEX_OVERLAP", "5"))
+# Как часто сверять id индекса с таблицей (секунды): удаление updated_at не оставляет
+RECIPE_INDEX_RECONCILE = float(os.getenv("RECIPE_INDEX_RECONCILE", "300"))
+
+DIFFICULTY_CODES = {"easy": 1, "medium": 2, "hard": 3}
+ANY = 0
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+
+
+def _key(cooking_time: int, recipe_id: int) -> int:
+    # Списки отсортированы по (cooking_time, recipe_id) — одно int64 на рецепт
+    return cooking_time << _ID_BITS | recipe_id
+
+
+def _normalize_cuisine(cuisine: str) -> str:
+    # Как в recipes.normalize_request
+    return cuisine.strip().lower()
+
+
+def _discard(postings: array, key: int):
+    i = bisect_left(postings, key)
+    if i < len(postings) and postings[i] == key:
+        del postings[i]
+
+
+class RecipeIndex:
+    """Рецепты в памяти: какие подходят под кухню, сложность и максимальное время.
+
+    Инвертированные списки по кухне, по сложности и по их паре (пересечение
+    посчитано заранее) плюс общий список; каждый — array int64, отсортированный
+    по времени приготовления. Запрос — выбор списка, bisect по времени и срез:
+    O(log n + limit) без просмотра каталога. Хранятся только id и признаки,
+    карточки берутся из БД по первичному ключу.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cuisine_codes = {}
+        # (код кухни | ANY, код сложности | ANY) -> array("q") ключей _key()
+        self._postings = {}
+        # Признаки по recipe_id — чтобы при изменении рецепта найти старые ключи; 0 — рецепта нет
+        self._cuisine = array("H")
+        self._difficulty = array("B")
+        self._time = array("l")
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _cuisine_code(self, cuisine: str) -> int:
+        cuisine = _normalize_cuisine(cuisine)
+        code = self._cuisine_codes.get(cuisine)
+        if code is None:
+            code = self._cuisine_codes[cuisine] = len(self._cuisine_codes) + 1
+        return code
+
+    def _ensure_capacity(self, recipe_id: int):
+        missing = recipe_id + 1 - len(self._cuisine)
+        if missing > 0:
+            # С запасом, чтобы не расширять массивы на каждый новый id
+            missing = max(missing, len(self._cuisine) // 4)
+            self._cuisine.extend(repeat(0, missing))
+            self._difficulty.extend(repeat(0, missing))
+            self._time.extend(repeat(0, missing))
+
+    def _lists(self, cuisine: int, difficulty: int) -> tuple:
+        return (ANY, ANY), (cuisine, ANY), (ANY, difficulty), (cuisine, difficulty)
+
+    def load(self, rows):
+        """Строит индекс заново из (recipe_id, cuisine, cooking_time, difficulty, ...).
+
+        Пока строится новый, запросы отвечает старый; подмена — под блокировкой.
+        """
+        fresh = RecipeIndex()
+        postings = {}
+        for recipe_id, cuisine, cooking_time, difficulty, *_ in rows:
+            cuisine_code, difficulty_code = fresh._cuisine_code(cuisine), DIFFICULTY_CODES[difficulty]
+            fresh._ensure_capacity(recipe_id)
+            fresh._cuisine[recipe_id] = cuisine_code
+            fresh._difficulty[recipe_id] = difficulty_code
+            fresh._time[recipe_id] = cooking_time
+            key = _key(cooking_time, recipe_id)
+            for pair in fresh._lists(cuisine_code, difficulty_code):
+                postings.setdefault(pair, []).append(key)
+            fresh.size += 1
+        fresh._postings = {pair: array("q", sorted(keys)) for pair, keys in postings.items()}
+        with self._lock:
+            self.__dict__.update({name: value for name, value in fresh.__dict__.items() if name != "_lock"})
+        return self.size
+
+    def upsert(self, rows) -> int:
+        """Добавляет новые и переставляет изменённые рецепты; -> сколько изменилось."""
+        changed = 0
+        for recipe_id, cuisine, cooking_time, difficulty, *_ in rows:
+            # Блокировка на строку: запросы не ждут всю пачку
+            with self._lock:
+                cuisine_code, difficulty_code = self._cuisine_code(cuisine), DIFFICULTY_CODES[difficulty]
+                self._ensure_capacity(recipe_id)
+                if (self._cuisine[recipe_id], self._difficulty[recipe_id], self._time[recipe_id]) == \
+                        (cuisine_code, difficulty_code, cooking_time):
+                    continue
+                self._remove(recipe_id)
+                self._cuisine[recipe_id] = cuisine_code
+                self._difficulty[recipe_id] = difficulty_code
+                self._time[recipe_id] = cooking_time
+                key = _key(cooking_time, recipe_id)
+                for pair in self._lists(cuisine_code, difficulty_code):
+                    insort(self._postings.setdefault(pair, array("q")), key)
+                self.size += 1
+                changed += 1
+        return changed
+
+    def remove(self, recipe_id: int):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def ids(self) -> list:
+        with self._lock:
+            return [recipe_id for recipe_id, code in enumerate(self._cuisine) if code]
+
+    def _remove(self, recipe_id: int):
+        if recipe_id >= len(self._cuisine) or not self._cuisine[recipe_id]:
+            return
+        key = _key(self._time[recipe_id], recipe_id)
+        for pair in self._lists(self._cuisine[recipe_id], self._difficulty[recipe_id]):
+            _discard(self._postings[pair], key)
+        self._cuisine[recipe_id] = self._difficulty[recipe_id] = self._time[recipe_id] = 0
+        self.size -= 1
+
+    def query(self, cuisine: str = None, difficulty: str = None, max_cooking_time: int = None,
+              after: tuple = None, limit: int = 20) -> list:
+        """-> до limit пар (cooking_time, recipe_id) от быстрых к долгим.
+
+        after — последняя пара предыдущей страницы. Фильтр None — любое значение.
+        """
+        with self._lock:
+            cuisine_code = ANY
+            if cuisine is not None:
+                cuisine_code = self._cuisine_codes.get(_normalize_cuisine(cuisine))
+                if cuisine_code is None:
+                    return []
+            postings = self._postings.get((cuisine_code, DIFFICULTY_CODES[difficulty] if difficulty else ANY))
+            if not postings:
+                return []
+            lo = bisect_right(postings, _key(*after)) if after is not None else 0
+            hi = len(postings) if max_cooking_time is None else \
+                bisect_right(postings, _key(max_cooking_time, _ID_MASK))
+            keys = postings[lo:min(hi, lo + limit)]
+        return [(key >> _ID_BITS, key & _ID_MASK) for key in keys]
+
+    def stats(self) -> dict:
+        return {"recipes": self.size, "cuisines": len(self._cuisine_codes), "lists": len(self._postings)}
+
+
+class RecipeIndexRefresher:
+    """Загружает индекс из таблицы recipes и фоновым потоком подтягивает изменения по updated_at.
+
+    Удалённые строки по updated_at не найти: раз в reconcile_interval секунд
+    id индекса сверяются с первичным ключом таблицы, лишние выбрасываются.
+    """
+
+    def __init__(self, index: RecipeIndex, session_factory=SessionLocal, interval: float = RECIPE_INDEX_REFRESH,
+                 batch_size: int = recipes_crud.INDEX_BATCH_SIZE, reconcile_interval: float = RECIPE_INDEX_RECONCILE):
+        self.index = index
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.reconcile_interval = reconcile_interval
+        self.watermark = None
+        self.loaded = False
+        self.reconciled_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _rows(self, db, since=None):
+        after = None
+        while True:
+            rows = recipes_crud.get_recipes_changed_since(db, since, after, self.batch_size)
+            if not rows:
+                return
+            yield from rows
+            after = (rows[-1].updated_at, rows[-1].recipe_id)
+            if self.watermark is None or after[0] > self.watermark:
+                self.watermark = after[0]
+
+    def load(self) -> int:
+        try:
+            with self.session_factory() as db:
+                count = self.index.load(self._rows(db))
+        except Exception:
+            logger.exception("Recipe index load failed")
+            return 0
+        self.loaded = True
+        self.reconciled_at = time.monotonic()
+        logger.info("Recipe index loaded: %s recipes", count)
+        return count
+
+    def _ids(self, db):
+        after = None
+        while True:
+            ids = recipes_crud.get_recipe_ids(db, after, self.batch_size)
+            if not ids:
+                return
+            yield from ids
+            after = ids[-1]
+
+    def reconcile(self) -> int:
+        """Выбрасывает из индекса рецепты, которых нет в таблице; -> сколько выброшено."""
+        # Снимок индекса — до чтения таблицы: всё в нём уже закоммичено, и если строки
+        # не оказалось в таблице, её удалили. Добавленные позже в сверку не попадают
+        indexed = self.index.ids()
+        with self.session_factory() as db:
+            existing = set(self._ids(db))
+        removed = [recipe_id for recipe_id in indexed if recipe_id not in existing]
+        for recipe_id in removed:
+            self.index.remove(recipe_id)
+        self.reconciled_at = time.monotonic()
+        if removed:
+            logger.info("Recipe index dropped %s deleted recipes", len(removed))
+        return len(removed)
+
+    def refresh(self) -> int:
+        if not self.loaded:
+            return self.load()
+        since = self.watermark - timedelta(seconds=RECIPE_INDEX_OVERLAP) if self.watermark else None
+        try:
+            with self.session_factory() as db:
+                changed = self.index.upsert(self._rows(db, since))
+            if time.monotonic() - self.reconciled_at >= self.reconcile_interval:
+                changed += self.reconcile()
+            return changed
+        except Exception:
+            logger.exception("Recipe index refresh failed")
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        """Первая загрузка — сразу, чтобы воркер не отвечал пустыми рекомендациями."""
+        if self._thread is None:
+            self.load()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="recipe-index-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+index = RecipeIndex()
+refresher = RecipeIndexRefresher(index)
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from app.cache import TTLCache
+from app.logger import logger
+
+RECIPE_CACHE_TTL = float(os.getenv("RECIPE_CACHE_TTL", "3600"))
+RECIPE_CACHE_MAXSIZE = int(os.getenv("RECIPE_CACHE_MAXSIZE", "5000"))
+# Задержка фейкового AI-провайдера (секунды) — для офлайн-разработки и тестов
+FAKE_AI_LATENCY = float(os.getenv("FAKE_AI_LATENCY", "1.0"))
+FAKE_AI_TOKEN_DELAY = float(os.getenv("FAKE_AI_TOKEN_DELAY", "0.02"))
+# Сколько потоковых генераций один пользователь может держать одновременно
+RECIPE_STREAMS_PER_USER = int(os.getenv("RECIPE_STREAMS_PER_USER", "2"))
+
+PREFERENCE_FIELDS = ("cuisine", "max_cooking_time", "difficulty")
+
+
+def normalize_request(prompt: str, preferences: dict = None) -> dict:
+    prefs = {k: (preferences or {}).get(k) for k in PREFERENCE_FIELDS}
+    if prefs["cuisine"]:
+        prefs["cuisine"] = prefs["cuisine"].strip().lower()
+    return {"prompt": " ".join(prompt.lower().split()), "preferences": prefs}
+
+
+def recipe_hash(prompt: str, preferences: dict = None) -> str:
+    """Ключ рецепта: sha256 нормализованных prompt + предпочтений.
+
+    Это же значение сохраняется в favorites.recipe_hash.
+    """
+    raw = json.dumps(normalize_request(prompt, preferences), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RecipeProvider:
+    """Внешний AI API генерации рецептов."""
+
+    async def generate(self, prompt: str, preferences: dict) -> dict:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, preferences: dict):
+        """Async-генератор событий: {"delta": str}, {"partial": dict}, в конце {"recipe": dict}.
+
+        По умолчанию — без промежуточных событий, одним готовым рецептом.
+        """
+        yield {"recipe": await self.generate(prompt, preferences)}
+
+
+class FakeRecipeProvider(RecipeProvider):
+    """latency — время до первого токена, token_delay — пауза между токенами."""
+
+    STREAM_FIELDS = ("title", "ingredients", "steps")
+
+    def __init__(self, latency: float = FAKE_AI_LATENCY, token_delay: float = FAKE_AI_TOKEN_DELAY):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt: str, preferences: dict) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._recipe(prompt, preferences)
+
+    async def stream(self, prompt: str, preferences: dict):
+        self.calls += 1
+        finished = False
+        try:
+            await asyncio.sleep(self.latency)
+            recipe = self._recipe(prompt, preferences)
+            for field in self.STREAM_FIELDS:
+                value = recipe[field]
+                text = value if isinstance(value, str) else "\n".join(value)
+                for token in text.split(" "):
+                    yield {"delta": token + " "}
+                    await asyncio.sleep(self.token_delay)
+                yield {"partial": {field: value}}
+            finished = True
+            yield {"recipe": recipe}
+        finally:
+            # Закрыли до конца — клиент ушёл, вызов отменён
+            if not finished:
+                self.cancelled += 1
+
+    @staticmethod
+    def _recipe(prompt: str, preferences: dict) -> dict:
+        cuisine = preferences.get("cuisine") or "home"
+        return {
+            "title": f"{cuisine.title()} {prompt}".strip(),
+            "cuisine": cuisine,
+            "difficulty": preferences.get("difficulty") or "easy",
+            "cooking_time": preferences.get("max_cooking_time") or 30,
+            "ingredients": [f"ingredient {i}" for i in range(1, 6)],
+            "steps": [f"step {i}" for i in range(1, 4)],
+        }
+
+
+class RecipeGenerator:
+    """Кэш (LRU+TTL) и single-flight поверх провайдера.
+
+    Одинаковые (после нормализации) запросы, пришедшие одновременно, ждут
+    один и тот же вызов провайдера. Отмена одного из ожидающих (клиент
+    отключился) не отменяет вызов для остальных.
+    """
+
+    def __init__(self, provider: RecipeProvider, cache: TTLCache = None):
+        self.provider = provider
+        self.cache = cache if cache is not None else TTLCache(maxsize=RECIPE_CACHE_MAXSIZE, ttl=RECIPE_CACHE_TTL)
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+
+    async def generate(self, prompt: str, preferences: dict = None):
+        """-> (recipe_hash, recipe, cached)"""
+        request = normalize_request(prompt, preferences)
+        key = recipe_hash(prompt, preferences)
+        recipe = self.cache.get(key)
+        if recipe is not None:
+            return key, recipe, True
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_upstream(key, request))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        return key, await asyncio.shield(task), False
+
+    async def stream(self, prompt: str, preferences: dict = None):
+        """Async-генератор ("token" | "partial" | "done", data) для SSE.
+
+        Вызов провайдера принадлежит этому генератору: закрытие генератора
+        (клиент отключился) закрывает и поток провайдера. Готовый рецепт
+        попадает в тот же кэш, что и у generate().
+        """
+        request = normalize_request(prompt, preferences)
+        key = recipe_hash(prompt, preferences)
+        recipe = self.cache.get(key)
+        if recipe is not None:
+            yield "done", {**recipe, "recipe_hash": key, "cached": True}
+            return
+        self.upstream_calls += 1
+        events = self.provider.stream(request["prompt"], request["preferences"])
+        try:
+            async for event in events:
+                if "delta" in event:
+                    yield "token", event["delta"]
+                elif "partial" in event:
+                    yield "partial", event["partial"]
+                else:
+                    recipe = event["recipe"]
+        finally:
+            await events.aclose()
+        if recipe is None:
+            raise RuntimeError("Provider stream ended without a recipe")
+        self.cache.set(key, recipe)
+        yield "done", {**recipe, "recipe_hash": key, "cached": False}
+
+    async def _call_upstream(self, key: str, request: dict) -> dict:
+        self.upstream_calls += 1
+        try:
+            recipe = await self.provider.generate(request["prompt"], request["preferences"])
+            self.cache.set(key, recipe)
+            return recipe
+        except Exception:
+            logger.exception("Recipe generation failed: hash=%s", key)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"upstream_calls": self.upstream_calls, "coalesced": self.coalesced,
+                "inflight": len(self._inflight), "cache": self.cache.stats.as_dict()}
+
+
+class UserConcurrencyLimit:
+    """Не больше limit одновременных операций на пользователя (в пределах воркера)."""
+
+    def __init__(self, limit: int = RECIPE_STREAMS_PER_USER):
+        self.limit = limit
+        self.rejected = 0
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, user_id: int) -> bool:
+        with self._lock:
+            active = self._active.get(user_id, 0)
+            if active >= self.limit:
+                self.rejected += 1
+                return False
+            self._active[user_id] = active + 1
+            return True
+
+    def release(self, user_id: int):
+        with self._lock:
+            active = self._active.get(user_id, 0) - 1
+            if active > 0:
+                self._active[user_id] = active
+            else:
+                self._active.pop(user_id, None)
+
+    def active(self, user_id: int) -> int:
+        return self._active.get(user_id, 0)
+
+
+generator = RecipeGenerator(FakeRecipeProvider())
+stream_limit = UserConcurrencyLimit()
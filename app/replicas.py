@@ -0,0 +1,169 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+from sqlalchemy import Select, event, text
+from sqlalchemy.orm import Session
+from app.cache import TTLCache
+from app.logger import logger
+
+# Реплики для чтения: URL через запятую; пусто — всё идёт в основную БД
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+# Сколько секунд после записи запросы того же клиента читают из основной БД.
+# Должно быть больше обычного отставания реплик
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Сколько окон (клиентов с недавней записью) держать в памяти воркера
+REPLICA_STICKY_MAXSIZE = int(os.getenv("REPLICA_STICKY_MAXSIZE", "100000"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaPool:
+    """Движки реплик: round-robin по живым, проверка здоровья фоновым потоком.
+
+    Реплика выпадает из ротации, если SELECT 1 не прошёл или соединение
+    оборвалось во время запроса, и возвращается после успешной проверки.
+    """
+
+    def __init__(self, engines: list, interval: float = REPLICA_HEALTH_INTERVAL):
+        self.engines = list(engines)
+        self.interval = interval
+        self.healthy = set(range(len(self.engines)))
+        self.picks = [0] * len(self.engines)
+        self._cycle = itertools.cycle(range(len(self.engines)))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        for i, engine in enumerate(self.engines):
+            event.listen(engine, "handle_error", lambda context, i=i: self._on_error(i, context))
+
+    def __len__(self):
+        return len(self.engines)
+
+    def pick(self):
+        """-> движок следующей живой реплики или None, если живых нет."""
+        with self._lock:
+            for _ in range(len(self.engines)):
+                i = next(self._cycle)
+                if i in self.healthy:
+                    self.picks[i] += 1
+                    return self.engines[i]
+        return None
+
+    def _on_error(self, i: int, context):
+        if context.is_disconnect:
+            self.mark(i, False)
+
+    def mark(self, i: int, healthy: bool):
+        with self._lock:
+            was = i in self.healthy
+            if healthy:
+                self.healthy.add(i)
+            else:
+                self.healthy.discard(i)
+        if was != healthy:
+            log = logger.info if healthy else logger.warning
+            log("Replica %s is %s: %s", i, "back" if healthy else "down", self.engines[i].url.render_as_string())
+
+    def check(self):
+        for i, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception:
+                self.mark(i, False)
+            else:
+                self.mark(i, True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None and self.engines:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> list:
+        return [{"url": engine.url.render_as_string(), "healthy": i in self.healthy, "picks": self.picks[i]}
+                for i, engine in enumerate(self.engines)]
+
+
+class RoutingSession(Session):
+    """Сессия, читающая из реплики, если её пометили use_replica (см. route_session).
+
+    По умолчанию всё идёт в основную БД: фоновые задачи и CLI ничего не
+    замечают. Запись (flush, UPDATE/DELETE/INSERT, text()) уходит в основную
+    БД всегда. Реплика выбирается один раз на сессию — весь запрос видит
+    один снимок.
+    """
+
+    def __init__(self, *args, replicas: ReplicaPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("use_replica") and not self._flushing and isinstance(clause, Select):
+            if self._replica is None:
+                self._replica = self.replicas.pick() if self.replicas else None
+                self.info["replica"] = self._replica is not None
+            if self._replica is not None:
+                return self._replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def _owner_key(owner: str) -> str:
+    # Токен в памяти не держим — только его хэш
+    return hashlib.sha256(owner.encode()).hexdigest()
+
+
+def _client_key(connection) -> str:
+    scheme, _, token = (connection.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return _owner_key("token:" + token)
+    return _owner_key("ip:" + (connection.client.host if connection.client else ""))
+
+
+def stick(key: str, sticky_seconds: float = None):
+    sticky_seconds = REPLICA_STICKY_SECONDS if sticky_seconds is None else sticky_seconds
+    sticky.set(key, time.time() + sticky_seconds, sticky_seconds)
+
+
+def stick_token(token: str, sticky_seconds: float = None):
+    """Открыть окно для только что выданного токена: логин шёл без Authorization,
+    а следующий запрос с токеном на реплике может не найти сессию (401)."""
+    stick(_owner_key("token:" + token), sticky_seconds)
+
+
+def route_session(db: Session, connection, sticky_seconds: float = None):
+    """Чтение без недавней записи этого клиента — из реплики; запись открывает окно в основную БД.
+
+    Клиент — Bearer-токен, без него IP. Окно хранится в памяти воркера
+    (sticky): запрос, попавший в другой воркер, может прочитать реплику.
+    WebSocket (метода нет) всегда читает основную БД: по нему проверяется
+    токен, а сокет живёт дольше любого окна.
+    """
+    method = connection.scope.get("method")
+    if method is None:
+        return
+    key = _client_key(connection)
+    if method not in READ_METHODS:
+        stick(key, sticky_seconds)
+        return
+    until = sticky.get(key)
+    if until is None or until <= time.time():
+        db.info["use_replica"] = True
+
+
+# Окна клиентов отдельно от app.cache: не вытесняются пользователями и не портят его статистику
+sticky = TTLCache(maxsize=REPLICA_STICKY_MAXSIZE, ttl=REPLICA_STICKY_SECONDS)
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app import schemas
+from app.auth import get_current_user, is_admin
+from app.chat_broker import broker
+from app.database import get_db
+from app.pagination import PageParams, cursor_params, is_timestamp_key
+import app.crud.chat as crud
+import app.crud.sessions as sessions_crud
+import app.crud.user as users_crud
+
+router = APIRouter(prefix="/chat", tags=["Chat"])
+
+def _can_access(db: Session, chat, user) -> bool:
+    # Владелец сессии или сотрудник поддержки (admin)
+    return chat.user_id == user.user_id or is_admin(db, user)
+
+def get_accessible_chat(db: Session, session_id: int, user):
+    chat = crud.get_chat_session(db, session_id)
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    if not _can_access(db, chat, user):
+        raise HTTPException(status_code=403, detail="No access to this chat session")
+    return chat
+
+@router.post("/sessions/", response_model=schemas.ChatSessionOut)
+def start_chat_session(user=Depends(get_current_user), db: Session = Depends(get_db)):
+    return crud.create_chat_session(db, user.user_id)
+
+@router.post("/messages/", response_model=schemas.ChatMessageOut)
+def send_message(message: schemas.ChatMessageCreate, user=Depends(get_current_user),
+                 db: Session = Depends(get_db)):
+    get_accessible_chat(db, message.session_id, user)
+    db_message = crud.create_message(db, message, user.user_id)
+    payload = schemas.ChatMessageOut.from_orm(db_message)
+    broker.publish(message.session_id, jsonable_encoder(payload))
+    return payload
+
+@router.get("/messages/{session_id}", response_model=schemas.ChatMessagePage)
+def read_messages(session_id: int, since_id: Optional[int] = None,
+                  page: PageParams = Depends(cursor_params(is_timestamp_key)),
+                  user=Depends(get_current_user), db: Session = Depends(get_db)):
+    get_accessible_chat(db, session_id, user)
+    return crud.get_messages(db, session_id, after=page.after, since_id=since_id, limit=page.limit)
+
+def _authorize_socket(db: Session, token: str, session_id: int) -> bool:
+    try:
+        user_id = sessions_crud.resolve_token(db, token)
+        user = users_crud.get_user(db, user_id) if user_id else None
+        chat = crud.get_chat_session(db, session_id) if user else None
+        return bool(chat) and _can_access(db, chat, user)
+    finally:
+        # Соединение с БД не должно висеть всё время жизни сокета
+        db.close()
+
+@router.websocket("/ws/{session_id}")
+async def chat_socket(websocket: WebSocket, session_id: int, token: str, db: Session = Depends(get_db)):
+    """Push новых сообщений сессии. Токен передаётся в ?token=, т.к. браузерный
+    WebSocket не умеет выставлять заголовок Authorization."""
+    if not await run_in_threadpool(_authorize_socket, db, token, session_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    with broker.subscribe(session_id) as queue:
+        # Ждём одновременно новое сообщение и входящий фрейм/разрыв от клиента
+        receiver = asyncio.ensure_future(websocket.receive_text())
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await websocket.send_json(getter.result())
+                else:
+                    getter.cancel()
+                if receiver in done:
+                    # Входящие фреймы игнорируем; при разрыве тут WebSocketDisconnect
+                    receiver.result()
+                    receiver = asyncio.ensure_future(websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
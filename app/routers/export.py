@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from app.auth import require_admin
+from app.database import SessionLocal
+from app.models import User, Log
+
+router = APIRouter(prefix="/export", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+# Сколько строк тянем с сервера БД за раз и отдаём клиенту одним чанком
+EXPORT_CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+USER_COLUMNS = (User.user_id, User.email, User.role_id, User.created_at)
+LOG_COLUMNS = (Log.log_id, Log.user_id, Log.action, Log.details, Log.created_at)
+
+
+def get_session_factory():
+    # Сессия открывается внутри генератора: она должна жить, пока идёт стрим,
+    # а не только до конца обработчика
+    return SessionLocal
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(keys, rows):
+    return "".join(
+        json.dumps(dict(zip(keys, map(_to_json, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows, header=None):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(header)
+    writer.writerows([_to_json(v) for v in row] for row in rows)
+    return buf.getvalue()
+
+
+def stream_rows(session_factory, columns, created_column, fmt, created_from=None, created_to=None,
+                chunk_size=EXPORT_CHUNK_SIZE):
+    """Генератор чанков NDJSON/CSV поверх server-side курсора.
+
+    yield_per включает stream_results, поэтому в памяти одновременно
+    находится не больше chunk_size строк, независимо от размера таблицы.
+    """
+    query = select(*columns).order_by(columns[0])
+    if created_from:
+        query = query.where(created_column >= created_from)
+    if created_to:
+        query = query.where(created_column < created_to)
+    keys = [c.key for c in columns]
+
+    with session_factory() as db:
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        if fmt == "csv":
+            yield _csv_chunk([], header=keys)
+        for rows in result.partitions():
+            yield _ndjson_chunk(keys, rows) if fmt == "ndjson" else _csv_chunk(rows)
+
+
+def _export(session_factory, table, columns, created_column, fmt, created_from, created_to):
+    return StreamingResponse(
+        stream_rows(session_factory, columns, created_column, fmt, created_from, created_to),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'},
+    )
+
+
+@router.get("/users")
+def export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    session_factory=Depends(get_session_factory),
+):
+    return _export(session_factory, "users", USER_COLUMNS, User.created_at, format, created_from, created_to)
+
+
+@router.get("/logs")
+def export_logs(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    session_factory=Depends(get_session_factory),
+):
+    return _export(session_factory, "logs", LOG_COLUMNS, Log.created_at, format, created_from, created_to)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app import schemas
+from app.auth import get_current_user
+from app.database import get_db
+from app.pagination import PageParams, cursor_params, is_timestamp_key
+import app.crud.favorites as crud
+
+router = APIRouter(prefix="/favorites", tags=["Favorites"])
+
+@router.post("/", response_model=schemas.FavoriteOut)
+def add_favorite(favorite: schemas.FavoriteCreate, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    return crud.add_favorite(db, user.user_id, favorite.recipe_hash)
+
+@router.get("/", response_model=schemas.FavoritePage)
+def read_favorites(page: PageParams = Depends(cursor_params(is_timestamp_key)), user=Depends(get_current_user),
+                   db: Session = Depends(get_db)):
+    return crud.get_favorites(db, user.user_id, page.after, page.limit)
+
+@router.post("/check", response_model=schemas.FavoriteCheckOut)
+def check_favorites(payload: schemas.FavoriteCheck, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    return {"favorited": crud.check_favorites(db, user.user_id, payload.recipe_hashes)}
+
+@router.delete("/{recipe_hash}", response_model=schemas.FavoriteOut)
+def remove_favorite(recipe_hash: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    favorite = crud.remove_favorite(db, user.user_id, recipe_hash)
+    if not favorite:
+        raise HTTPException(status_code=404, detail="Favorite not found")
+    return favorite
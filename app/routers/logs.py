@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app import schemas
+from app.auth import require_admin
+from app.database import get_db
+from app.models import Log
+from app.pagination import PageParams, page_params, keyset, make_page
+from app.serialization import schema_columns, rows_to_dicts, page_response
+
+LOG_OUT_COLUMNS = schema_columns(Log, schemas.LogOut)
+
+router = APIRouter(prefix="/logs", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/", response_model=schemas.LogPage)
+def read_logs(
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+):
+    # Новые записи первыми; с user_id запрос идёт по индексу (user_id, log_id)
+    query = db.query(*LOG_OUT_COLUMNS)
+    if user_id is not None:
+        query = query.filter(Log.user_id == user_id)
+    if created_from:
+        query = query.filter(Log.created_at >= created_from)
+    if created_to:
+        query = query.filter(Log.created_at < created_to)
+    logs = keyset(query, Log.log_id, page.after, page.limit, descending=True).all()
+    return page_response(make_page(rows_to_dicts(logs), page.limit, key=lambda log: log["log_id"]),
+                         schemas.LogOut)
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from app import schemas, conditional
+from app.auth import require_owner_or_admin
+from app.database import get_db
+from app.crud.writes import VersionMismatch
+import app.crud.preferences as crud
+
+router = APIRouter(prefix="/preferences", tags=["Preferences"])
+
+@router.get("/{user_id}", response_model=schemas.UserPreferenceOut)
+def read_preference(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    if conditional.revalidating(request):
+        unchanged = conditional.not_modified(request, crud.get_preference_etag(db, user_id))
+        if unchanged:
+            return unchanged
+    pref = crud.get_preference(db, user_id)
+    if not pref:
+        raise HTTPException(status_code=404, detail="Preferences not found")
+    conditional.set_etag(response, conditional.make_etag(pref.preference_id, pref.version))
+    return pref
+
+@router.put("/{user_id}", response_model=schemas.UserPreferenceOut,
+            dependencies=[Depends(require_owner_or_admin)])
+def update_preference(user_id: int, pref: schemas.UserPreferenceUpdate, request: Request, response: Response,
+                      db: Session = Depends(get_db)):
+    try:
+        db_pref = crud.update_preference(db, user_id, pref, conditional.if_match(request))
+    except VersionMismatch:
+        raise HTTPException(status_code=412, detail="Preferences were modified by another request")
+    if not db_pref:
+        raise HTTPException(status_code=404, detail="Preferences not found")
+    conditional.set_etag(response, conditional.make_etag(db_pref.preference_id, db_pref.version))
+    return db_pref
+
+@router.delete("/{user_id}", response_model=schemas.UserPreferenceOut,
+               dependencies=[Depends(require_owner_or_admin)])
+def delete_preference(user_id: int, db: Session = Depends(get_db)):
+    db_pref = crud.delete_preference(db, user_id)
+    if not db_pref:
+        raise HTTPException(status_code=404, detail="Preferences not found")
+    return db_pref
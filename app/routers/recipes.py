@@ -0,0 +1,93 @@
+import json
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session
+from app import recipe_index, recipes, schemas
+from app.logger import logger
+from app.auth import get_current_user
+from app.database import get_db
+from app.crud.preferences import get_preference
+from app.crud.recipes import get_recipe_cards
+from app.pagination import Page, PageParams, cursor_params, is_id_pair, make_page
+from app.serialization import page_response
+
+router = APIRouter(prefix="/recipes", tags=["Recipes"])
+
+def stored_preferences(user=Depends(get_current_user), db: Session = Depends(get_db)) -> dict:
+    pref = get_preference(db, user.user_id)
+    return {field: getattr(pref, field, None) for field in recipes.PREFERENCE_FIELDS}
+
+@router.post("/generate", response_model=schemas.RecipeOut)
+async def generate_recipe(payload: schemas.RecipeRequest, preferences: dict = Depends(stored_preferences)):
+    if payload.preferences is not None:
+        preferences = payload.preferences.dict()
+    try:
+        key, recipe, cached = await recipes.generator.generate(payload.prompt, preferences)
+    except Exception:
+        raise HTTPException(status_code=502, detail="Recipe generation failed")
+    # recipe_hash можно сразу передать в POST /favorites/
+    return {**recipe, "recipe_hash": key, "cached": cached}
+
+@router.get("/recommendations", response_model=schemas.RecipeCardPage)
+def recommend_recipes(cuisine: Optional[str] = None, difficulty: Optional[Literal["easy", "medium", "hard"]] = None,
+                      max_cooking_time: Optional[int] = Query(None, ge=0),
+                      page: PageParams = Depends(cursor_params(is_id_pair)), preferences: dict = Depends(stored_preferences),
+                      db: Session = Depends(get_db)):
+    """Рецепты каталога под предпочтения пользователя, от быстрых к долгим.
+
+    Параметры запроса заменяют сохранённые user_preferences. Кандидатов
+    отбирает индекс в памяти, из БД — только карточки страницы по id.
+    """
+    filters = {field: preferences.get(field) for field in recipes.PREFERENCE_FIELDS}
+    overrides = {"cuisine": cuisine, "difficulty": difficulty, "max_cooking_time": max_cooking_time}
+    filters.update({field: value for field, value in overrides.items() if value is not None})
+    after = tuple(page.after) if page.after is not None else None
+    keys = make_page(recipe_index.index.query(**filters, after=after, limit=page.limit + 1), page.limit,
+                     key=list)
+    # Курсор — из ключей индекса, а не из карточек: удалённый из БД рецепт не обрывает выдачу
+    cards = get_recipe_cards(db, [recipe_id for _, recipe_id in keys.items])
+    return page_response(Page(cards, keys.next_cursor), schemas.RecipeCardOut)
+
+async def sse_events(events, on_close):
+    """Переводит события генератора в формат text/event-stream.
+
+    При отключении клиента Starlette отменяет задачу ответа — CancelledError
+    проходит сюда, и finally закрывает генератор вместе с вызовом провайдера.
+    """
+    try:
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    except Exception:
+        logger.exception("Recipe stream failed")
+        yield 'event: error\ndata: {"detail": "Recipe generation failed"}\n\n'
+    finally:
+        await events.aclose()
+        on_close()
+
+@router.post("/generate/stream")
+async def stream_recipe(payload: schemas.RecipeRequest, user=Depends(get_current_user),
+                        preferences: dict = Depends(stored_preferences)):
+    """SSE: token — кусок текста, partial — готовое поле рецепта, done — рецепт целиком с recipe_hash."""
+    if payload.preferences is not None:
+        preferences = payload.preferences.dict()
+    if not recipes.stream_limit.acquire(user.user_id):
+        raise HTTPException(status_code=429, detail="Too many concurrent generations",
+                            headers={"Retry-After": "1"})
+    released = []
+
+    def release():
+        # Вызывается и из генератора, и фоновой задачей — на случай, если
+        # клиент ушёл раньше, чем генератор успел стартовать
+        if not released:
+            released.append(True)
+            recipes.stream_limit.release(user.user_id)
+
+    events = recipes.generator.stream(payload.prompt, preferences)
+    return StreamingResponse(
+        sse_events(events, release),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),
+    )
@@ -0,0 +1,38 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app import schemas
+from app.auth import require_admin
+from app.database import get_db
+from app.pagination import PageParams, page_params
+import app.crud.roles as crud
+
+router = APIRouter(prefix="/roles", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/", response_model=list[schemas.RoleWithCountOut])
+def read_roles(db: Session = Depends(get_db)):
+    return crud.get_roles_with_user_counts(db)
+
+@router.get("/{role_id}", response_model=schemas.RoleWithUsersOut, response_model_exclude_unset=True)
+def read_role(role_id: int, include: Optional[Literal["users"]] = None, page: PageParams = Depends(page_params),
+              db: Session = Depends(get_db)):
+    role = crud.get_role(db, role_id)
+    if not role:
+        raise HTTPException(status_code=404, detail="Role not found")
+    # Без include — RoleOut: иначе сериализация подгрузит role.users
+    if include != "users":
+        return schemas.RoleOut.from_orm(role)
+    # Пользователей роли может быть сколько угодно — отдаём страницу (?cursor=&limit=)
+    users_page = crud.get_role_users(db, role_id, page.after, page.limit)
+    return schemas.RoleWithUsersOut(role_id=role.role_id, name=role.name,
+                                    users=schemas.UserPage.from_orm(users_page))
+
+@router.delete("/{role_id}", response_model=schemas.RoleOut)
+def delete_role(role_id: int, db: Session = Depends(get_db)):
+    try:
+        role = crud.delete_role(db, role_id)
+    except crud.RoleInUse as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not role:
+        raise HTTPException(status_code=404, detail="Role not found")
+    return role
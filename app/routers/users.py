@@ -1,37 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from app import schemas
-from app.database import SessionLocal
+from app import schemas, conditional, replicas
+from app.serialization import page_response
+from app.pagination import PageParams, page_params
+from app.database import get_db
+from app.auth import get_current_user, require_admin, require_owner_or_admin
+from app.crud.writes import VersionMismatch
 from app.services import UserService
+import app.crud.user as users_crud
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.get("/", response_model=list[schemas.UserOut])
-def read_users(db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.UserWithRolePage)
+def read_users(include: Optional[Literal["role"]] = None, page: PageParams = Depends(page_params),
+               db: Session = Depends(get_db)):
     service = UserService(db)
-    return service.get_users()
+    with_role = include == "role"
+    # Строки из БД сразу в orjson (роль — тем же запросом); response_model остаётся для схемы в /docs
+    rows = service.get_user_rows(page.after, page.limit, with_role)
+    return page_response(rows, schemas.UserWithRoleOut if with_role else schemas.UserOut)
 
-@router.get("/{user_id}", response_model=schemas.UserOut)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+@router.get("/me", response_model=schemas.UserOut)
+def read_current_user(user=Depends(get_current_user)):
+    return user
+
+@router.get("/{user_id}", response_model=schemas.UserWithRoleOut, response_model_exclude_unset=True)
+def read_user(user_id: int, request: Request, response: Response, include: Optional[Literal["role"]] = None,
+              db: Session = Depends(get_db)):
     service = UserService(db)
-    db_user = service.get_user(user_id)
+    with_role = include == "role"
+    if conditional.revalidating(request):
+        # Совпал ETag — 304 без загрузки строки (SELECT version по ключу, с ролью — и её имя)
+        unchanged = conditional.not_modified(request, service.get_user_etag(user_id, with_role))
+        if unchanged:
+            return unchanged
+    db_user = service.get_user(user_id, with_role)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    if with_role:
+        # У представления с ролью свой тег: роль переименовывают без смены версии пользователя
+        role_name = db_user.role.name if db_user.role is not None else None
+        conditional.set_etag(response, conditional.make_etag(
+            db_user.user_id, db_user.version, users_crud.role_representation(role_name)))
+        return schemas.UserWithRoleOut.from_orm(db_user)
+    # Без include — UserOut: иначе сериализация обратится к user.role и подгрузит её
+    conditional.set_etag(response, conditional.make_etag(db_user.user_id, db_user.version))
+    return schemas.UserOut.from_orm(db_user)
 
 @router.post("/", response_model=schemas.UserOut)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     service = UserService(db)
     return service.create_user(user)
 
-@router.delete("/{user_id}", response_model=schemas.UserOut)
+@router.post("/bulk", response_model=schemas.UserBulkReport, dependencies=[Depends(require_admin)])
+def bulk_create_users(payload: schemas.UserBulkCreate, db: Session = Depends(get_db)):
+    service = UserService(db)
+    return service.bulk_create_users(payload)
+
+@router.post("/login", response_model=schemas.LoginOut)
+def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+    service = UserService(db)
+    result = service.login(credentials)
+    if not result:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    # Сессия только что записана в основную БД — читать её с реплики рано
+    replicas.stick_token(result["access_token"])
+    return result
+
+@router.put("/{user_id}", response_model=schemas.UserOut, dependencies=[Depends(require_owner_or_admin)])
+def update_user(user_id: int, user: schemas.UserUpdate, request: Request, response: Response,
+                db: Session = Depends(get_db)):
+    service = UserService(db)
+    try:
+        # If-Match — UPDATE только если версия та же, что видел клиент (без блокировок)
+        db_user = service.update_user(user_id, user, conditional.if_match(request))
+    except VersionMismatch:
+        raise HTTPException(status_code=412, detail="User was modified by another request")
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    conditional.set_etag(response, conditional.make_etag(db_user.user_id, db_user.version))
+    return db_user
+
+@router.delete("/{user_id}", response_model=schemas.UserOut, dependencies=[Depends(require_owner_or_admin)])
 def delete_user(user_id: int, db: Session = Depends(get_db)):
     service = UserService(db)
     db_user = service.delete_user(user_id)
@@ -0,0 +1,90 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, conditional
+from app.serialization import page_response
+from app.pagination import PageParams, page_params
+from app.database import get_async_db
+from app.auth import get_current_user, require_admin, require_owner_or_admin
+from app.crud.writes import VersionMismatch
+from app.services import AsyncUserService
+import app.crud.user as users_crud
+
+# Те же маршруты, что и в app/routers/users.py, но на AsyncSession
+router = APIRouter(prefix="/users", tags=["Users"])
+
+@router.get("/", response_model=schemas.UserWithRolePage)
+async def read_users(include: Optional[Literal["role"]] = None, page: PageParams = Depends(page_params),
+                     db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    with_role = include == "role"
+    # Строки из БД сразу в orjson (роль — тем же запросом); response_model остаётся для схемы в /docs
+    rows = await service.get_user_rows(page.after, page.limit, with_role)
+    return page_response(rows, schemas.UserWithRoleOut if with_role else schemas.UserOut)
+
+@router.get("/me", response_model=schemas.UserOut)
+async def read_current_user(user=Depends(get_current_user)):
+    return user
+
+@router.get("/{user_id}", response_model=schemas.UserWithRoleOut, response_model_exclude_unset=True)
+async def read_user(user_id: int, request: Request, response: Response, include: Optional[Literal["role"]] = None,
+                    db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    with_role = include == "role"
+    if conditional.revalidating(request):
+        # Совпал ETag — 304 без загрузки строки (SELECT version по ключу, с ролью — и её имя)
+        unchanged = conditional.not_modified(request, await service.get_user_etag(user_id, with_role))
+        if unchanged:
+            return unchanged
+    db_user = await service.get_user(user_id, with_role)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if with_role:
+        # У представления с ролью свой тег: роль переименовывают без смены версии пользователя
+        role_name = db_user.role.name if db_user.role is not None else None
+        conditional.set_etag(response, conditional.make_etag(
+            db_user.user_id, db_user.version, users_crud.role_representation(role_name)))
+        return schemas.UserWithRoleOut.from_orm(db_user)
+    # Без include — UserOut: иначе сериализация обратится к user.role и подгрузит её
+    conditional.set_etag(response, conditional.make_etag(db_user.user_id, db_user.version))
+    return schemas.UserOut.from_orm(db_user)
+
+@router.post("/", response_model=schemas.UserOut)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    return await service.create_user(user)
+
+@router.post("/bulk", response_model=schemas.UserBulkReport, dependencies=[Depends(require_admin)])
+async def bulk_create_users(payload: schemas.UserBulkCreate, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    return await service.bulk_create_users(payload)
+
+@router.post("/login", response_model=schemas.LoginOut)
+async def login(credentials: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    result = await service.login(credentials)
+    if not result:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    return result
+
+@router.put("/{user_id}", response_model=schemas.UserOut, dependencies=[Depends(require_owner_or_admin)])
+async def update_user(user_id: int, user: schemas.UserUpdate, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    try:
+        # If-Match — UPDATE только если версия та же, что видел клиент (без блокировок)
+        db_user = await service.update_user(user_id, user, conditional.if_match(request))
+    except VersionMismatch:
+        raise HTTPException(status_code=412, detail="User was modified by another request")
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    conditional.set_etag(response, conditional.make_etag(db_user.user_id, db_user.version))
+    return db_user
+
+@router.delete("/{user_id}", response_model=schemas.UserOut, dependencies=[Depends(require_owner_or_admin)])
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    service = AsyncUserService(db)
+    db_user = await service.delete_user(user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, conlist, constr
+from typing import Literal, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -8,9 +9,205 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class UserUpdate(BaseModel):
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+    role_id: Optional[int] = None
+
 class UserOut(UserBase):
     user_id: int
     created_at: datetime
 
     class Config:
         orm_mode = True
+
+class UserBulkCreate(BaseModel):
+    users: conlist(UserCreate, min_items=1, max_items=10000)
+
+class UserBulkResult(BaseModel):
+    index: int
+    email: EmailStr
+    status: Literal["created", "duplicate", "invalid_role"]
+    user_id: Optional[int] = None
+
+class UserBulkReport(BaseModel):
+    created: int
+    duplicates: int
+    invalid_roles: int = 0
+    results: list[UserBulkResult]
+
+class LoginOut(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: datetime
+    user: UserOut
+
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class RoleCreate(BaseModel):
+    name: str
+
+class RoleUpdate(BaseModel):
+    name: Optional[str] = None
+
+class RoleOut(RoleCreate):
+    role_id: int
+
+    class Config:
+        orm_mode = True
+
+class RoleWithCountOut(RoleOut):
+    user_count: int
+
+class RoleWithUsersOut(RoleOut):
+    # Только при ?include=users: страница пользователей, следующая — по users.next_cursor
+    users: Optional[UserPage] = None
+
+class UserWithRoleOut(UserOut):
+    # Заполняется только при ?include=role, одним запросом вместе с пользователем
+    role: Optional[RoleOut] = None
+
+class UserWithRolePage(BaseModel):
+    items: list[UserWithRoleOut]
+    next_cursor: Optional[str] = None
+
+class SessionCreate(BaseModel):
+    user_id: int
+    token: str
+    expired_at: Optional[datetime] = None
+
+class SessionUpdate(BaseModel):
+    token: Optional[str] = None
+    expired_at: Optional[datetime] = None
+
+class SessionOut(SessionCreate):
+    session_id: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class UserPreferenceCreate(BaseModel):
+    user_id: int
+    cuisine: Optional[str] = None
+    max_cooking_time: Optional[int] = None
+    difficulty: Optional[Literal["easy", "medium", "hard"]] = None
+
+class UserPreferenceUpdate(BaseModel):
+    cuisine: Optional[str] = None
+    max_cooking_time: Optional[int] = None
+    difficulty: Optional[Literal["easy", "medium", "hard"]] = None
+
+class UserPreferenceOut(UserPreferenceCreate):
+    preference_id: int
+
+    class Config:
+        orm_mode = True
+
+class LogOut(BaseModel):
+    log_id: int
+    user_id: Optional[int] = None
+    action: str
+    details: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class LogPage(BaseModel):
+    items: list[LogOut]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class ChatSessionOut(BaseModel):
+    session_id: int
+    user_id: int
+    started_at: datetime
+    ended_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ChatMessageCreate(BaseModel):
+    session_id: int
+    message: str
+
+class ChatMessageOut(ChatMessageCreate):
+    message_id: int
+    user_id: int
+    sent_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ChatMessagePage(BaseModel):
+    items: list[ChatMessageOut]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class FavoriteCreate(BaseModel):
+    recipe_hash: str
+
+class FavoriteOut(FavoriteCreate):
+    favorite_id: int
+    user_id: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class FavoritePage(BaseModel):
+    items: list[FavoriteOut]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class FavoriteCheck(BaseModel):
+    recipe_hashes: conlist(str, min_items=1, max_items=500)
+
+class FavoriteCheckOut(BaseModel):
+    favorited: dict[str, bool]
+
+class RecipeRequest(BaseModel):
+    prompt: constr(strip_whitespace=True, min_length=1, max_length=1000)
+    # Если не переданы — берутся сохранённые user_preferences
+    preferences: Optional[UserPreferenceUpdate] = None
+
+class RecipeOut(BaseModel):
+    recipe_hash: str
+    title: str
+    cuisine: Optional[str] = None
+    difficulty: Optional[str] = None
+    cooking_time: Optional[int] = None
+    ingredients: list[str]
+    steps: list[str]
+    cached: bool = False
+
+class RecipeCardOut(BaseModel):
+    recipe_id: int
+    recipe_hash: str
+    title: str
+    cuisine: str
+    cooking_time: int
+    difficulty: str
+
+    class Config:
+        orm_mode = True
+
+class RecipeCardPage(BaseModel):
+    items: list[RecipeCardOut]
+    next_cursor: Optional[str] = None
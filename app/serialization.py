@@ -0,0 +1,29 @@
+import os
+from fastapi.responses import ORJSONResponse
+from app.pagination import Page
+
+# Строки из собственной БД уже соответствуют схеме ответа: по умолчанию не
+# прогоняем их через pydantic. TRUST_DB_ROWS=0 — валидировать, как обычно.
+TRUST_DB_ROWS = os.getenv("TRUST_DB_ROWS", "1").lower() in ("1", "true", "yes")
+
+
+def schema_columns(model, schema) -> tuple:
+    """Колонки model для полей schema — чтобы выбирать только их, без ORM-сущностей."""
+    return tuple(getattr(model, name) for name in schema.__fields__)
+
+
+def rows_to_dicts(rows) -> list:
+    return [row._asdict() for row in rows]
+
+
+def page_response(page: Page, schema, trusted: bool = None) -> ORJSONResponse:
+    """Страница dict-строк -> ORJSONResponse.
+
+    Минует response_model и jsonable_encoder: datetime и прочее orjson
+    сериализует сам. trusted=False (или TRUST_DB_ROWS=0) — каждая строка
+    проходит через schema.
+    """
+    items = page.items
+    if not (TRUST_DB_ROWS if trusted is None else trusted):
+        items = [schema(**item).dict() for item in items]
+    return ORJSONResponse({"items": items, "next_cursor": page.next_cursor})
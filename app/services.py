@@ -1,19 +1,76 @@
-from app.crud import UserRepository
+from app.crud import UserRepository, AsyncUserRepository
 from app import schemas
+from app.pagination import DEFAULT_PAGE_SIZE
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 class UserService:
     def __init__(self, db: Session):
         self.repo = UserRepository(db)
 
-    def get_users(self):
-        return self.repo.get_users()
+    def get_users(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, options: tuple = ()):
+        return self.repo.get_users(after_id, limit, options)
 
-    def get_user(self, user_id: int):
-        return self.repo.get_user(user_id)
+    def get_user_rows(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, with_role: bool = False):
+        return self.repo.get_user_rows(after_id, limit, with_role)
+
+    def get_user(self, user_id: int, with_role: bool = False):
+        return self.repo.get_user(user_id, with_role)
+
+    def get_user_etag(self, user_id: int, with_role: bool = False):
+        return self.repo.get_user_etag(user_id, with_role)
 
     def create_user(self, user: schemas.UserCreate):
         return self.repo.create_user(user)
 
+    def bulk_create_users(self, payload: schemas.UserBulkCreate):
+        return self.repo.bulk_create_users(payload.users)
+
+    def login(self, credentials: schemas.UserLogin):
+        user = self.repo.authenticate_user(credentials.email, credentials.password)
+        if not user:
+            return None
+        session = self.repo.issue_session(user.user_id)
+        return {"access_token": session.token, "expires_at": session.expired_at, "user": user}
+
+    def update_user(self, user_id: int, user_data: schemas.UserUpdate, expected: list = None):
+        return self.repo.update_user(user_id, user_data, expected)
+
     def delete_user(self, user_id: int):
         return self.repo.delete_user(user_id)
+
+
+class AsyncUserService:
+    def __init__(self, db: AsyncSession):
+        self.repo = AsyncUserRepository(db)
+
+    async def get_users(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, options: tuple = ()):
+        return await self.repo.get_users(after_id, limit, options)
+
+    async def get_user_rows(self, after_id: int = None, limit: int = DEFAULT_PAGE_SIZE, with_role: bool = False):
+        return await self.repo.get_user_rows(after_id, limit, with_role)
+
+    async def get_user(self, user_id: int, with_role: bool = False):
+        return await self.repo.get_user(user_id, with_role)
+
+    async def get_user_etag(self, user_id: int, with_role: bool = False):
+        return await self.repo.get_user_etag(user_id, with_role)
+
+    async def create_user(self, user: schemas.UserCreate):
+        return await self.repo.create_user(user)
+
+    async def bulk_create_users(self, payload: schemas.UserBulkCreate):
+        return await self.repo.bulk_create_users(payload.users)
+
+    async def login(self, credentials: schemas.UserLogin):
+        user = await self.repo.authenticate_user(credentials.email, credentials.password)
+        if not user:
+            return None
+        session = await self.repo.issue_session(user.user_id)
+        return {"access_token": session.token, "expires_at": session.expired_at, "user": user}
+
+    async def update_user(self, user_id: int, user_data: schemas.UserUpdate, expected: list = None):
+        return await self.repo.update_user(user_id, user_data, expected)
+
+    async def delete_user(self, user_id: int):
+        return await self.repo.delete_user(user_id)
@@ -0,0 +1,83 @@
+"""Скорость вставки пользователей: по одному (crud.create_user) против bulk.
+
+    python -m benchmarks.bench_bulk_users --rows 2000
+    python -m benchmarks.bench_bulk_users --rows 2000 --url mysql+pymysql://...
+
+По умолчанию используется дешёвый метод хэша, чтобы сравнивать именно путь
+в БД; --method scrypt:32768:8:1 покажет выигрыш от параллельного хэширования.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import hashing
+from app.database import Base
+from app.hashing import PasswordHasher
+from app.models import Role
+from app.schemas import UserCreate
+import app.crud.user as crud
+
+
+def fresh_session(url: str):
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    db.add(Role(name="user"))
+    db.commit()
+    return db
+
+
+def bench_single(url: str, users: list) -> float:
+    db = fresh_session(url)
+    started = time.perf_counter()
+    for user in users:
+        crud.create_user(db, user)
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def bench_bulk(url: str, users: list) -> float:
+    db = fresh_session(url)
+    started = time.perf_counter()
+    crud.bulk_create_users(db, users)
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--url", help="SQLAlchemy URL; defaults to a temporary SQLite file")
+    parser.add_argument("--method", default="pbkdf2:sha256:1000")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashing.hasher = PasswordHasher(method=args.method, workers=args.workers)
+    # Логи на каждую строку исказили бы замер одиночного пути
+    crud.logger.disabled = True
+    users = [UserCreate(email=f"user{i}@example.com", password=f"pw{i}", role_id=1) for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        single = bench_single(url, users)
+        bulk = bench_bulk(url, users)
+    hashing.hasher.shutdown()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "single_rows_per_sec": round(args.rows / single, 1),
+        "bulk_rows_per_sec": round(args.rows / bulk, 1),
+        "speedup": round(single / bulk, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
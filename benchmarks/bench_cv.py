@@ -0,0 +1,101 @@
+"""Кадры в секунду при размытии ROI на синтетических роликах (внешние файлы не нужны).
+
+    serial        — исходный cv.py: чтение, GaussianBlur, запись по очереди в одном потоке
+    pipeline      — cv.process_video: три стадии в потоках с очередями
+    pipeline_fast — то же, --mode fast
+    pool          — cv.process_files: все файлы в пуле процессов, конвейер в каждом
+    pool_fast     — то же, --mode fast
+
+    python -m benchmarks.bench_cv --files 4 --frames 300 --width 1920 --height 1080 --ksize 101
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import cv
+
+
+def write_synthetic_video(path: str, frames: int, width: int, height: int, seed: int = 0):
+    """Градиент с движущимися полосами и "оверлей" с текстом вверху кадра."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    base = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (width, height))
+    for i in range(frames):
+        frame = np.roll(base, i * 4, axis=1)
+        cv2.putText(frame, f"overlay {i}", (20, height // 12), cv2.FONT_HERSHEY_SIMPLEX, height / 400,
+                    (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+
+
+def serial(src: str, dst: str, options: cv.BlurOptions) -> dict:
+    started = time.perf_counter()
+    capture = cv2.VideoCapture(src)
+    size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*options.fourcc), capture.get(cv2.CAP_PROP_FPS), size)
+    frames = 0
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        for x, y, w, h in options.rois:
+            frame[y:y + h, x:x + w] = cv2.GaussianBlur(frame[y:y + h, x:x + w], (options.ksize,) * 2, 0)
+        writer.write(frame)
+        frames += 1
+    capture.release()
+    writer.release()
+    return {"frames": frames, "seconds": time.perf_counter() - started}
+
+
+def summary(frames: int, seconds: float, baseline: float = None) -> dict:
+    result = {"frames": frames, "seconds": round(seconds, 2), "fps": round(frames / seconds, 1)}
+    if baseline:
+        result["speedup"] = round(result["fps"] / baseline, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--ksize", type=int, default=101)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    # Полоса сверху и снизу кадра — как оверлеи на роликах
+    band = args.height // 8
+    rois = (cv.ROI(0, 0, args.width, band), cv.ROI(0, args.height - band, args.width, band))
+    exact = cv.BlurOptions(rois, args.ksize)
+    fast = exact._replace(mode="fast")
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = [os.path.join(tmp, f"in{i}.mp4") for i in range(args.files)]
+        for i, src in enumerate(sources):
+            write_synthetic_video(src, args.frames, args.width, args.height, seed=i)
+        out = lambda name, i: os.path.join(tmp, f"{name}{i}.mp4")
+
+        runs = [serial(src, out("serial", i), exact) for i, src in enumerate(sources)]
+        frames = sum(r["frames"] for r in runs)
+        results = {"serial": summary(frames, sum(r["seconds"] for r in runs))}
+        baseline = results["serial"]["fps"]
+        for name, options in (("pipeline", exact), ("pipeline_fast", fast)):
+            runs = [cv.process_video(src, out(name, i), options) for i, src in enumerate(sources)]
+            results[name] = summary(sum(r["frames"] for r in runs), sum(r["seconds"] for r in runs), baseline)
+        for name, options in (("pool", exact), ("pool_fast", fast)):
+            report = cv.process_files([(src, out(name, i)) for i, src in enumerate(sources)], options, args.workers)
+            results[name] = {**summary(report["frames"], report["seconds"], baseline), "workers": report["workers"]}
+
+    meta = {"files": args.files, "frames_per_file": args.frames, "size": f"{args.width}x{args.height}",
+            "ksize": args.ksize, "cpus": os.cpu_count()}
+    print(json.dumps({"meta": meta, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Латентность "посторонних" запросов во время шторма регистраций.
+
+Сравнивает хэширование паролей в потоке запроса (HASH_WORKERS=0) и в пуле
+процессов. Приложение гоняется in-process через httpx.AsyncClient, БД — SQLite.
+
+    python -m benchmarks.bench_hashing --signups 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import hashing
+from app.database import Base, get_db
+from app.hashing import PasswordHasher, HasherBusy
+from app.models import Role
+from app.routers import users
+
+
+def build_app(db_path: str) -> FastAPI:
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    with SessionLocal() as db:
+        db.add(Role(name="user"))
+        db.commit()
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(users.router)
+    app.dependency_overrides[get_db] = override_get_db
+
+    @app.exception_handler(HasherBusy)
+    def busy(request: Request, exc: HasherBusy):
+        return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+    return app
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(app: FastAPI, signups: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/users/", json={"email": "probe@example.com", "password": "x", "role_id": 1})
+        probe_id = r.json()["user_id"]
+
+        sem = asyncio.Semaphore(concurrency)
+        rejected = 0
+
+        async def signup(i):
+            nonlocal rejected
+            async with sem:
+                r = await client.post("/users/", json={"email": f"u{i}@example.com", "password": "pw", "role_id": 1})
+                rejected += r.status_code == 503
+
+        latencies = []
+        storm = asyncio.gather(*(signup(i) for i in range(signups)))
+        started = time.perf_counter()
+        while not storm.done():
+            t = time.perf_counter()
+            await client.get(f"/users/{probe_id}")
+            latencies.append((time.perf_counter() - t) * 1000)
+            await asyncio.sleep(0.005)
+        await storm
+        elapsed = time.perf_counter() - started
+
+    return {
+        "signups_per_sec": round(signups / elapsed, 1),
+        "signups_rejected": rejected,
+        "probe_requests": len(latencies),
+        "probe_p50_ms": round(statistics.median(latencies), 2),
+        "probe_p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--signups", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--method", default=hashing.PASSWORD_HASH_METHOD)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    results = {}
+    for name, workers in (("inline", 0), ("process_pool", args.workers)):
+        hashing.hasher = PasswordHasher(method=args.method, workers=workers, max_pending=args.signups + 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            results[name] = asyncio.run(run(build_app(os.path.join(tmp, "bench.db")), args.signups, args.concurrency))
+        hashing.hasher.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
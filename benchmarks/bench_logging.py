@@ -0,0 +1,78 @@
+"""Латентность запроса с логированием: выключено / синхронные хендлеры / очередь.
+
+    python -m benchmarks.bench_logging --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+import httpx
+
+from app import cache, hashing
+from app.hashing import PasswordHasher
+from app.logger import logger, setup_logger, TEXT_FORMAT
+from benchmarks.bench_hashing import build_app, percentile
+
+
+def configure(mode: str, tmp: str):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.disabled = mode == "off"
+    if mode == "sync":
+        # Как было раньше: файл с ротацией и консоль прямо в потоке запроса
+        formatter = logging.Formatter(TEXT_FORMAT)
+        for handler in (RotatingFileHandler(os.path.join(tmp, "sync.log"), maxBytes=5*1024*1024, backupCount=3),
+                        logging.StreamHandler(open(os.devnull, "w"))):
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+    elif mode == "queue":
+        queued = setup_logger("bench_queue_logger", os.path.join(tmp, "queue.log"))
+        # Консольный хендлер слушателя тоже уводим в /dev/null
+        queued.listener.handlers[1].setStream(open(os.devnull, "w"))
+        logger.addHandler(queued.handlers[0])
+        return queued.listener
+
+
+async def run(app, requests: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/users/", json={"email": "probe@example.com", "password": "x", "role_id": 1})
+        user_id = r.json()["user_id"]
+        latencies = []
+        for _ in range(requests):
+            t = time.perf_counter()
+            await client.get(f"/users/{user_id}")
+            latencies.append((time.perf_counter() - t) * 1000)
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    hashing.hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+    # Без кэша каждый GET доходит до crud и пишет лог
+    cache.cache = cache.NullCache()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "sync", "queue"):
+            listener = configure(mode, tmp)
+            results[mode] = asyncio.run(run(build_app(os.path.join(tmp, f"{mode}.db")), args.requests))
+            if listener:
+                listener.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
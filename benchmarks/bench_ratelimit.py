@@ -0,0 +1,88 @@
+"""Накладные расходы RateLimitMiddleware на запрос, микросекунды.
+
+Middleware вызывается напрямую с пустым ASGI-приложением за ним, без HTTP
+и FastAPI: разница с голым приложением — ровно стоимость проверки лимита.
+
+    free_route   — маршрут без лимита (проверка по множеству)
+    anonymous    — лимит по IP, корзина клиента и общая корзина
+    user         — Bearer-токен из кэша токенов, роль из кэша пользователей
+    rejected     — лимит исчерпан, ответ 429
+    shared_fake  — как anonymous, но SharedBucketStore поверх InMemorySharedBuckets
+
+    python -m benchmarks.bench_ratelimit --requests 200000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app import cache
+from app.crud import sessions as sessions_crud
+from app.ratelimit import InMemorySharedBuckets, LocalBucketStore, RateLimiter, RateLimitMiddleware, \
+    SharedBucketStore, parse_limits
+
+# Лимит, который за время замера не исчерпать
+UNLIMITED = "POST /users/=1000000000/1"
+
+
+async def app(scope, receive, send):
+    pass
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def make_scope(method: str, path: str, token: str = None) -> dict:
+    headers = [(b"host", b"localhost"), (b"content-type", b"application/json")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": ("10.0.0.1", 5000)}
+
+
+async def measure(handler, scope: dict, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await handler(scope, receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def middleware(limits: str, store=None) -> RateLimitMiddleware:
+    limiter = RateLimiter(limits=parse_limits(limits), global_limits=parse_limits(limits),
+                          store=store if store is not None else LocalBucketStore())
+    return RateLimitMiddleware(app, limiter=limiter)
+
+
+async def run(requests: int) -> dict:
+    sessions_crud.token_cache.set("bench-token", (1, 1, None))
+    cache.cache_set("user:1", {"user_id": 1, "role_id": 1, "email": "bench@example.com"})
+    cases = {
+        "free_route": (middleware(UNLIMITED), make_scope("GET", "/users/")),
+        "anonymous": (middleware(UNLIMITED), make_scope("POST", "/users/")),
+        "user": (middleware(UNLIMITED), make_scope("POST", "/users/", "bench-token")),
+        "rejected": (middleware("POST /users/=1/3600"), make_scope("POST", "/users/")),
+        "shared_fake": (middleware(UNLIMITED, SharedBucketStore(InMemorySharedBuckets())),
+                        make_scope("POST", "/users/")),
+    }
+    bare = await measure(app, make_scope("POST", "/users/"), requests)
+    results = {"bare_app_us": round(bare, 3)}
+    for name, (handler, scope) in cases.items():
+        await measure(handler, scope, min(requests, 1000))  # прогрев
+        results[name] = {"us_per_request": round(await measure(handler, scope, requests), 3)}
+        results[name]["overhead_us"] = round(results[name]["us_per_request"] - bare, 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
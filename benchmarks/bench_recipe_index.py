@@ -0,0 +1,87 @@
+"""Индекс рекомендаций на синтетическом каталоге: построение, память, запросы.
+
+    scan  — проход по всему каталогу в памяти с фильтром и сортировкой (без индекса)
+    index — RecipeIndex.query: выбор списка, bisect, срез страницы
+    upsert — перестановка одного изменённого рецепта
+
+    python -m benchmarks.bench_recipe_index --recipes 1000000 --queries 20000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.recipe_index import RecipeIndex
+from benchmarks.seed import CUISINES, DIFFICULTIES
+
+COOKING_TIMES = range(5, 181, 5)
+
+
+def catalog(recipes: int, rnd: random.Random) -> list:
+    return [(i, rnd.choice(CUISINES), rnd.choice(COOKING_TIMES), rnd.choice(DIFFICULTIES))
+            for i in range(1, recipes + 1)]
+
+
+def random_filters(rnd: random.Random) -> dict:
+    # Как у пользователей: часть полей предпочтений может быть не заполнена
+    return {"cuisine": rnd.choice(CUISINES + (None,)), "difficulty": rnd.choice(DIFFICULTIES + (None,)),
+            "max_cooking_time": rnd.choice((15, 30, 45, 60, 90, None))}
+
+
+def scan(rows, cuisine=None, difficulty=None, max_cooking_time=None, limit=20):
+    return sorted((t, rid) for rid, c, t, d in rows
+                  if (cuisine is None or c == cuisine) and (difficulty is None or d == difficulty)
+                  and (max_cooking_time is None or t <= max_cooking_time))[:limit]
+
+
+def timings_us(call, args_list) -> dict:
+    timings = []
+    for args in args_list:
+        t = time.perf_counter()
+        call(args)
+        timings.append((time.perf_counter() - t) * 1e6)
+    timings.sort()
+    return {"runs": len(timings), "p50_us": round(statistics.median(timings), 1),
+            "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1), "max_us": round(timings[-1], 1)}
+
+
+def index_bytes(index: RecipeIndex) -> int:
+    arrays = [*index._postings.values(), index._cuisine, index._difficulty, index._time]
+    return sum(a.itemsize * len(a) for a in arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    rows = catalog(args.recipes, rnd)
+    index = RecipeIndex()
+    started = time.perf_counter()
+    index.load(rows)
+    build_seconds = time.perf_counter() - started
+
+    queries = [random_filters(rnd) for _ in range(args.queries)]
+    for filters in queries[:args.scans]:
+        assert index.query(**filters, limit=args.limit) == scan(rows, **filters, limit=args.limit)
+    updates = [(rnd.randrange(1, args.recipes + 1), rnd.choice(CUISINES), rnd.choice(COOKING_TIMES),
+                rnd.choice(DIFFICULTIES)) for _ in range(min(args.queries, 2000))]
+    results = {
+        "recipes": len(index),
+        "build_seconds": round(build_seconds, 2),
+        "index_mb": round(index_bytes(index) / 2 ** 20, 1),
+        "scan": timings_us(lambda f: scan(rows, **f, limit=args.limit), queries[:args.scans]),
+        "index": timings_us(lambda f: index.query(**f, limit=args.limit), queries),
+        "upsert": timings_us(lambda row: index.upsert([row]), updates),
+    }
+    results["speedup_p50"] = round(results["scan"]["p50_us"] / results["index"]["p50_us"])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
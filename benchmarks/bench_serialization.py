@@ -0,0 +1,84 @@
+"""Время ответа со списком из 10k пользователей: запрос + сериализация.
+
+    orm_json       — ORM-сущности, UserOut (orm_mode), jsonable_encoder, stdlib json
+                     (как FastAPI делает с response_model по умолчанию)
+    orm_orjson     — то же, но ORJSONResponse
+    rows_validated — только колонки UserOut, проверка схемой, orjson
+    rows_trusted   — только колонки UserOut, без проверки, orjson (путь GET /users/)
+
+    python -m benchmarks.bench_serialization --users 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import schemas
+from app.database import Base
+from app.models import Role, User
+from app.pagination import Page
+from app.serialization import page_response, rows_to_dicts
+from app.crud.user import USER_OUT_COLUMNS
+
+
+def seed(db_path: str, users: int):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Role), [{"name": "user"}])
+        conn.execute(insert(User), [{"email": f"user{i}@example.com", "role_id": 1, "password_hash": "x" * 100}
+                                    for i in range(users)])
+    return sessionmaker(bind=engine)
+
+
+def orm_page(db):
+    return Page(db.query(User).order_by(User.user_id).all(), None)
+
+
+def rows_page(db):
+    return Page(rows_to_dicts(db.query(*USER_OUT_COLUMNS).order_by(User.user_id).all()), None)
+
+
+PATHS = {
+    "orm_json": lambda db: JSONResponse(jsonable_encoder(schemas.UserPage.from_orm(orm_page(db)))),
+    "orm_orjson": lambda db: ORJSONResponse(jsonable_encoder(schemas.UserPage.from_orm(orm_page(db)))),
+    "rows_validated": lambda db: page_response(rows_page(db), schemas.UserOut, trusted=False),
+    "rows_trusted": lambda db: page_response(rows_page(db), schemas.UserOut, trusted=True),
+}
+
+
+def measure(SessionLocal, render, repeat: int) -> dict:
+    timings, size = [], 0
+    for _ in range(repeat):
+        # Новая сессия на каждый "запрос", как в get_db
+        with SessionLocal() as db:
+            t = time.perf_counter()
+            size = len(render(db).body)
+            timings.append((time.perf_counter() - t) * 1000)
+    return {"median_ms": round(statistics.median(timings), 2), "min_ms": round(min(timings), 2), "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        SessionLocal = seed(os.path.join(tmp, "bench.db"), args.users)
+        results = {name: measure(SessionLocal, render, args.repeat) for name, render in PATHS.items()}
+    baseline = results["orm_json"]["median_ms"]
+    for result in results.values():
+        result["speedup"] = round(baseline / result["median_ms"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,295 @@
+"""Размытие областей (ROI) в видео — закрываем оверлеи на роликах с рецептами.
+
+    python cv.py input1.mp4 input2.mp4 --roi 0,0,1080,120 --roi 0,1800,1080,120
+    python cv.py videos/*.mp4 --roi 0,0,1080,120 --ksize 101 --mode fast --workers 4 --out-dir blurred
+
+Каждый файл идёт конвейером из трёх потоков: чтение → размытие → запись,
+между ними ограниченные очереди (память не растёт, если запись отстаёт).
+OpenCV отпускает GIL в декодировании, фильтрах и кодировании, поэтому
+стадии работают параллельно. Несколько файлов — параллельно в пуле процессов.
+
+Режимы размытия:
+    gaussian — cv2.GaussianBlur с ядром ksize на всей области (как раньше)
+    fast     — область уменьшается в downscale раз, размывается ядром
+               ksize/downscale и растягивается обратно: для больших ядер
+               в downscale² раз меньше работы, на глаз то же размытие
+
+Нужны opencv-python и numpy.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple
+
 import cv2
-import numpy as np
-
-# Parameters (adjust these)
-input_video = "C:\\Users\\unluckyme\\Desktop\\input.mp4"
-output_video = "output_blurred.mp4"
-blur_strength = 51  # Must be odd number (higher = stronger blur)
-x, y, w, h = 0, 0, 1080, 120  # Region to blur (x, y, width, height)
-
-# Open video
-cap = cv2.VideoCapture(input_video)
-if not cap.isOpened():
-    print("Error opening video")
-    exit()
-
-# Get video properties
-fps = cap.get(cv2.CAP_PROP_FPS)
-width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-# Setup output video
-fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-out = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-    
-    # Extract ROI (Region of Interest)
-    roi = frame[y:y+h, x:x+w]
-    
-    # Apply blur to ROI
-    blurred_roi = cv2.GaussianBlur(roi, (blur_strength, blur_strength), 0)
-    
-    # Replace original ROI with blurred version
-    frame[y:y+h, x:x+w] = blurred_roi
-    
-    # Write frame to output
-    out.write(frame)
-
-# Cleanup
-cap.release()
-out.release()
-cv2.destroyAllWindows()
-print("Processing complete!")
\ No newline at end of file
+
+DEFAULT_KSIZE = 51
+# Кадров в каждой очереди между стадиями: 1080p BGR — ~6 МБ на кадр
+DEFAULT_QUEUE_SIZE = 8
+# Ядро после уменьшения не меньше этого: иначе заметна "ступенька"
+MIN_FAST_KSIZE = 9
+MODES = ("gaussian", "fast")
+_DONE = object()
+
+
+class ROI(NamedTuple):
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+class BlurOptions(NamedTuple):
+    rois: tuple
+    ksize: int = DEFAULT_KSIZE
+    mode: str = "gaussian"
+    downscale: int = None
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    fourcc: str = "mp4v"
+
+
+def parse_roi(value: str) -> ROI:
+    """"x,y,w,h" -> ROI."""
+    try:
+        roi = ROI(*(int(part) for part in value.split(",")))
+    except (TypeError, ValueError):
+        raise ValueError(f"ROI must be x,y,w,h: {value!r}")
+    if roi.x < 0 or roi.y < 0 or roi.w <= 0 or roi.h <= 0:
+        raise ValueError(f"ROI must have non-negative origin and positive size: {value!r}")
+    return roi
+
+
+def clip_roi(roi: ROI, width: int, height: int):
+    """Область в пределах кадра (срез numpy обрезал бы так же); None — вне кадра."""
+    x2, y2 = min(roi.x + roi.w, width), min(roi.y + roi.h, height)
+    if roi.x >= x2 or roi.y >= y2:
+        return None
+    return ROI(roi.x, roi.y, x2 - roi.x, y2 - roi.y)
+
+
+def _odd(value: int) -> int:
+    return max(1, value) | 1
+
+
+def auto_downscale(ksize: int) -> int:
+    return max(1, ksize // MIN_FAST_KSIZE)
+
+
+def gaussian_blur(region, ksize: int):
+    return cv2.GaussianBlur(region, (ksize, ksize), 0)
+
+
+def fast_blur(region, ksize: int, downscale: int = None):
+    """Размытие через уменьшенную копию: тот же радиус в пикселях исходника."""
+    downscale = downscale or auto_downscale(ksize)
+    height, width = region.shape[:2]
+    small_size = (max(1, width // downscale), max(1, height // downscale))
+    if downscale == 1 or small_size == (width, height):
+        return gaussian_blur(region, ksize)
+    small = cv2.resize(region, small_size, interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, (_odd(ksize // downscale),) * 2, 0)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def make_blur(options: BlurOptions):
+    """-> функция (frame) -> None, размывающая области кадра на месте."""
+    if options.ksize % 2 == 0 or options.ksize < 1:
+        raise ValueError(f"ksize must be a positive odd number: {options.ksize}")
+    if options.mode not in MODES:
+        raise ValueError(f"Unknown blur mode: {options.mode}")
+    clipped = {}
+
+    def blur(frame):
+        height, width = frame.shape[:2]
+        rois = clipped.get((width, height))
+        if rois is None:
+            rois = clipped[(width, height)] = [r for r in (clip_roi(roi, width, height) for roi in options.rois) if r]
+        for x, y, w, h in rois:
+            region = frame[y:y + h, x:x + w]
+            if options.mode == "fast":
+                frame[y:y + h, x:x + w] = fast_blur(region, options.ksize, options.downscale)
+            else:
+                frame[y:y + h, x:x + w] = gaussian_blur(region, options.ksize)
+
+    return blur
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def run_pipeline(read, blur, write, queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """read() -> кадр | None, blur(кадр) на месте, write(кадр); -> число кадров.
+
+    Чтение и размытие — в своих потоках, запись — в вызывающем. Ошибка в
+    любой стадии останавливает остальные и пробрасывается отсюда.
+    """
+    frames, blurred = queue.Queue(queue_size), queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        try:
+            while (frame := read()) is not None:
+                if not _put(frames, frame, stop):
+                    return
+            _put(frames, _DONE, stop)
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+
+    def blurrer():
+        try:
+            while (frame := _get(frames, stop)) is not _DONE:
+                blur(frame)
+                if not _put(blurred, frame, stop):
+                    return
+            _put(blurred, _DONE, stop)
+        except BaseException as exc:
+            errors.append(exc)
+            stop.set()
+
+    threads = [threading.Thread(target=reader, name="video-read", daemon=True),
+               threading.Thread(target=blurrer, name="video-blur", daemon=True)]
+    for thread in threads:
+        thread.start()
+    count = 0
+    try:
+        while (frame := _get(blurred, stop)) is not _DONE:
+            write(frame)
+            count += 1
+    except BaseException as exc:
+        errors.append(exc)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return count
+
+
+def process_video(src: str, dst: str, options: BlurOptions) -> dict:
+    """Один файл: -> {"src", "dst", "frames", "seconds", "fps"}."""
+    started = time.perf_counter()
+    capture = cv2.VideoCapture(str(src))
+    if not capture.isOpened():
+        raise IOError(f"Cannot open video: {src}")
+    writer = None
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        writer = cv2.VideoWriter(str(dst), cv2.VideoWriter_fourcc(*options.fourcc), fps, size)
+        if not writer.isOpened():
+            raise IOError(f"Cannot open video for writing: {dst}")
+
+        def read():
+            ok, frame = capture.read()
+            return frame if ok else None
+
+        frames = run_pipeline(read, make_blur(options), writer.write, options.queue_size)
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+    seconds = time.perf_counter() - started
+    return {"src": str(src), "dst": str(dst), "frames": frames, "seconds": round(seconds, 3),
+            "fps": round(frames / seconds, 1) if seconds else None}
+
+
+def output_path(src: str, out_dir: str) -> str:
+    return str(Path(out_dir) / f"{Path(src).stem}_blurred.mp4")
+
+
+def output_paths(inputs: list, out_dir: str) -> list:
+    """Пути результатов без совпадений: a/clip.mp4 и b/clip.mp4 -> clip_blurred.mp4, clip_2_blurred.mp4.
+
+    Иначе параллельные воркеры пишут в один файл и молча затирают друг друга.
+    """
+    taken, paths = set(), []
+    for src in inputs:
+        path, n = output_path(src, out_dir), 1
+        while path in taken:
+            n += 1
+            path = str(Path(out_dir) / f"{Path(src).stem}_{n}_blurred.mp4")
+        taken.add(path)
+        paths.append(path)
+    return paths
+
+
+def _init_worker(threads: int):
+    # Потоки OpenCV на процесс: пул процессов × потоки ≈ число ядер
+    cv2.setNumThreads(threads)
+
+
+def _process_safe(src: str, dst: str, options: BlurOptions) -> dict:
+    try:
+        return process_video(src, dst, options)
+    except Exception as exc:
+        return {"src": str(src), "dst": str(dst), "error": str(exc)}
+
+
+def process_files(jobs: list, options: BlurOptions, workers: int = None) -> dict:
+    """jobs — [(src, dst)]; -> отчёт по файлам и суммарные кадры/сек."""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    started = time.perf_counter()
+    if workers == 1:
+        files = [_process_safe(src, dst, options) for src, dst in jobs]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [pool.submit(_process_safe, src, dst, options) for src, dst in jobs]
+            files = [future.result() for future in as_completed(futures)]
+    seconds = time.perf_counter() - started
+    frames = sum(f.get("frames", 0) for f in files)
+    return {"files": sorted(files, key=lambda f: f["src"]), "workers": workers, "frames": frames,
+            "seconds": round(seconds, 3), "fps": round(frames / seconds, 1) if seconds else None,
+            "failed": sum(1 for f in files if "error" in f)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blur regions of videos")
+    parser.add_argument("inputs", nargs="+")
+    parser.add_argument("--roi", action="append", required=True, type=parse_roi,
+                        help="x,y,w,h; можно несколько")
+    parser.add_argument("--ksize", type=int, default=DEFAULT_KSIZE, help="нечётное, больше — сильнее")
+    parser.add_argument("--mode", choices=MODES, default="gaussian")
+    parser.add_argument("--downscale", type=int, help="для --mode fast; по умолчанию ksize // 9")
+    parser.add_argument("--workers", type=int, help="процессов; по умолчанию — по числу ядер")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--fourcc", default="mp4v")
+    parser.add_argument("--out-dir", default="blurred")
+    args = parser.parse_args(argv)
+    if args.ksize < 1 or args.ksize % 2 == 0:
+        parser.error("--ksize must be a positive odd number")
+
+    options = BlurOptions(tuple(args.roi), args.ksize, args.mode, args.downscale, args.queue_size, args.fourcc)
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = list(zip(args.inputs, output_paths(args.inputs, args.out_dir)))
+    report = process_files(jobs, options, args.workers)
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,10 @@
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.orm import Session
 import crud, models, schemas
-from database import engine, Base, SessionLocal
+from database import SessionLocal
+from app.pagination import PageParams, page_params
 
-# Создаем таблицы
-Base.metadata.create_all(bind=engine)
+# Таблицы создаются миграциями: alembic upgrade head
 
 app = FastAPI(title="User CRUD API")
 
@@ -27,9 +27,9 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
-@app.get("/users/", response_model=list[schemas.UserOut])
-def read_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_users(db, skip=skip, limit=limit)
+@app.get("/users/", response_model=schemas.UserPage)
+def read_users(page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
+    return crud.get_users(db, after_id=page.after, limit=page.limit)
 
 @app.put("/users/{user_id}", response_model=schemas.UserOut)
 def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db)):
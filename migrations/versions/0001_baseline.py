@@ -0,0 +1,93 @@
+"""Исходная схема: sql/scripts.sql до перехода на миграции, без единого добавления
+
+Базы, созданные раньше через scripts.sql или create_all, отмечаются без
+изменений: alembic stamp 0001. Всё, что появилось позже (recipes, индексы
+под keyset-запросы, logs.user_id ON DELETE SET NULL), — в 0001a и дальше.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "roles",
+        sa.Column("role_id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False, unique=True),
+    )
+
+    op.create_table(
+        "users",
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("role_id", sa.Integer(), sa.ForeignKey("roles.role_id"), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False, unique=True),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "sessions",
+        sa.Column("session_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("token", sa.String(255), nullable=False, unique=True),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        sa.Column("expired_at", sa.TIMESTAMP(), nullable=True),
+    )
+
+    op.create_table(
+        "user_preferences",
+        sa.Column("preference_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("cuisine", sa.String(100)),
+        sa.Column("max_cooking_time", sa.Integer()),
+        sa.Column("difficulty", sa.Enum("easy", "medium", "hard", name="difficulty")),
+    )
+
+    op.create_table(
+        "favorites",
+        sa.Column("favorite_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("recipe_hash", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        sa.UniqueConstraint("user_id", "recipe_hash"),
+    )
+
+    op.create_table(
+        "chat_sessions",
+        sa.Column("session_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("started_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        sa.Column("ended_at", sa.TIMESTAMP(), nullable=True),
+    )
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("message_id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("chat_sessions.session_id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("sent_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "logs",
+        sa.Column("log_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=True),
+        sa.Column("action", sa.String(255), nullable=False),
+        sa.Column("details", sa.Text()),
+        sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    for table in ("logs", "chat_messages", "chat_sessions", "favorites", "user_preferences",
+                  "sessions", "users", "roles"):
+        op.drop_table(table)
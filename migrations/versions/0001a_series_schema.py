@@ -0,0 +1,116 @@
+"""Добавления к исходной схеме до 0002: каталог recipes, индексы keyset-запросов,
+logs.user_id ON DELETE SET NULL
+
+    recipes                                 — каталог для индекса рекомендаций
+    sessions.expired_at                     — фоновая очистка просроченных сессий
+    favorites (user_id, created_at, id)     — избранное от новых к старым
+    chat_sessions.user_id                   — сессии чата пользователя
+    chat_messages (session_id, sent_at, id) — сообщения сессии постранично
+    logs (user_id, log_id), logs.created_at — журнал администратора
+    ix_<таблица>_<ключ>                     — индексы первичных ключей, как у моделей
+
+Каждый объект создаётся, только если его ещё нет: базы, созданные через
+create_all, уже имеют ix_roles_role_id и ix_users_user_id, а базы, поднятые
+прежней редакцией 0001, — всё перечисленное. Без подключения (--sql)
+считается, что база — ровно 0001.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_roles_role_id", "roles", ["role_id"]),
+    ("ix_users_user_id", "users", ["user_id"]),
+    ("ix_sessions_session_id", "sessions", ["session_id"]),
+    ("ix_sessions_expired_at", "sessions", ["expired_at"]),
+    ("ix_user_preferences_preference_id", "user_preferences", ["preference_id"]),
+    ("ix_favorites_favorite_id", "favorites", ["favorite_id"]),
+    ("ix_favorites_user_created", "favorites", ["user_id", "created_at", "favorite_id"]),
+    ("ix_chat_sessions_session_id", "chat_sessions", ["session_id"]),
+    ("ix_chat_sessions_user_id", "chat_sessions", ["user_id"]),
+    ("ix_chat_messages_message_id", "chat_messages", ["message_id"]),
+    ("ix_chat_messages_session_sent", "chat_messages", ["session_id", "sent_at", "message_id"]),
+    ("ix_logs_log_id", "logs", ["log_id"]),
+    ("ix_logs_user_id_log_id", "logs", ["user_id", "log_id"]),
+    ("ix_logs_created_at", "logs", ["created_at"]),
+)
+# Имя для безымянного внешнего ключа logs.user_id (SQLite, scripts.sql)
+LOGS_FK = "fk_logs_user_id_users"
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _inspector():
+    return None if context.is_offline_mode() else sa.inspect(op.get_bind())
+
+
+def _has_table(inspector, table: str) -> bool:
+    return inspector is not None and inspector.has_table(table)
+
+
+def _indexes(inspector, table: str) -> set:
+    return {index["name"] for index in inspector.get_indexes(table)} if inspector is not None else set()
+
+
+def _logs_fk(inspector):
+    if inspector is None:
+        # Без подключения имя не узнать: InnoDB называет первый безымянный ключ таблицы <таблица>_ibfk_1
+        name = "logs_ibfk_1" if op.get_context().dialect.name == "mysql" else None
+        return {"name": name, "options": {}}
+    return next(fk for fk in inspector.get_foreign_keys("logs") if fk["constrained_columns"] == ["user_id"])
+
+
+def _replace_logs_fk(name, ondelete):
+    with op.batch_alter_table("logs", naming_convention=NAMING) as batch:
+        batch.drop_constraint(name or LOGS_FK, type_="foreignkey")
+        batch.create_foreign_key(LOGS_FK, "users", ["user_id"], ["user_id"], ondelete=ondelete)
+
+
+def upgrade():
+    inspector = _inspector()
+    if not _has_table(inspector, "recipes"):
+        op.create_table(
+            "recipes",
+            sa.Column("recipe_id", sa.Integer(), primary_key=True),
+            sa.Column("recipe_hash", sa.String(64), nullable=False, unique=True),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("cuisine", sa.String(100), nullable=False),
+            sa.Column("cooking_time", sa.Integer(), nullable=False),
+            sa.Column("difficulty", sa.Enum("easy", "medium", "hard", name="difficulty"), nullable=False),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_recipes_recipe_id", "recipes", ["recipe_id"])
+        op.create_index("ix_recipes_updated", "recipes", ["updated_at", "recipe_id"])
+
+    existing = {}
+    for name, table, columns in INDEXES:
+        if table not in existing:
+            existing[table] = _indexes(inspector, table)
+        if name not in existing[table]:
+            op.create_index(name, table, columns)
+
+    # Журнал переживает удаление пользователя: user_id обнуляется
+    fk = _logs_fk(inspector)
+    if (fk["options"].get("ondelete") or "").upper() != "SET NULL":
+        _replace_logs_fk(fk["name"], "SET NULL")
+
+
+# Индексы, на которых в MySQL может держаться внешний ключ (первая колонка — ключ)
+FK_BACKED = {"ix_chat_sessions_user_id", "ix_chat_messages_session_sent", "ix_logs_user_id_log_id"}
+
+
+def downgrade():
+    _replace_logs_fk(_logs_fk(_inspector())["name"], None)
+    for name, table, columns in reversed(INDEXES):
+        if name in FK_BACKED and op.get_context().dialect.name == "mysql":
+            # Как в 0002: MySQL не удаляет индекс внешнего ключа, пока нет другого
+            op.create_index(f"fk_{table}_{columns[0]}", table, [columns[0]])
+        op.drop_index(name, table_name=table)
+    op.drop_table("recipes")
@@ -0,0 +1,56 @@
+"""Индексы под горячие запросы по внешним ключам, одна запись user_preferences на пользователя
+
+    users.role_id                    — EXISTS в delete_role, подсчёт пользователей по ролям
+    sessions (user_id, session_id)   — get_sessions(user_id=...) с keyset-пагинацией
+    chat_messages.user_id            — проверка внешнего ключа при удалении пользователя
+    user_preferences.user_id UNIQUE  — чтение/обновление/удаление по user_id (1:1)
+
+InnoDB сам индексирует колонки внешних ключей; его неявный индекс
+заменяется явным. SQLite и PostgreSQL без этой миграции ищут полным проходом.
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_users_role_id", "users", ["role_id"]),
+    ("ix_sessions_user_id_session_id", "sessions", ["user_id", "session_id"]),
+    ("ix_chat_messages_user_id", "chat_messages", ["user_id"]),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    # Дубликаты мешают уникальному ключу: оставляем самую раннюю запись — её
+    # и возвращал get_preference (.first() без сортировки). Производная
+    # таблица нужна MySQL: подзапрос к изменяемой таблице напрямую он не принимает
+    op.execute(
+        "DELETE FROM user_preferences WHERE preference_id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(preference_id) AS keep_id FROM user_preferences GROUP BY user_id) AS kept)"
+    )
+    with op.batch_alter_table("user_preferences") as batch:
+        batch.create_unique_constraint("uq_user_preferences_user_id", ["user_id"])
+
+
+def _keep_fk_index(table: str, column: str):
+    # MySQL не удаляет индекс, на котором держится внешний ключ: сначала
+    # возвращаем одиночный индекс по колонке ключа (как создал бы сам InnoDB)
+    if op.get_bind().dialect.name == "mysql":
+        op.create_index(f"fk_{table}_{column}", table, [column])
+
+
+def downgrade():
+    _keep_fk_index("user_preferences", "user_id")
+    with op.batch_alter_table("user_preferences") as batch:
+        batch.drop_constraint("uq_user_preferences_user_id", type_="unique")
+    for name, table, columns in reversed(INDEXES):
+        _keep_fk_index(table, columns[0])
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,24 @@
+"""Множитель лимитов запросов для роли (app/ratelimit.py)
+
+Существующие роли получают множитель 1 — лимиты как в RATE_LIMITS.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("roles", sa.Column("rate_limit_factor", sa.Float(), nullable=True, server_default=sa.text("1")))
+
+
+def downgrade():
+    with op.batch_alter_table("roles") as batch:
+        batch.drop_column("rate_limit_factor")
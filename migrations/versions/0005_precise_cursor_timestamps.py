@@ -0,0 +1,33 @@
+"""Микросекунды в chat_messages.sent_at и favorites.created_at (MySQL)
+
+По этим колонкам идут курсоры (время, id). TIMESTAMP в MySQL без fsp
+хранит целые секунды, и время из курсора не совпадает с хранимым.
+SQLite и PostgreSQL микросекунды уже хранят — там миграция ничего не делает.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (("chat_messages", "sent_at"), ("favorites", "created_at"))
+
+
+def _alter(fsp: str):
+    if op.get_bind().dialect.name != "mysql":
+        return
+    for table, column in COLUMNS:
+        op.execute(f"ALTER TABLE {table} MODIFY {column} TIMESTAMP{fsp} NULL DEFAULT CURRENT_TIMESTAMP{fsp}")
+
+
+def upgrade():
+    _alter("(6)")
+
+
+def downgrade():
+    _alter("")
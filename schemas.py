@@ -21,3 +21,10 @@ class UserOut(UserBase):
 
     class Config:
         orm_mode = True
+
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
@@ -1,7 +1,10 @@
+-- Справочная схема. Источник правды — миграции: alembic upgrade head (migrations/versions)
+
 -- 1. Roles
 CREATE TABLE roles (
     role_id INT AUTO_INCREMENT PRIMARY KEY,
-    name VARCHAR(50) NOT NULL UNIQUE
+    name VARCHAR(50) NOT NULL UNIQUE,
+    rate_limit_factor FLOAT DEFAULT 1 -- множитель лимитов запросов; NULL — без лимита на пользователя
 );
 
 -- 2. Users
@@ -11,7 +14,9 @@ CREATE TABLE users (
     email VARCHAR(100) UNIQUE NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (role_id) REFERENCES roles(role_id)
+    version INT NOT NULL DEFAULT 1, -- растёт при каждом изменении, из неё ETag
+    FOREIGN KEY (role_id) REFERENCES roles(role_id),
+    INDEX ix_users_role_id (role_id)
 );
 
 -- 3. Sessions (логины пользователя)
@@ -21,7 +26,9 @@ CREATE TABLE sessions (
     token VARCHAR(255) UNIQUE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     expired_at TIMESTAMP NULL,
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    INDEX ix_sessions_expired_at (expired_at),
+    INDEX ix_sessions_user_id_session_id (user_id, session_id)
 );
 
 -- 4. User Preferences
@@ -31,7 +38,9 @@ CREATE TABLE user_preferences (
     cuisine VARCHAR(100), -- любимая кухня
     max_cooking_time INT, -- мин.
     difficulty ENUM('easy','medium','hard'),
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    version INT NOT NULL DEFAULT 1,
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    CONSTRAINT uq_user_preferences_user_id UNIQUE (user_id)
 );
 
 -- 5. Favorites (сохраняем хэш/ссылку на рецепт)
@@ -39,9 +48,10 @@ CREATE TABLE favorites (
     favorite_id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     recipe_hash VARCHAR(255) NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6), -- микросекунды: курсор (created_at, favorite_id)
     UNIQUE(user_id, recipe_hash),
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    INDEX ix_favorites_user_created (user_id, created_at, favorite_id)
 );
 
 -- 6. Chat sessions
@@ -50,7 +60,8 @@ CREATE TABLE chat_sessions (
     user_id INT NOT NULL,
     started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     ended_at TIMESTAMP NULL,
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    INDEX ix_chat_sessions_user_id (user_id)
 );
 
 -- 7. Chat messages
@@ -59,9 +70,11 @@ CREATE TABLE chat_messages (
     session_id INT NOT NULL,
     user_id INT NOT NULL,
     message TEXT NOT NULL,
-    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6), -- микросекунды: курсор (sent_at, message_id)
     FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id),
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    INDEX ix_chat_messages_session_sent (session_id, sent_at, message_id),
+    INDEX ix_chat_messages_user_id (user_id)
 );
 
 -- 8. Logs (для администратора)
@@ -71,5 +84,19 @@ CREATE TABLE logs (
     action VARCHAR(255) NOT NULL,
     details TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE SET NULL,
+    INDEX ix_logs_user_id_log_id (user_id, log_id),
+    INDEX ix_logs_created_at (created_at)
+);
+
+-- 9. Recipes (каталог для рекомендаций)
+CREATE TABLE recipes (
+    recipe_id INT AUTO_INCREMENT PRIMARY KEY,
+    recipe_hash VARCHAR(64) UNIQUE NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    cuisine VARCHAR(100) NOT NULL,
+    cooking_time INT NOT NULL,
+    difficulty ENUM('easy','medium','hard') NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_recipes_updated (updated_at, recipe_id)
 );
@@ -3,10 +3,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from werkzeug.security import check_password_hash
 
-from database import Base
-from models import User, Role
-import crud
-from schemas import UserCreate, UserUpdate
+from app.database import Base
+from app.models import User, Role
+import app.crud.user as crud
+from app.schemas import UserCreate, UserUpdate
 
 # Используем in-memory SQLite для тестов
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import cache, audit
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    # Кэш общий на процесс, а БД в каждом тесте своя — не даём им пересекаться
+    monkeypatch.setattr(cache, "cache", cache.TTLCache())
+    yield cache.cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_audit(monkeypatch):
+    # Фоновый поток не запущен: тесты, которым нужен журнал, вызывают flush() сами
+    sink = audit.AuditSink()
+    monkeypatch.setattr(audit, "audit", sink)
+    yield sink
+
+
+@pytest.fixture
+def max_queries():
+    """with max_queries(n): ... — падает, если внутри выполнено больше n SQL-запросов.
+
+    Слушает все движки; выполненные запросы доступны через `as statements`.
+    """
+    @contextmanager
+    def check(limit: int):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(Engine, "before_cursor_execute", listener)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", listener)
+        assert len(statements) <= limit, f"{len(statements)} queries, expected at most {limit}:\n" + "\n".join(statements)
+
+    return check
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import get_current_user
+from app.database import Base, get_async_db, get_db
+from app.models import Role, User
+from app.routers import users_async
+
+@pytest.fixture(scope="function")
+def client(tmp_path):
+    db_file = tmp_path / "test.db"
+    sync_engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(Role.__table__.insert().values(name="user"))
+        conn.execute(Role.__table__.insert().values(name="admin"))
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    AsyncTestingSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(users_async.router)
+    # Проверка роли (require_admin) идёт через sync-сессию — та же БД
+    SyncTestingSession = sessionmaker(bind=sync_engine)
+
+    def override_get_db():
+        with SyncTestingSession() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_db] = override_get_db
+    # Владелец записи: первый созданный пользователь
+    app.dependency_overrides[get_current_user] = lambda: User(user_id=1, role_id=1)
+    with TestClient(app) as c:
+        yield c
+    sync_engine.dispose()
+
+def test_create_and_read_user(client):
+    r = client.post("/users/", json={"email": "async@example.com", "password": "123", "role_id": 1})
+    assert r.status_code == 200
+    user_id = r.json()["user_id"]
+
+    r = client.get(f"/users/{user_id}")
+    assert r.json()["email"] == "async@example.com"
+    assert len(client.get("/users/").json()["items"]) == 1
+
+def test_include_role(client):
+    user_id = client.post("/users/", json={"email": "role@example.com", "password": "1", "role_id": 1}).json()["user_id"]
+    assert client.get(f"/users/{user_id}", params={"include": "role"}).json()["role"]["name"] == "user"
+    assert client.get("/users/", params={"include": "role"}).json()["items"][0]["role"] == {"role_id": 1, "name": "user"}
+
+def test_delete_user(client):
+    user_id = client.post("/users/", json={"email": "del@example.com", "password": "1", "role_id": 1}).json()["user_id"]
+    assert client.delete(f"/users/{user_id}").status_code == 200
+    assert client.get(f"/users/{user_id}").status_code == 404
+
+def test_bulk_create_users(client):
+    payload = {"users": [
+        {"email": "b1@example.com", "password": "1", "role_id": 1},
+        {"email": "b1@example.com", "password": "2", "role_id": 1},
+    ]}
+    assert client.post("/users/bulk", json=payload).status_code == 403
+    client.app.dependency_overrides[get_current_user] = lambda: User(user_id=1, role_id=2)
+    report = client.post("/users/bulk", json=payload).json()
+    assert report["created"] == 1
+    assert [r["status"] for r in report["results"]] == ["created", "duplicate"]
+
+def test_login_issues_token(client):
+    client.post("/users/", json={"email": "login@example.com", "password": "pw", "role_id": 1})
+    r = client.post("/users/login", json={"email": "login@example.com", "password": "pw"})
+    assert r.json()["token_type"] == "bearer"
+    assert r.json()["user"]["email"] == "login@example.com"
+    assert client.post("/users/login", json={"email": "login@example.com", "password": "x"}).status_code == 401
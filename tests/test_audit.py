@@ -0,0 +1,111 @@
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import audit, hashing
+from app.audit import AuditSink
+from app.auth import require_admin
+from app.database import Base, get_db
+from app.hashing import PasswordHasher
+from app.models import Role, Log, User
+from app.routers import logs
+from app.schemas import UserCreate
+import app.crud.user as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@event.listens_for(engine, "connect")
+def enable_foreign_keys(dbapi_connection, connection_record):
+    # Как в MySQL: событие удалённого пользователя нарушает внешний ключ logs.user_id
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add(Role(name="user"))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = AuditSink(TestingSessionLocal, batch_size=50, flush_interval=60)
+    monkeypatch.setattr(audit, "audit", sink)
+    return sink
+
+def test_crud_events_flushed_in_one_insert(db, sink):
+    inserts = []
+    listener = lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO logs") else None
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        for i in range(3):
+            crud.create_user(db, UserCreate(email=f"u{i}@example.com", password="1", role_id=1))
+        assert db.query(Log).count() == 0
+        sink.flush()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert [log.action for log in db.query(Log)] == ["user_created"] * 3
+    assert len(inserts) == 1
+
+def test_full_buffer_sheds_load(sink):
+    sink.max_buffer = 2
+    for _ in range(5):
+        sink.record("noop")
+    assert sink.stats()["buffered"] == 2
+    assert sink.stats()["dropped"] == 3
+
+def test_background_flush_and_stop(db, sink):
+    sink.batch_size = 2
+    sink.start()
+    sink.record("a")
+    sink.record("b")
+    sink.record("c")
+    sink.stop()
+    assert db.query(Log).count() == 3
+
+def test_events_of_deleted_user_are_kept(db, sink):
+    user = crud.create_user(db, UserCreate(email="gone@example.com", password="1", role_id=1))
+    crud.delete_user(db, user.user_id)
+    inserts = []
+    listener = lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO logs") else None
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        sink.flush()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # Первый INSERT нарушил внешний ключ, повтор — с user_id = NULL у удалённого пользователя
+    assert len(inserts) == 2
+    assert sink.stats()["failed"] == 0
+    assert [(log.action, log.user_id) for log in db.query(Log).order_by(Log.log_id)] == [
+        ("user_created", None), ("user_deleted", None)]
+
+def test_read_logs_filtered_newest_first(db):
+    db.add(User(role_id=1, email="u@example.com", password_hash="x"))
+    db.commit()
+    db.add_all([
+        Log(user_id=None, action="noise", created_at=datetime(2024, 1, 1)),
+        Log(user_id=1, action="first", created_at=datetime(2024, 1, 2)),
+        Log(user_id=1, action="second", created_at=datetime(2024, 1, 3)),
+        Log(user_id=1, action="third", created_at=datetime(2024, 2, 1)),
+    ])
+    db.commit()
+    app = FastAPI()
+    app.include_router(logs.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[require_admin] = lambda: None
+    client = TestClient(app)
+
+    body = client.get("/logs/", params={"user_id": 1, "created_to": "2024-01-31T00:00:00", "limit": 1}).json()
+    assert [log["action"] for log in body["items"]] == ["second"]
+    body = client.get("/logs/", params={"user_id": 1, "created_to": "2024-01-31T00:00:00",
+                                        "cursor": body["next_cursor"]}).json()
+    assert [log["action"] for log in body["items"]] == ["first"]
+    assert body["next_cursor"] is None
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import hashing
+from app.auth import SessionSweeper
+from app.database import Base, get_db
+from app.hashing import PasswordHasher
+from app.models import Role, User, Session as UserSession
+from app.routers import users, logs
+from app.schemas import SessionCreate, SessionUpdate
+import app.crud.sessions as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([Role(name="user"), Role(name="admin")])
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(logs.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+@pytest.fixture
+def queries():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
+
+def login(client, email, role_id=1):
+    client.post("/users/", json={"email": email, "password": "pw", "role_id": role_id})
+    return client.post("/users/login", json={"email": email, "password": "pw"}).json()["access_token"]
+
+def test_login_token_resolves_current_user(client):
+    token = login(client, "me@example.com")
+    r = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.json()["email"] == "me@example.com"
+    assert client.get("/users/me").status_code == 401
+    assert client.get("/users/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+def test_validated_token_served_from_cache(client, queries):
+    token = login(client, "me@example.com")
+    client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    queries.clear()
+    client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert queries == []
+
+def test_expired_and_revoked_tokens_rejected(db):
+    db.add(User(role_id=1, email="u@example.com", password_hash="x"))
+    db.commit()
+    past = crud.create_session(db, SessionCreate(user_id=1, token="old", expired_at=datetime.now() - timedelta(seconds=1)))
+    live = crud.issue_session(db, 1)
+    assert crud.resolve_token(db, past.token) is None
+    assert crud.resolve_token(db, live.token) == 1
+
+    crud.update_session(db, live.session_id, SessionUpdate(expired_at=datetime.now() - timedelta(seconds=1)))
+    assert crud.resolve_token(db, live.token) is None
+
+def test_admin_routes_require_admin_role(client):
+    user_token = login(client, "user@example.com", role_id=1)
+    admin_token = login(client, "admin@example.com", role_id=2)
+    assert client.get("/logs/", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+    assert client.get("/logs/", headers={"Authorization": f"Bearer {admin_token}"}).status_code == 200
+
+def test_sweeper_deletes_expired_in_batches(db):
+    db.add(User(role_id=1, email="u@example.com", password_hash="x"))
+    past = datetime.now() - timedelta(hours=1)
+    db.add_all(UserSession(user_id=1, token=f"t{i}", expired_at=past) for i in range(5))
+    db.add(UserSession(user_id=1, token="live", expired_at=datetime.now() + timedelta(hours=1)))
+    db.commit()
+
+    assert SessionSweeper(TestingSessionLocal, batch_size=2).sweep() == 5
+    assert [s.token for s in db.query(UserSession)] == ["live"]
@@ -0,0 +1,107 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import hashing
+from app.auth import get_current_user
+from app.database import Base, get_db
+from app.hashing import PasswordHasher
+from app.models import Role, User
+from app.routers import users as users_router
+from app.schemas import UserCreate
+import app.crud.user as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@event.listens_for(engine, "connect")
+def enable_foreign_keys(dbapi_connection, connection_record):
+    # Как в MySQL/PostgreSQL: users.role_id проверяется внешним ключом
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+@pytest.fixture(scope="function")
+def db_session(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([Role(name="user"), Role(name="admin")])
+    db.commit()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+def test_bulk_create_reports_per_row(db_session):
+    existing = crud.create_user(db_session, UserCreate(email="old@example.com", password="1", role_id=1))
+    users = [
+        UserCreate(email="a@example.com", password="1", role_id=1),
+        UserCreate(email="old@example.com", password="1", role_id=1),
+        UserCreate(email="b@example.com", password="1", role_id=1),
+        UserCreate(email="a@example.com", password="2", role_id=1),
+    ]
+    report = crud.bulk_create_users(db_session, users)
+
+    assert report["created"] == 2
+    assert report["duplicates"] == 2
+    assert [r["status"] for r in report["results"]] == ["created", "duplicate", "created", "duplicate"]
+    assert report["results"][1]["user_id"] == existing.user_id
+    assert db_session.query(User).count() == 3
+
+def test_bulk_create_reports_rows_lost_to_a_race(db_session, monkeypatch):
+    # Параллельная регистрация того же email, пока хэшируются пароли
+    hash_many = hashing.hasher.hash_many
+
+    def racing_hash_many(passwords):
+        crud.create_user(db_session, UserCreate(email="race@example.com", password="x", role_id=1))
+        return hash_many(passwords)
+
+    monkeypatch.setattr(hashing.hasher, "hash_many", racing_hash_many)
+    users = [UserCreate(email=f"{name}@example.com", password="1", role_id=1) for name in ("a", "race", "b")]
+    report = crud.bulk_create_users(db_session, users)
+
+    assert [r["status"] for r in report["results"]] == ["created", "duplicate", "created"]
+    assert report["created"] == 2 and report["duplicates"] == 1
+    assert report["results"][1]["user_id"] == db_session.query(User.user_id).filter(User.email == "race@example.com").scalar()
+
+def test_bulk_create_reports_unknown_roles(db_session):
+    users = [UserCreate(email="a@example.com", password="1", role_id=1),
+             UserCreate(email="b@example.com", password="1", role_id=99),
+             UserCreate(email="b@example.com", password="1", role_id=2)]
+    report = crud.bulk_create_users(db_session, users)
+
+    assert [r["status"] for r in report["results"]] == ["created", "invalid_role", "created"]
+    assert (report["created"], report["duplicates"], report["invalid_roles"]) == (2, 0, 1)
+    assert report["results"][1].get("user_id") is None
+    assert db_session.query(User).count() == 2
+
+def test_bulk_create_inserts_in_batches(db_session):
+    inserts = []
+    listener = lambda conn, cursor, statement, params, context, executemany: \
+        inserts.append(statement) if statement.startswith("INSERT") else None
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        users = [UserCreate(email=f"u{i}@example.com", password="1", role_id=1) for i in range(50)]
+        report = crud.bulk_create_users(db_session, users, batch_size=20)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert report["created"] == 50
+    assert len(inserts) == 3
+    assert all(r["user_id"] for r in report["results"])
+
+def test_bulk_endpoint_is_admin_only(db_session):
+    app = FastAPI()
+    app.include_router(users_router.router)
+    app.dependency_overrides[get_db] = lambda: db_session
+    client = TestClient(app)
+    payload = {"users": [{"email": "bulk@example.com", "password": "1", "role_id": 1}]}
+    assert client.post("/users/bulk", json=payload).status_code == 401
+
+    user = crud.create_user(db_session, UserCreate(email="user@example.com", password="1", role_id=1))
+    app.dependency_overrides[get_current_user] = lambda: user
+    assert client.post("/users/bulk", json=payload).status_code == 403
+    assert db_session.query(User).filter(User.email == "bulk@example.com").count() == 0
+
+    admin = crud.create_user(db_session, UserCreate(email="admin@example.com", password="1", role_id=2))
+    app.dependency_overrides[get_current_user] = lambda: admin
+    assert client.post("/users/bulk", json=payload).json()["created"] == 1
@@ -0,0 +1,112 @@
+import sys
+import time
+import types
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import cache, hashing
+from app.cache import TTLCache, NullCache, SharedCache, InMemorySharedStore, make_cache
+from app.database import Base
+from app.hashing import PasswordHasher
+from app.models import Role
+from app.schemas import UserCreate, UserUpdate, RoleCreate, RoleUpdate, UserPreferenceCreate, UserPreferenceUpdate
+import app.crud.user as users_crud
+import app.crud.roles as roles_crud
+import app.crud.preferences as preferences_crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add(Role(name="user"))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def queries():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
+
+def test_ttl_cache_lru_and_expiry():
+    c = TTLCache(maxsize=2, ttl=0.05)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    time.sleep(0.06)
+    assert c.get("a") is None
+    assert c.stats.evictions == 2
+
+def test_shared_cache_with_fake_store():
+    store = InMemorySharedStore()
+    first, second = SharedCache(store), SharedCache(store)
+    first.set("user:1", {"email": "a@example.com"})
+    assert second.get("user:1") == {"email": "a@example.com"}
+    first.delete("user:1")
+    assert second.get("user:1") is None
+    assert second.stats.as_dict()["hits"] == 1
+
+def test_shared_cache_keeps_subsecond_ttl():
+    store = InMemorySharedStore()
+    shared = SharedCache(store)
+    shared.set("a", 1, ttl=0.05)
+    assert shared.get("a") == 1
+    time.sleep(0.06)
+    assert shared.get("a") is None
+
+def test_make_cache_backends(monkeypatch):
+    assert isinstance(make_cache("memory"), TTLCache)
+    assert isinstance(make_cache("none"), NullCache)
+    fake_redis = types.SimpleNamespace(Redis=types.SimpleNamespace(from_url=lambda url: InMemorySharedStore()))
+    monkeypatch.setitem(sys.modules, "redis", fake_redis)
+    assert isinstance(make_cache("redis"), SharedCache)
+    with pytest.raises(ValueError):
+        make_cache("memcached")
+
+def test_get_user_read_through_and_invalidation(db, queries):
+    user = users_crud.create_user(db, UserCreate(email="a@example.com", password="1", role_id=1))
+    db.expunge_all()
+
+    users_crud.get_user(db, user.user_id)
+    queries.clear()
+    db.expunge_all()
+    assert users_crud.get_user(db, user.user_id).email == "a@example.com"
+    assert queries == []
+
+    users_crud.update_user(db, user.user_id, UserUpdate(email="b@example.com"))
+    db.expunge_all()
+    assert users_crud.get_user(db, user.user_id).email == "b@example.com"
+    assert cache.cache.stats.invalidations == 1
+
+def test_roles_cached_and_invalidated(db, queries):
+    roles_crud.get_roles(db)
+    queries.clear()
+    assert [r.name for r in roles_crud.get_roles(db).items] == ["user"]
+    assert queries == []
+
+    roles_crud.create_role(db, RoleCreate(name="admin"))
+    roles_crud.update_role(db, 1, RoleUpdate(name="member"))
+    db.expunge_all()
+    assert [r.name for r in roles_crud.get_roles(db).items] == ["member", "admin"]
+    assert roles_crud.get_role(db, 1).name == "member"
+
+def test_preference_invalidated_on_update(db):
+    preferences_crud.create_preference(db, UserPreferenceCreate(user_id=1, cuisine="Italian"))
+    assert preferences_crud.get_preference(db, 1).cuisine == "Italian"
+    preferences_crud.update_preference(db, 1, UserPreferenceUpdate(cuisine="Asian"))
+    db.expunge_all()
+    assert preferences_crud.get_preference(db, 1).cuisine == "Asian"
+    preferences_crud.delete_preference(db, 1)
+    assert preferences_crud.get_preference(db, 1) is None
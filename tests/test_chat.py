@@ -0,0 +1,95 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.websockets import WebSocketDisconnect
+
+from app import hashing
+from app.database import Base, get_db
+from app.hashing import PasswordHasher
+from app.models import Role, ChatMessage
+from app.pagination import decode_cursor, encode_cursor
+from app.routers import users, chat
+import app.crud.chat as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([Role(name="user"), Role(name="admin")])
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(chat.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+def login(client, email, role_id=1):
+    client.post("/users/", json={"email": email, "password": "pw", "role_id": role_id})
+    token = client.post("/users/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}, token
+
+def test_send_and_page_messages(client):
+    headers, _ = login(client, "user@example.com")
+    session_id = client.post("/chat/sessions/", headers=headers).json()["session_id"]
+    for i in range(5):
+        client.post("/chat/messages/", json={"session_id": session_id, "message": f"m{i}"}, headers=headers)
+
+    body = client.get(f"/chat/messages/{session_id}", params={"limit": 3}, headers=headers).json()
+    assert [m["message"] for m in body["items"]] == ["m0", "m1", "m2"]
+    body = client.get(f"/chat/messages/{session_id}", params={"cursor": body["next_cursor"]}, headers=headers).json()
+    assert [m["message"] for m in body["items"]] == ["m3", "m4"]
+
+    since = body["items"][0]["message_id"]
+    body = client.get(f"/chat/messages/{session_id}", params={"since_id": since}, headers=headers).json()
+    assert [m["message"] for m in body["items"]] == ["m4"]
+
+def test_cursor_of_wrong_shape_is_400(client):
+    headers, _ = login(client, "user@example.com")
+    session_id = client.post("/chat/sessions/", headers=headers).json()["session_id"]
+    for key in (7, ["nope", 1], ["2024-01-01T00:00:00", "1"], ["2024-01-01T00:00:00"], [None, 1]):
+        r = client.get(f"/chat/messages/{session_id}", params={"cursor": encode_cursor(key)}, headers=headers)
+        assert r.status_code == 400, key
+
+def test_other_users_cannot_read_but_support_can(client):
+    owner, _ = login(client, "owner@example.com")
+    stranger, _ = login(client, "stranger@example.com")
+    support, _ = login(client, "support@example.com", role_id=2)
+    session_id = client.post("/chat/sessions/", headers=owner).json()["session_id"]
+    assert client.get(f"/chat/messages/{session_id}", headers=stranger).status_code == 403
+    assert client.post("/chat/messages/", json={"session_id": session_id, "message": "hi"}, headers=support).status_code == 200
+
+def test_websocket_pushes_new_messages(client):
+    headers, token = login(client, "user@example.com")
+    session_id = client.post("/chat/sessions/", headers=headers).json()["session_id"]
+    with client.websocket_connect(f"/chat/ws/{session_id}?token={token}") as ws:
+        client.post("/chat/messages/", json={"session_id": session_id, "message": "pushed"}, headers=headers)
+        assert ws.receive_json()["message"] == "pushed"
+
+def test_websocket_rejects_bad_token(client):
+    headers, _ = login(client, "user@example.com")
+    session_id = client.post("/chat/sessions/", headers=headers).json()["session_id"]
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/chat/ws/{session_id}?token=bad") as ws:
+            ws.receive_json()
+
+def test_messages_keyset_over_sent_at_and_id(db):
+    chat = crud.create_chat_session(db, 1)
+    db.add_all(ChatMessage(session_id=chat.session_id, user_id=1, message=str(i)) for i in range(3))
+    db.commit()
+    first = crud.get_messages(db, chat.session_id, limit=2)
+    rest = crud.get_messages(db, chat.session_id, after=decode_cursor(first.next_cursor))
+    assert [m.message for m in first.items + rest.items] == ["0", "1", "2"]
+    assert rest.next_cursor is None
@@ -0,0 +1,173 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import hashing
+from app.auth import get_current_user
+from app.database import Base, get_db, get_async_db
+from app.hashing import PasswordHasher
+from app.models import Role, User, UserPreference
+from app.schemas import RoleUpdate
+import app.crud.roles as roles_crud
+from app.routers import preferences, users, users_async
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([Role(name="user"), Role(name="admin")])
+    session.add_all(User(role_id=1, email=f"u{i}@example.com", password_hash="x") for i in range(2))
+    session.add(UserPreference(user_id=1, cuisine="thai", max_cooking_time=30, difficulty="easy"))
+    session.add(User(role_id=2, email="admin@example.com", password_hash="x"))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(params=["returning", "rowcount"])
+def client(request, db, monkeypatch):
+    # rowcount — путь MySQL: без RETURNING
+    if request.param == "rowcount":
+        monkeypatch.setattr(engine.dialect, "update_returning", False)
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(preferences.router)
+    app.dependency_overrides[get_db] = lambda: db
+    # Администратор: может менять и чужие записи, несуществующие — 404
+    app.dependency_overrides[get_current_user] = lambda: db.get(User, 3)
+    return TestClient(app)
+
+def test_get_returns_etag_and_304(client, max_queries):
+    r = client.get("/users/1")
+    etag = r.headers["etag"]
+    assert etag == '"1-1"' and r.headers["cache-control"] == "private, no-cache"
+
+    # Строка в кэше, но версия всё равно из БД — один SELECT по ключу
+    with max_queries(1):
+        r = client.get("/users/1", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.headers["etag"] == etag and r.content == b""
+    assert client.get("/users/1", headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    assert client.get("/users/1", headers={"If-None-Match": '"1-0"'}).json()["email"] == "u0@example.com"
+
+def test_304_loads_only_version(client, max_queries):
+    with max_queries(1) as statements:
+        r = client.get("/users/2", headers={"If-None-Match": '"2-1"'})
+    assert r.status_code == 304
+    assert "users.version" in statements[0] and "users.email" not in statements[0]
+    assert client.get("/users/9", headers={"If-None-Match": "*"}).status_code == 404
+
+def test_change_from_another_worker_is_not_304(client, db):
+    etag = client.get("/users/1").headers["etag"]
+    # Другой воркер обновил строку: кэш этого процесса о нём не знает
+    db.execute(update(User).where(User.user_id == 1).values(email="other@example.com", version=User.version + 1))
+    db.commit()
+    # Не 304: версия сверяется с БД (тело может прийти из кэша строк до истечения TTL)
+    assert client.get("/users/1", headers={"If-None-Match": etag}).status_code == 200
+
+def test_update_changes_etag(client):
+    etag = client.get("/users/1").headers["etag"]
+    r = client.put("/users/1", json={"email": "new@example.com"})
+    assert r.headers["etag"] == '"1-2"'
+    r = client.get("/users/1", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["email"] == "new@example.com"
+    assert r.headers["etag"] == '"1-2"'
+
+def test_if_match_prevents_lost_update(client):
+    etag = client.get("/users/1").headers["etag"]
+    first = client.put("/users/1", json={"email": "first@example.com"}, headers={"If-Match": etag})
+    assert first.status_code == 200
+    second = client.put("/users/1", json={"email": "second@example.com"}, headers={"If-Match": etag})
+    assert second.status_code == 412
+    assert client.get("/users/1").json()["email"] == "first@example.com"
+
+    # Слабый тег и тег другой записи не подходят; "*" — любая версия
+    current = first.headers["etag"]
+    for header in (f"W/{current}", '"2-2"', "garbage"):
+        assert client.put("/users/1", json={"email": "x@example.com"}, headers={"If-Match": header}).status_code == 412
+    assert client.put("/users/1", json={"email": "x@example.com"}, headers={"If-Match": "*"}).status_code == 200
+    assert client.put("/users/9", json={"email": "x@example.com"}, headers={"If-Match": '"9-1"'}).status_code == 404
+
+def test_if_match_without_changes(client):
+    assert client.put("/users/1", json={}, headers={"If-Match": '"1-1"'}).status_code == 200
+    assert client.put("/users/1", json={}, headers={"If-Match": '"1-5"'}).status_code == 412
+
+def test_include_role_has_own_etag(client, db):
+    plain = client.get("/users/1").headers["etag"]
+    r = client.get("/users/1", params={"include": "role"}, headers={"If-None-Match": plain})
+    # Тег простого представления к представлению с ролью не подходит
+    assert r.status_code == 200 and r.json()["role"] is not None
+    etag = r.headers["etag"]
+    assert etag != plain and etag.startswith('"1-1-role.')
+    assert client.get("/users/1", params={"include": "role"}, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/users/1", headers={"If-None-Match": etag}).status_code == 200
+    # If-Match сравнивает с простым представлением — тег с ролью не подходит
+    assert client.put("/users/1", json={}, headers={"If-Match": etag}).status_code == 412
+
+    # Переименование роли не меняет версию пользователя, но меняет тег
+    roles_crud.update_role(db, 1, RoleUpdate(name="renamed"))
+    r = client.get("/users/1", params={"include": "role"}, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["role"]["name"] == "renamed" and r.headers["etag"] != etag
+
+def test_preferences(client, max_queries):
+    r = client.get("/preferences/1")
+    etag = r.headers["etag"]
+    assert etag == '"1-1"'
+    with max_queries(1):
+        assert client.get("/preferences/1", headers={"If-None-Match": etag}).status_code == 304
+
+    r = client.put("/preferences/1", json={"cuisine": "greek"}, headers={"If-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] == '"1-2"'
+    assert client.put("/preferences/1", json={"cuisine": "thai"}, headers={"If-Match": etag}).status_code == 412
+    assert client.get("/preferences/1", headers={"If-None-Match": etag}).json()["cuisine"] == "greek"
+
+def test_recreated_preferences_get_new_etag(client, db):
+    # Запись не последняя: SQLite без AUTOINCREMENT переиспользует только максимальный rowid
+    db.add(UserPreference(user_id=2))
+    db.commit()
+    etag = client.get("/preferences/1").headers["etag"]
+    client.delete("/preferences/1")
+    # Новая запись — новый первичный ключ, версия снова 1
+    db.add(UserPreference(user_id=1, cuisine="greek"))
+    db.commit()
+    r = client.get("/preferences/1", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] == '"3-1"'
+
+@pytest.fixture
+def async_client(tmp_path):
+    db_file = tmp_path / "test.db"
+    sync_engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(Role.__table__.insert().values(name="user"))
+        conn.execute(User.__table__.insert().values(role_id=1, email="a@example.com", password_hash="x"))
+
+    AsyncTestingSession = async_sessionmaker(bind=create_async_engine(f"sqlite+aiosqlite:///{db_file}"),
+                                             expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(users_async.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_current_user] = lambda: User(user_id=1, role_id=1)
+    with TestClient(app) as c:
+        yield c
+    sync_engine.dispose()
+
+def test_async_users(async_client):
+    etag = async_client.get("/users/1").headers["etag"]
+    assert async_client.get("/users/1", headers={"If-None-Match": etag}).status_code == 304
+    r = async_client.put("/users/1", json={"email": "b@example.com"}, headers={"If-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] == '"1-2"'
+    assert async_client.put("/users/1", json={"email": "c@example.com"}, headers={"If-Match": etag}).status_code == 412
+    assert async_client.get("/users/1", headers={"If-None-Match": etag}).json()["email"] == "b@example.com"
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import cv  # noqa: E402
+
+
+def noisy_frame(width=320, height=240, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def test_parse_and_clip_roi():
+    assert cv.parse_roi("0,10,100,20") == cv.ROI(0, 10, 100, 20)
+    for bad in ("1,2,3", "a,b,c,d", "0,0,0,10", "-1,0,5,5"):
+        with pytest.raises(ValueError):
+            cv.parse_roi(bad)
+    assert cv.clip_roi(cv.ROI(300, 200, 100, 100), 320, 240) == cv.ROI(300, 200, 20, 40)
+    assert cv.clip_roi(cv.ROI(400, 0, 10, 10), 320, 240) is None
+
+
+@pytest.mark.parametrize("mode", cv.MODES)
+def test_blur_changes_only_regions(mode):
+    frame = noisy_frame()
+    original = frame.copy()
+    cv.make_blur(cv.BlurOptions((cv.ROI(0, 0, 320, 40), cv.ROI(300, 220, 50, 50)), ksize=31, mode=mode))(frame)
+    assert frame[0:40].std() < original[0:40].std() / 3
+    assert frame[220:, 300:].std() < original[220:, 300:].std() / 3
+    np.testing.assert_array_equal(frame[40:220], original[40:220])
+
+
+def test_fast_blur_is_close_to_gaussian():
+    # Гладкий кадр: в шуме разница была бы неинформативной
+    frame = cv2.GaussianBlur(noisy_frame(640, 480), (0, 0), 8)
+    exact = cv.gaussian_blur(frame, 101).astype(int)
+    fast = cv.fast_blur(frame, 101).astype(int)
+    assert np.abs(exact - fast).mean() < 3
+    with pytest.raises(ValueError):
+        cv.make_blur(cv.BlurOptions((cv.ROI(0, 0, 1, 1),), ksize=50))
+
+
+def test_pipeline_keeps_order_and_bounds_queue():
+    frames = [np.full((8, 8, 3), i, dtype=np.uint8) for i in range(50)]
+    source, written, in_flight, peak = iter(frames), [], [0], [0]
+    lock = threading.Lock()
+
+    def read():
+        frame = next(source, None)
+        if frame is not None:
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+        return frame
+
+    def write(frame):
+        with lock:
+            in_flight[0] -= 1
+        written.append(int(frame[0, 0, 0]))
+
+    assert cv.run_pipeline(read, lambda frame: None, write, queue_size=2) == 50
+    assert written == list(range(50))
+    # По очереди на стадию + кадр в каждом потоке
+    assert peak[0] <= 2 * 2 + 3
+
+
+def test_pipeline_propagates_stage_errors():
+    def blur(frame):
+        raise RuntimeError("bad frame")
+
+    frames = iter([np.zeros((4, 4, 3), np.uint8)] * 100)
+    with pytest.raises(RuntimeError, match="bad frame"):
+        cv.run_pipeline(lambda: next(frames, None), blur, lambda frame: None, queue_size=2)
+
+
+def test_process_files_writes_outputs_and_reports_failures(tmp_path):
+    src = tmp_path / "clip.mp4"
+    writer = cv2.VideoWriter(str(src), cv2.VideoWriter_fourcc(*"mp4v"), 25, (160, 120))
+    for i in range(20):
+        writer.write(noisy_frame(160, 120, seed=i))
+    writer.release()
+
+    options = cv.BlurOptions((cv.ROI(0, 0, 160, 30),), ksize=15)
+    jobs = [(str(src), cv.output_path(str(src), tmp_path / "out")), (str(tmp_path / "missing.mp4"), "x.mp4")]
+    (tmp_path / "out").mkdir()
+    report = cv.process_files(jobs, options, workers=1)
+    assert report["frames"] == 20 and report["failed"] == 1
+    capture = cv2.VideoCapture(cv.output_path(str(src), tmp_path / "out"))
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 20
+    capture.release()
+
+def test_output_paths_do_not_collide():
+    paths = cv.output_paths(["a/clip.mp4", "b/clip.mp4", "c/clip.avi", "d/other.mp4"], "out")
+    assert paths == ["out/clip_blurred.mp4", "out/clip_2_blurred.mp4", "out/clip_3_blurred.mp4",
+                     "out/other_blurred.mp4"]
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.database import engine_options, make_engine, pool_status, TimedQueuePool
+
+def test_engine_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "3")
+    monkeypatch.setenv("DB_ECHO", "true")
+    monkeypatch.setenv("DB_ISOLATION_LEVEL", "READ COMMITTED")
+    options = engine_options("mysql+pymysql://u:p@localhost/db")
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["echo"] is True
+    assert options["pool_pre_ping"] is True
+    assert options["isolation_level"] == "READ COMMITTED"
+
+def test_sqlite_has_no_queue_pool_options():
+    options = engine_options("sqlite:///:memory:")
+    assert "pool_size" not in options
+
+def test_pool_status_counts_checkouts_and_timeouts(tmp_path):
+    engine = make_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.01,
+    )
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert pool_status(engine)["checked_out"] == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 2
+    assert status["timeouts"] == 1
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth import require_admin
+from app.database import Base, get_db
+from app.models import Role, User
+from app.routers import roles, users
+import app.crud.roles as roles_crud
+import app.crud.user as users_crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([Role(name="user"), Role(name="admin"), Role(name="guest")])
+    session.add_all(User(role_id=1 + i % 2, email=f"u{i}@example.com", password_hash="x") for i in range(20))
+    session.commit()
+    session.expire_all()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(roles.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[require_admin] = lambda: None
+    return TestClient(app)
+
+def test_users_list_with_roles_is_one_query(client, max_queries):
+    with max_queries(1):
+        body = client.get("/users/", params={"include": "role", "limit": 20}).json()
+    assert [u["role"]["name"] for u in body["items"][:3]] == ["user", "admin", "user"]
+    assert "role" not in client.get("/users/").json()["items"][0]
+
+def test_user_with_role_is_one_query_then_cached(client, max_queries):
+    with max_queries(1):
+        assert client.get("/users/2", params={"include": "role"}).json()["role"] == {"role_id": 2, "name": "admin"}
+    with max_queries(1):
+        # Пользователь уже в кэше, роль — один раз из БД
+        assert client.get("/users/2", params={"include": "role"}).json()["role"]["name"] == "admin"
+    with max_queries(0):
+        client.get("/users/2", params={"include": "role"})
+    assert "role" not in client.get("/users/2").json()
+
+def test_orm_options_load_roles_up_front(db, max_queries):
+    with max_queries(1):
+        page = users_crud.get_users(db, limit=20, options=users_crud.WITH_ROLE)
+        names = {u.role.name for u in page.items}
+    assert names == {"user", "admin"}
+
+def test_roles_with_counts_and_users(client, max_queries):
+    with max_queries(1):
+        body = client.get("/roles/").json()
+    assert [(r["name"], r["user_count"]) for r in body] == [("user", 10), ("admin", 10), ("guest", 0)]
+    with max_queries(2):
+        body = client.get("/roles/2", params={"include": "users", "limit": 6}).json()
+    assert [u["user_id"] for u in body["users"]["items"]] == [2, 4, 6, 8, 10, 12]
+    params = {"include": "users", "limit": 6, "cursor": body["users"]["next_cursor"]}
+    body = client.get("/roles/2", params=params).json()
+    assert [u["user_id"] for u in body["users"]["items"]] == [14, 16, 18, 20]
+    assert body["users"]["next_cursor"] is None
+    assert "users" not in client.get("/roles/3").json()
+    assert client.get("/roles/3", params={"include": "users"}).json()["users"] == {"items": [], "next_cursor": None}
+
+def test_delete_role_checks_usage_without_loading_users(client, db, max_queries):
+    assert client.delete("/roles/1").status_code == 409
+    with max_queries(4) as statements:
+        assert client.delete("/roles/3").json()["name"] == "guest"
+    assert not any(s.startswith("SELECT users.") for s in statements)
+    with pytest.raises(roles_crud.RoleInUse):
+        roles_crud.delete_role(db, 2)
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Role, User, Log
+from app.auth import require_admin
+from app.routers import export
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def client():
+    Base.metadata.create_all(bind=engine)
+    with TestingSessionLocal() as db:
+        db.add(Role(name="user"))
+        db.add_all(
+            User(role_id=1, email=f"u{i}@example.com", password_hash="x", created_at=datetime(2024, 1, i + 1))
+            for i in range(5)
+        )
+        db.add(Log(user_id=1, action="user_created", details="id=1", created_at=datetime(2024, 1, 1)))
+        db.commit()
+    app = FastAPI()
+    app.include_router(export.router)
+    app.dependency_overrides[export.get_session_factory] = lambda: TestingSessionLocal
+    app.dependency_overrides[require_admin] = lambda: None
+    yield TestClient(app)
+    Base.metadata.drop_all(bind=engine)
+
+def test_export_users_ndjson_without_password_hash(client):
+    r = client.get("/export/users")
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["email"] for row in rows] == [f"u{i}@example.com" for i in range(5)]
+    assert "password_hash" not in rows[0]
+
+def test_export_users_csv_with_created_at_range(client):
+    r = client.get("/export/users", params={"format": "csv", "created_from": "2024-01-02T00:00:00", "created_to": "2024-01-04T00:00:00"})
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["email"] for row in rows] == ["u1@example.com", "u2@example.com"]
+
+def test_export_logs(client):
+    rows = [json.loads(line) for line in client.get("/export/logs").text.splitlines()]
+    assert rows[0]["action"] == "user_created"
+
+def test_stream_is_chunked(client):
+    chunks = list(export.stream_rows(TestingSessionLocal, export.USER_COLUMNS, User.created_at, "ndjson", chunk_size=2))
+    assert [chunk.count("\n") for chunk in chunks] == [2, 2, 1]
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth import get_current_user
+from app.database import Base, get_db
+from app.models import Role, User
+from app.pagination import encode_cursor
+from app.routers import favorites
+import app.crud.favorites as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add(Role(name="user"))
+    session.add_all([User(role_id=1, email="a@example.com", password_hash="x"),
+                     User(role_id=1, email="b@example.com", password_hash="x")])
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(favorites.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: db.get(User, 1)
+    return TestClient(app)
+
+@pytest.fixture
+def queries():
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(engine, "before_cursor_execute", listener)
+
+def test_add_is_idempotent_and_listing_newest_first(client):
+    for h in ("r1", "r2", "r3", "r1"):
+        client.post("/favorites/", json={"recipe_hash": h})
+    body = client.get("/favorites/", params={"limit": 2}).json()
+    assert [f["recipe_hash"] for f in body["items"]] == ["r3", "r2"]
+    body = client.get("/favorites/", params={"cursor": body["next_cursor"]}).json()
+    assert [f["recipe_hash"] for f in body["items"]] == ["r1"]
+
+def test_cursor_of_wrong_shape_is_400(client):
+    for key in (7, ["nope", 1], ["2024-01-01 00:00:00", 1.5], "2024-01-01"):
+        assert client.get("/favorites/", params={"cursor": encode_cursor(key)}).status_code == 400, key
+
+def test_check_answers_page_in_one_query_then_from_cache(db, queries):
+    crud.add_favorite(db, 1, "r1")
+    crud.add_favorite(db, 2, "r2")
+    queries.clear()
+
+    assert crud.check_favorites(db, 1, ["r1", "r2", "r3"]) == {"r1": True, "r2": False, "r3": False}
+    assert len(queries) == 1 and " IN " in queries[0]
+    queries.clear()
+    assert crud.check_favorites(db, 1, ["r3", "r1"]) == {"r3": False, "r1": True}
+    assert queries == []
+
+def test_check_invalidated_on_add_and_remove(client):
+    assert client.post("/favorites/check", json={"recipe_hashes": ["r1"]}).json()["favorited"] == {"r1": False}
+    client.post("/favorites/", json={"recipe_hash": "r1"})
+    assert client.post("/favorites/check", json={"recipe_hashes": ["r1"]}).json()["favorited"] == {"r1": True}
+    assert client.delete("/favorites/r1").status_code == 200
+    assert client.post("/favorites/check", json={"recipe_hashes": ["r1"]}).json()["favorited"] == {"r1": False}
+    assert client.delete("/favorites/r1").status_code == 404
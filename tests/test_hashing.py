@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import hashing
+from app.database import Base
+from app.hashing import PasswordHasher, HasherBusy
+from app.models import Role
+from app.schemas import UserCreate
+import app.crud.user as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add(Role(name="user"))
+    db.commit()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def pool_hasher():
+    h = PasswordHasher(method="pbkdf2:sha256:1000", workers=1, max_pending=1)
+    yield h
+    h.shutdown()
+
+def test_hash_and_verify_in_process_pool(pool_hasher):
+    password_hash = pool_hasher.hash("secret")
+    assert password_hash.startswith("pbkdf2:sha256:1000$")
+    assert pool_hasher.verify(password_hash, "secret")
+    assert not pool_hasher.verify(password_hash, "wrong")
+
+def test_full_queue_raises_busy(pool_hasher):
+    pending = pool_hasher._submit(time.sleep, 0.5)
+    with pytest.raises(HasherBusy):
+        pool_hasher.hash("secret")
+    pending.result()
+    assert pool_hasher.hash("secret")
+
+def test_hash_many_keeps_few_chunks_in_pool():
+    # Пул — FIFO: пачка не должна занимать его целиком, иначе одиночный verify ждёт её всю
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=2, bulk_chunk=3)
+    executor, in_pool, peak = ThreadPoolExecutor(2), [], []
+
+    class Recording:
+        def submit(self, fn, *args):
+            future = executor.submit(fn, *args)
+            in_pool.append(future)
+            peak.append(sum(not f.done() for f in in_pool))
+            return future
+
+    hasher._get_executor = Recording
+    passwords = [f"p{i}" for i in range(20)]
+    hashes = hasher.hash_many(passwords)
+    executor.shutdown()
+    assert len(in_pool) == 7 and max(peak) <= 2
+    assert all(PasswordHasher(workers=0).verify(h, p) for h, p in zip(hashes, passwords))
+
+def test_needs_rehash_on_cost_change():
+    old = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+    new = PasswordHasher(method="pbkdf2:sha256:2000", workers=0)
+    password_hash = old.hash("secret")
+    assert not old.needs_rehash(password_hash)
+    assert new.needs_rehash(password_hash)
+
+def test_login_rehashes_outdated_hash(db_session, monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    user = crud.create_user(db_session, UserCreate(email="old@example.com", password="123", role_id=1))
+
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:2000", workers=0))
+    assert crud.authenticate_user(db_session, "old@example.com", "wrong") is None
+    logged_in = crud.authenticate_user(db_session, "old@example.com", "123")
+    assert logged_in.user_id == user.user_id
+    assert logged_in.password_hash.startswith("pbkdf2:sha256:2000$")
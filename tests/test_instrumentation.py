@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.instrumentation import InstrumentationMiddleware
+from app.metrics import Registry
+from app.models import Role, User
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all(Role(name=f"role{i}") for i in range(6))
+    session.add_all(User(role_id=1 + i, email=f"u{i}@example.com", password_hash="x") for i in range(6))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+def build(db, **options):
+    registry = Registry()
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware, registry=registry, **options)
+    app.dependency_overrides[get_db] = lambda: db
+
+    @app.get("/users/{user_id}")
+    def read_user(user_id: int, db: Session = Depends(get_db)):
+        return {"email": db.get(User, user_id).email}
+
+    @app.get("/roles-of-users")
+    def roles_of_users(db: Session = Depends(get_db)):
+        # Ленивая загрузка User.role — по запросу на каждого пользователя
+        return [user.role.name for user in db.query(User).all()]
+
+    @app.get("/slow")
+    def slow():
+        time.sleep(0.05)
+        return {}
+
+    return TestClient(app), registry
+
+def find(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+def test_route_template_labels_and_sql_counts(db):
+    client, registry = build(db)
+    client.get("/users/1")
+    client.get("/users/2")
+    client.get("/missing")
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/users/{user_id}",status="200"} 2' in text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert find(text, 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}"}') == [
+        'http_request_duration_seconds_count{method="GET",route="/users/{user_id}"} 2']
+    assert 'http_request_sql_statements_sum{method="GET",route="/users/{user_id}"} 2.0' in text
+
+def test_lazy_loading_is_flagged_as_n_plus_one(db):
+    client, registry = build(db, n_plus_one_threshold=5)
+    db.expire_all()
+    client.get("/roles-of-users")
+    client.get("/users/1")
+    text = registry.render()
+    assert 'http_request_n_plus_one_total{method="GET",route="/roles-of-users"} 1' in text
+    assert 'route="/users/{user_id}"' not in "".join(find(text, "http_request_n_plus_one_total{"))
+
+def test_slow_request_profile_is_dumped(db, tmp_path):
+    client, registry = build(db, profile_slow_ms=20, profile_dir=str(tmp_path), profile_interval=0.002)
+    client.get("/users/1")
+    client.get("/slow")
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and "GET_slow" in files[0]
+    stacks = dict(line.rsplit(" ", 1) for line in (tmp_path / files[0]).read_text().splitlines())
+    in_endpoint = [stack for stack in stacks if "test_instrumentation:slow:" in stack]
+    assert in_endpoint and all(";" in stack for stack in in_endpoint)
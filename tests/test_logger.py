@@ -0,0 +1,32 @@
+import json
+import logging
+import queue
+
+from app.logger import setup_logger, DroppingQueueHandler
+
+def make_record(msg):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None)
+
+def test_json_output_written_by_background_listener(tmp_path):
+    log_file = tmp_path / "test.log"
+    log = setup_logger("test_json_logger", str(log_file), fmt="json")
+    log.info("User created: id=%s", 42)
+    log.listener.stop()
+
+    entry = json.loads(log_file.read_text(encoding="utf-8").splitlines()[-1])
+    assert entry["message"] == "User created: id=42"
+    assert entry["level"] == "INFO"
+
+def test_drop_new_policy_keeps_oldest():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1), policy="drop_new")
+    handler.handle(make_record("first"))
+    handler.handle(make_record("second"))
+    assert handler.queue.get_nowait().getMessage() == "first"
+    assert handler.dropped == 1
+
+def test_drop_old_policy_keeps_newest():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1), policy="drop_old")
+    handler.handle(make_record("first"))
+    handler.handle(make_record("second"))
+    assert handler.queue.get_nowait().getMessage() == "second"
+    assert handler.dropped == 1
@@ -0,0 +1,205 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import MetaData, create_engine, event, insert, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud import chat, favorites, preferences, recipes, roles, sessions
+from app.database import Base
+from app.models import ChatMessage, ChatSession, Favorite, Log, Recipe, Role, Session as UserSession, User, \
+    UserPreference
+from app.pagination import PageParams
+from app.routers.logs import read_logs
+from app.schemas import UserPreferenceCreate, UserPreferenceUpdate
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+# Таблицы-справочники из нескольких строк: полный проход по ним дешевле индекса
+SMALL_TABLES = {"roles"}
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def migrate(engine):
+    def run(action: str, revision: str):
+        config = Config(ALEMBIC_INI)
+        config.attributes["configure_logger"] = False
+        with engine.begin() as connection:
+            config.attributes["connection"] = connection
+            getattr(command, action)(config, revision)
+
+    return run
+
+
+def seed(engine):
+    now = datetime.now()
+    with engine.begin() as conn:
+        # Таблицы как в текущей ревизии схемы, а не как в моделях (в старых ревизиях нет новых колонок)
+        tables = MetaData()
+        tables.reflect(conn)
+        table = lambda model: tables.tables[model.__tablename__]
+        conn.execute(insert(table(Role)), [{"name": "user"}, {"name": "admin"}])
+        conn.execute(insert(table(User)), [{"email": f"u{i}@example.com", "role_id": 1, "password_hash": "x"}
+                                           for i in range(1, 21)])
+        conn.execute(insert(table(UserSession)), [{"user_id": i % 20 + 1, "token": f"t{i}", "expired_at": now}
+                                                  for i in range(40)])
+        conn.execute(insert(table(UserPreference)), [{"user_id": i, "cuisine": "thai"} for i in range(1, 21)])
+        conn.execute(insert(table(Favorite)), [{"user_id": i % 20 + 1, "recipe_hash": f"r{i}"} for i in range(40)])
+        conn.execute(insert(table(ChatSession)), [{"user_id": 1}])
+        conn.execute(insert(table(ChatMessage)), [{"session_id": 1, "user_id": 1, "message": "hi"}])
+        conn.execute(insert(table(Log)), [{"user_id": i % 20 + 1, "action": "login"} for i in range(40)])
+        if Recipe.__tablename__ in tables.tables:  # каталог появился в 0001a
+            conn.execute(insert(table(Recipe)), [{"recipe_hash": f"h{i}", "title": "t", "cuisine": "thai",
+                                                  "cooking_time": 10, "difficulty": "easy"} for i in range(20)])
+
+
+# sql/scripts.sql исходной схемы (до миграций), переведённый на SQLite:
+# AUTO_INCREMENT -> INTEGER NOT NULL PRIMARY KEY, ENUM -> VARCHAR, UNIQUE — отдельной строкой
+# (встроенный в колонку UNIQUE SQLite не отдаёт при отражении схемы)
+BASELINE_SQL = """
+CREATE TABLE roles (role_id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(50) NOT NULL, UNIQUE (name));
+CREATE TABLE users (
+    user_id INTEGER NOT NULL PRIMARY KEY, role_id INT NOT NULL, email VARCHAR(100) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE (email),
+    FOREIGN KEY (role_id) REFERENCES roles(role_id));
+CREATE TABLE sessions (
+    session_id INTEGER NOT NULL PRIMARY KEY, user_id INT NOT NULL, token VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, expired_at TIMESTAMP NULL, UNIQUE (token),
+    FOREIGN KEY (user_id) REFERENCES users(user_id));
+CREATE TABLE user_preferences (
+    preference_id INTEGER NOT NULL PRIMARY KEY, user_id INT NOT NULL, cuisine VARCHAR(100), max_cooking_time INT,
+    difficulty VARCHAR(6), FOREIGN KEY (user_id) REFERENCES users(user_id));
+CREATE TABLE favorites (
+    favorite_id INTEGER NOT NULL PRIMARY KEY, user_id INT NOT NULL, recipe_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE(user_id, recipe_hash),
+    FOREIGN KEY (user_id) REFERENCES users(user_id));
+CREATE TABLE chat_sessions (
+    session_id INTEGER NOT NULL PRIMARY KEY, user_id INT NOT NULL, started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ended_at TIMESTAMP NULL, FOREIGN KEY (user_id) REFERENCES users(user_id));
+CREATE TABLE chat_messages (
+    message_id INTEGER NOT NULL PRIMARY KEY, session_id INT NOT NULL, user_id INT NOT NULL, message TEXT NOT NULL,
+    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id));
+CREATE TABLE logs (
+    log_id INTEGER NOT NULL PRIMARY KEY, user_id INT NULL, action VARCHAR(255) NOT NULL, details TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (user_id) REFERENCES users(user_id));
+"""
+
+
+HOT_QUERIES = {
+    "get_preference": lambda db: preferences.get_preference(db, 1),
+    "update_preference": lambda db: preferences.update_preference(db, 2, UserPreferenceUpdate(cuisine="greek")),
+    "get_sessions": lambda db: sessions.get_sessions(db, user_id=1),
+    "session_by_token": lambda db: sessions.get_session_by_token(db, "t1"),
+    "expired_sessions": lambda db: sessions.delete_expired_sessions(db, now=datetime.now() - timedelta(days=1)),
+    "favorites": lambda db: favorites.get_favorites(db, 1),
+    "check_favorites": lambda db: favorites.check_favorites(db, 1, ["r0", "r20"]),
+    "chat_messages": lambda db: chat.get_messages(db, 1),
+    "roles_with_counts": lambda db: roles.get_roles_with_user_counts(db),
+    "role_in_use": lambda db: pytest.raises(roles.RoleInUse, roles.delete_role, db, 1),
+    "logs_by_user": lambda db: read_logs(user_id=1, created_from=datetime(2000, 1, 1), created_to=None,
+                                         page=PageParams(None, 20), db=db),
+    "recipes_changed": lambda db: recipes.get_recipes_changed_since(db, datetime(2000, 1, 1)),
+    "recipe_cards": lambda db: recipes.get_recipe_cards(db, [1, 2, 3]),
+}
+
+
+def full_scans(engine, call) -> list:
+    """Выполняет call и возвращает шаги плана SQLite, читающие таблицу целиком."""
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with sessionmaker(bind=engine)() as db:
+            call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not re.match(r"\s*(SELECT|UPDATE|DELETE)", statement, re.I):
+                continue
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                match = re.match(r"SCAN (\w+)", row.detail)
+                # Только таблицы схемы: "SCAN CONSTANT ROW" и подзапросы — не чтение таблицы
+                if match and match.group(1) in Base.metadata.tables and match.group(1) not in SMALL_TABLES:
+                    scans.append(f"{row.detail}  <-  {statement}")
+    return scans
+
+
+def test_head_matches_models(engine, migrate):
+    migrate("upgrade", "head")
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    migrate("downgrade", "base")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'users'")).all() == []
+
+
+def test_baseline_matches_revision_0001(engine, migrate):
+    migrate("upgrade", "0001")
+    with engine.connect() as conn:
+        migrated = {name: sorted(index["name"] for index in inspect(conn).get_indexes(name) if index["name"])
+                    for name in inspect(conn).get_table_names() if name != "alembic_version"}
+    assert sorted(migrated) == sorted(re.findall(r"CREATE TABLE (\w+)", BASELINE_SQL))
+    assert not any(migrated.values())
+
+
+def test_stamped_baseline_upgrades_to_head(engine, migrate):
+    # Как в README: база из scripts.sql -> alembic stamp 0001 && alembic upgrade head
+    with engine.begin() as conn:
+        for statement in filter(str.strip, BASELINE_SQL.split(";")):
+            conn.exec_driver_sql(statement)
+    migrate("stamp", "0001")
+    seed(engine)
+    migrate("upgrade", "head")
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+        fk = next(fk for fk in inspect(conn).get_foreign_keys("logs") if fk["constrained_columns"] == ["user_id"])
+        assert fk["options"]["ondelete"] == "SET NULL"
+        assert conn.scalar(text("SELECT COUNT(*) FROM logs")) == 40
+    for name in ("favorites", "chat_messages", "logs_by_user", "recipes_changed", "expired_sessions"):
+        assert full_scans(engine, HOT_QUERIES[name]) == [], name
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_queries_use_indexes(engine, migrate, name):
+    migrate("upgrade", "head")
+    seed(engine)
+    assert full_scans(engine, HOT_QUERIES[name]) == []
+
+
+def test_plan_check_catches_missing_indexes(engine, migrate):
+    migrate("upgrade", "0001")
+    seed(engine)
+    # В 0001 ещё нет user_preferences.version — модель целиком не прочитать
+    by_user = lambda db: db.query(UserPreference.preference_id).filter(UserPreference.user_id == 1).all()
+    assert any("SCAN user_preferences" in scan for scan in full_scans(engine, by_user))
+    assert any("SCAN sessions" in scan for scan in full_scans(engine, HOT_QUERIES["get_sessions"]))
+
+
+def test_unique_preferences_migration_keeps_earliest_row(engine, migrate):
+    migrate("upgrade", "0001")
+    seed(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user_preferences (user_id, cuisine) VALUES (1, 'greek'), (2, 'thai')"))
+    migrate("upgrade", "head")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT user_id, cuisine FROM user_preferences WHERE user_id IN (1, 2)")).all()
+    assert sorted(rows) == [(1, "thai"), (2, "thai")]
+
+    with sessionmaker(bind=engine)() as db:
+        with pytest.raises(preferences.PreferenceExists):
+            preferences.create_preference(db, UserPreferenceCreate(user_id=1, cuisine="greek"))
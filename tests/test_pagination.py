@@ -0,0 +1,80 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.models import Role, User, Session as UserSession
+from app.pagination import encode_cursor, decode_cursor, MAX_PAGE_SIZE
+from app.routers import users
+import app.crud.roles as roles_crud
+import app.crud.sessions as sessions_crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add(Role(name="user"))
+    session.add_all(User(role_id=1, email=f"u{i}@example.com", password_hash="x") for i in range(25))
+    session.add_all(UserSession(user_id=1 + i % 2, token=f"t{i}") for i in range(6))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_users_walk_all_pages(client):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/users/", params=params).json()
+        seen += [u["user_id"] for u in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == list(range(1, 26))
+
+def test_deep_page_uses_keyset_not_offset(client):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client.get("/users/", params={"cursor": encode_cursor(20), "limit": 10})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert "users.user_id >" in statements[-1]
+    assert "ORDER BY users.user_id" in statements[-1]
+
+def test_page_size_is_capped(client):
+    assert client.get("/users/", params={"limit": MAX_PAGE_SIZE + 1}).status_code == 422
+    assert client.get("/users/", params={"cursor": "garbage"}).status_code == 400
+
+def test_cursor_of_wrong_shape_is_400(client):
+    # Декодируется, но ключ не id: чужой курсор или подделка
+    for key in (["x", 1], "5", 1.5, True, {"k": 1}):
+        r = client.get("/users/", params={"cursor": encode_cursor(key)})
+        assert r.status_code == 400, key
+
+def test_roles_and_sessions_pages(db):
+    assert roles_crud.get_roles(db).items[0].name == "user"
+    page = sessions_crud.get_sessions(db, user_id=1, limit=2)
+    assert [s.token for s in page.items] == ["t0", "t2"]
+    page = sessions_crud.get_sessions(db, user_id=1, after_id=decode_cursor(page.next_cursor), limit=2)
+    assert [s.token for s in page.items] == ["t4"]
+    assert page.next_cursor is None
@@ -1,9 +1,9 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base
-import crud.preferences as crud
-from schemas import UserPreferenceCreate, UserPreferenceUpdate
+from app.database import Base
+import app.crud.preferences as crud
+from app.schemas import UserPreferenceCreate, UserPreferenceUpdate
 
 engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine)
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import cache, ratelimit
+from app.cache import TTLCache
+from app.database import Base
+from app.models import Role, User, Session as UserSession
+from app.ratelimit import (InMemorySharedBuckets, Limit, LocalBucketStore, RateLimiter, RateLimitMiddleware,
+                           SharedBucketStore, parse_limits)
+import app.crud.sessions as sessions_crud
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_parse_limits():
+    assert parse_limits("POST /users/=10/60, post /recipes/generate=5/1") == {
+        ("POST", "/users/"): Limit(10 / 60, 10), ("POST", "/recipes/generate"): Limit(5.0, 5)}
+    assert parse_limits("") == {}
+    for bad in ("POST /users/", "/users/=1/1", "POST /users/=0/60", "POST /users/=x/60"):
+        with pytest.raises(ValueError):
+            parse_limits(bad)
+
+@pytest.fixture(params=["local", "shared"])
+def store(request, monkeypatch):
+    clock = Clock()
+    if request.param == "shared":
+        monkeypatch.setattr(ratelimit.time, "time", clock)
+        store = SharedBucketStore(InMemorySharedBuckets())
+    else:
+        store = LocalBucketStore(clock=clock)
+    store.clock = clock
+    return store
+
+def test_token_bucket(store):
+    # 3 запроса сразу, дальше 1 в 2 секунды
+    assert [store.take("k", 0.5, 3)[0] for _ in range(4)] == [True, True, True, False]
+    assert store.take("k", 0.5, 3) == (False, 2.0)
+    store.clock.now += 1
+    assert store.take("k", 0.5, 3) == (False, 1.0)
+    store.clock.now += 1
+    assert store.take("k", 0.5, 3) == (True, 0.0)
+    # Корзина не копит больше burst
+    store.clock.now += 3600
+    assert [store.take("k", 0.5, 3)[0] for _ in range(4)] == [True, True, True, False]
+    assert store.take("other", 0.5, 3)[0]
+
+def test_local_store_prunes_buckets():
+    clock = Clock()
+    store = LocalBucketStore(max_buckets=10, clock=clock)
+    for i in range(10):
+        store.take(f"k{i}", 1, 5)
+    clock.now += 1
+    store.take("k0", 1, 5)
+    store.take("new", 1, 5)
+    # Полные корзины выброшены, k0 только что потрачена — осталась
+    assert len(store) == 2
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    token_cache = TTLCache()
+    monkeypatch.setattr(sessions_crud, "token_cache", token_cache)
+    return token_cache
+
+def login(token_cache, token: str, user_id: int, role_id: int):
+    # Как после get_current_user: токен и пользователь уже в кэшах
+    token_cache.set(token, (user_id, user_id, None))
+    cache.cache_set(f"user:{user_id}", {"user_id": user_id, "role_id": role_id, "email": f"u{user_id}@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def SessionLocal():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def limiter(SessionLocal):
+    clock = Clock()
+    limiter = RateLimiter(limits=parse_limits("POST /users/=2/60"), global_limits=parse_limits("POST /users/=5/60"),
+                          store=LocalBucketStore(clock=clock), session_factory=SessionLocal)
+    limiter.clock = clock
+    return limiter
+
+@pytest.fixture
+def client(limiter, token_cache):
+    app = FastAPI()
+
+    @app.post("/users/")
+    def create_user():
+        return {"ok": True}
+
+    @app.get("/users/")
+    def list_users():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    return TestClient(app)
+
+def rejected(route: str = "POST /users/", scope: str = "client") -> float:
+    return ratelimit.rejected.value((route, scope))
+
+def test_429_with_retry_after(client, limiter):
+    before = rejected()
+    assert [client.post("/users/").status_code for _ in range(3)] == [200, 200, 429]
+    r = client.post("/users/")
+    assert r.status_code == 429 and r.headers["retry-after"] == "30"
+    assert r.json() == {"detail": "Too many requests"}
+    assert rejected() == before + 2
+    # Маршрут без лимита не затронут
+    assert all(client.get("/users/").status_code == 200 for _ in range(10))
+    limiter.clock.now += 30
+    assert client.post("/users/").status_code == 200
+
+def test_per_user_and_global(client, token_cache):
+    alice = login(token_cache, "alice", 1, 1)
+    bob = login(token_cache, "bob", 2, 1)
+    assert [client.post("/users/", headers=alice).status_code for _ in range(3)] == [200, 200, 429]
+    # У другого пользователя своя корзина, у анонима — своя по IP
+    assert client.post("/users/", headers=bob).status_code == 200
+    assert client.post("/users/").status_code == 200
+    # Общая корзина маршрута — 5 на всех, отклонённые запросы alice её не тратили
+    before = rejected(scope="global")
+    assert client.post("/users/", headers=bob).status_code == 200
+    assert client.post("/users/").status_code == 429
+    assert rejected(scope="global") == before + 1
+
+def test_unknown_token_falls_back_to_ip(client):
+    statuses = [client.post("/users/", headers={"Authorization": f"Bearer random-{i}"}).status_code
+                for i in range(3)]
+    assert statuses == [200, 200, 429]
+
+def test_cold_token_cache_resolves_once(client, limiter, SessionLocal, token_cache, max_queries):
+    # Токен выдан другим воркером: в кэшах этого его нет
+    with SessionLocal() as db:
+        db.add_all([Role(name="user"), Role(name="admin")])
+        db.add(User(role_id=2, email="a@example.com", password_hash="x"))
+        db.add(UserSession(user_id=1, token="other-worker", expired_at=datetime.now() + timedelta(hours=1)))
+        db.commit()
+    limiter.role_factors = {2: 2.0}
+    headers = {"Authorization": "Bearer other-worker"}
+    with max_queries(2):
+        assert client.post("/users/", headers=headers).status_code == 200
+    # Дальше — из кэшей: своя корзина пользователя с множителем роли, а не корзина IP
+    with max_queries(0):
+        assert [client.post("/users/", headers=headers).status_code for _ in range(4)] == [200] * 3 + [429]
+    assert client.post("/users/").status_code == 200
+
+    # Неизвестный токен — один запрос к БД, дальше корзина IP без БД
+    unknown = {"Authorization": "Bearer forged"}
+    with max_queries(1):
+        client.post("/users/", headers=unknown)
+    with max_queries(0):
+        client.post("/users/", headers=unknown)
+
+def test_role_factors(client, limiter, token_cache):
+    limiter.role_factors = {2: 2.0, 3: None}
+    admin = login(token_cache, "admin", 1, 2)
+    assert [client.post("/users/", headers=admin).status_code for _ in range(5)] == [200] * 4 + [429]
+    # Без лимита на клиента остаётся только общий: 4 из 5 токенов уже потрачены
+    service = login(token_cache, "service", 2, 3)
+    assert [client.post("/users/", headers=service).status_code for _ in range(2)] == [200, 429]
+    limiter.clock.now += 12
+    assert client.post("/users/", headers=service).status_code == 200
+
+def test_load_roles():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        db.add_all([Role(name="user"), Role(name="admin", rate_limit_factor=10), Role(name="service"),
+                    Role(name="broken", rate_limit_factor=0)])
+        db.flush()
+        db.query(Role).filter(Role.name == "service").update({"rate_limit_factor": None})
+        db.commit()
+    limiter = RateLimiter(limits={}, global_limits={}, session_factory=SessionLocal)
+    assert limiter.load_roles() == {1: 1.0, 2: 10.0, 3: None}
+    engine.dispose()
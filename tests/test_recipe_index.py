@@ -0,0 +1,165 @@
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import recipe_index
+from app.auth import get_current_user
+from app.database import Base, get_db
+from app.models import Recipe, UserPreference
+from app.pagination import encode_cursor
+from app.routers import recipes as recipes_router
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+CUISINES = ("thai", "italian", "georgian")
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def catalog(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    return [(i, rnd.choice(CUISINES), rnd.randrange(5, 120), rnd.choice(DIFFICULTIES)) for i in range(1, n + 1)]
+
+
+def scan(rows, cuisine=None, difficulty=None, max_cooking_time=None):
+    return sorted((time, rid) for rid, c, time, d in rows
+                  if (cuisine is None or c == cuisine) and (difficulty is None or d == difficulty)
+                  and (max_cooking_time is None or time <= max_cooking_time))
+
+
+@pytest.mark.parametrize("filters", [
+    {}, {"cuisine": "thai"}, {"difficulty": "hard"}, {"max_cooking_time": 30},
+    {"cuisine": "italian", "difficulty": "easy", "max_cooking_time": 45},
+])
+def test_query_matches_full_scan(filters):
+    rows = catalog(2000)
+    index = recipe_index.RecipeIndex()
+    index.load(rows)
+    expected = scan(rows, **filters)
+    assert index.query(**filters, limit=10 ** 6) == expected
+    # Постранично через after — то же самое
+    pages, after = [], None
+    while True:
+        page = index.query(**filters, after=after, limit=50)
+        if not page:
+            break
+        pages += page
+        after = page[-1]
+    assert pages == expected
+
+
+def test_upsert_moves_changed_recipes_and_remove_drops_them():
+    rows = catalog(500)
+    index = recipe_index.RecipeIndex()
+    index.load(rows)
+    changed = [(rid, "Georgian ", 7, "hard") for rid, *_ in rows[:50]] + [(1000, "greek", 10, "easy")]
+    assert index.upsert(changed + changed) == 51
+    rows = [(rid, "georgian", 7, "hard") for rid, *_ in changed[:50]] + changed[50:] + rows[50:]
+    assert index.query(cuisine="georgian", difficulty="hard", limit=10 ** 6) == scan(rows, "georgian", "hard")
+    assert index.query(cuisine="greek") == [(10, 1000)]
+    index.remove(1000)
+    assert index.query(cuisine="greek") == [] and len(index) == 500
+    assert index.query(cuisine="french") == []
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def add_recipes(db, rows):
+    db.add_all(Recipe(recipe_id=rid, recipe_hash=f"h{rid}", title=f"Recipe {rid}", cuisine=c,
+                      cooking_time=t, difficulty=d) for rid, c, t, d in rows)
+    db.commit()
+
+
+def test_refresher_loads_in_batches_and_picks_up_changes(db):
+    add_recipes(db, catalog(40))
+    refresher = recipe_index.RecipeIndexRefresher(recipe_index.RecipeIndex(), TestingSessionLocal, batch_size=7)
+    assert refresher.load() == 40
+
+    add_recipes(db, [(41, "thai", 3, "easy")])
+    db.execute(update(Recipe).where(Recipe.recipe_id == 2).values(cooking_time=1, updated_at=datetime.now()))
+    db.commit()
+    assert refresher.refresh() == 2
+    assert refresher.index.query(limit=2) == [(1, 2), (3, 41)]
+
+
+def test_refresher_drops_deleted_recipes(db):
+    add_recipes(db, catalog(40))
+    refresher = recipe_index.RecipeIndexRefresher(recipe_index.RecipeIndex(), TestingSessionLocal, batch_size=7,
+                                                  reconcile_interval=3600)
+    refresher.load()
+    db.execute(delete(Recipe).where(Recipe.recipe_id.in_([2, 15, 40])))
+    db.commit()
+    # До сверки удаление не видно, сверка — раз в reconcile_interval
+    assert refresher.refresh() == 0 and len(refresher.index) == 40
+    refresher.reconciled_at -= 3600
+    assert refresher.refresh() == 3
+    assert len(refresher.index) == 37
+    assert {rid for _, rid in refresher.index.query(limit=100)} == set(range(1, 41)) - {2, 15, 40}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    add_recipes(db, catalog(300))
+    db.add(UserPreference(user_id=1, cuisine="thai", max_cooking_time=60, difficulty="easy"))
+    db.commit()
+    index = recipe_index.RecipeIndex()
+    recipe_index.RecipeIndexRefresher(index, TestingSessionLocal).load()
+    monkeypatch.setattr(recipe_index, "index", index)
+    app = FastAPI()
+    app.include_router(recipes_router.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(user_id=1)
+    return TestClient(app)
+
+
+def test_recommendations_use_stored_preferences_and_paginate(client, max_queries):
+    expected = scan(catalog(300), "thai", "easy", 60)
+    seen, cursor = [], None
+    while True:
+        with max_queries(2):  # предпочтения + карточки страницы
+            body = client.get("/recipes/recommendations", params={"limit": 5, "cursor": cursor}).json()
+        seen += [(r["cooking_time"], r["recipe_id"]) for r in body["items"]]
+        assert all(r["title"] == f"Recipe {r['recipe_id']}" for r in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_query_params_override_preferences(client):
+    items = client.get("/recipes/recommendations", params={"cuisine": "Italian", "max_cooking_time": 20,
+                                                         "limit": 100}).json()["items"]
+    assert [(r["cooking_time"], r["recipe_id"]) for r in items] == scan(catalog(300), "italian", "easy", 20)
+    assert client.get("/recipes/recommendations", params={"cursor": "bad"}).status_code == 400
+    for key in (7, ["x", 1], [5, 1.5], [1, 2, 3]):
+        assert client.get("/recipes/recommendations", params={"cursor": encode_cursor(key)}).status_code == 400
+
+
+def test_recipes_deleted_from_db_do_not_end_pagination(client, db):
+    expected = scan(catalog(300), "thai", "easy", 60)
+    # Индекс ещё не знает об удалении: целая страница без карточек
+    gone = {recipe_id for _, recipe_id in expected[5:10]}
+    db.execute(delete(Recipe).where(Recipe.recipe_id.in_(gone)))
+    db.commit()
+    seen, cursor = [], None
+    while True:
+        body = client.get("/recipes/recommendations", params={"limit": 5, "cursor": cursor}).json()
+        seen += [(r["cooking_time"], r["recipe_id"]) for r in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [key for key in expected if key[1] not in gone]
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import recipes
+from app.routers import recipes as recipes_router
+from app.cache import TTLCache
+
+
+class FailingProvider(recipes.RecipeProvider):
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, preferences):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+
+def test_hash_ignores_case_whitespace_and_unrelated_fields():
+    a = recipes.recipe_hash("Pasta  with Tomatoes", {"cuisine": "Italian ", "difficulty": "easy"})
+    b = recipes.recipe_hash(" pasta with tomatoes", {"cuisine": "italian", "difficulty": "easy", "user_id": 7})
+    assert a == b
+    assert a != recipes.recipe_hash("pasta with tomatoes", {"cuisine": "italian", "difficulty": "hard"})
+
+
+def test_concurrent_identical_requests_share_one_upstream_call():
+    provider = recipes.FakeRecipeProvider(latency=0.05)
+    generator = recipes.RecipeGenerator(provider)
+
+    async def run():
+        return await asyncio.gather(*[generator.generate("soup", {"cuisine": "thai"}) for _ in range(20)])
+
+    results = asyncio.run(run())
+    assert provider.calls == 1
+    assert generator.coalesced == 19
+    assert len({key for key, _, _ in results}) == 1
+
+    key, _, cached = asyncio.run(generator.generate("Soup", {"cuisine": "Thai"}))
+    assert cached and provider.calls == 1
+
+
+def test_expired_entry_is_regenerated():
+    provider = recipes.FakeRecipeProvider(latency=0)
+    generator = recipes.RecipeGenerator(provider, TTLCache(maxsize=10, ttl=0.01))
+    asyncio.run(generator.generate("soup"))
+    time.sleep(0.02)
+    asyncio.run(generator.generate("soup"))
+    assert provider.calls == 2
+
+
+def test_failure_reaches_all_waiters_and_is_not_cached():
+    provider = FailingProvider()
+    generator = recipes.RecipeGenerator(provider)
+
+    async def run():
+        return await asyncio.gather(*[generator.generate("soup") for _ in range(5)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert provider.calls == 1
+    asyncio.run(run())
+    assert provider.calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    provider = recipes.FakeRecipeProvider(latency=0.05)
+    generator = recipes.RecipeGenerator(provider)
+
+    async def run():
+        first = asyncio.ensure_future(generator.generate("soup"))
+        second = asyncio.ensure_future(generator.generate("soup"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    _, recipe, _ = asyncio.run(run())
+    assert recipe["title"] and provider.calls == 1
+
+
+def test_generate_endpoint_uses_stored_preferences(monkeypatch):
+    provider = recipes.FakeRecipeProvider(latency=0)
+    monkeypatch.setattr(recipes, "generator", recipes.RecipeGenerator(provider))
+    app = FastAPI()
+    app.include_router(recipes_router.router)
+    app.dependency_overrides[recipes_router.stored_preferences] = lambda: {
+        "cuisine": "italian", "max_cooking_time": 20, "difficulty": "easy"}
+    client = TestClient(app)
+
+    body = client.post("/recipes/generate", json={"prompt": "Pasta"}).json()
+    assert body["recipe_hash"] == recipes.recipe_hash("pasta", {"cuisine": "italian", "max_cooking_time": 20,
+                                                                "difficulty": "easy"})
+    assert body["cuisine"] == "italian" and body["cached"] is False
+    assert client.post("/recipes/generate", json={"prompt": "pasta "}).json()["cached"] is True
+
+    body = client.post("/recipes/generate", json={"prompt": "pasta", "preferences": {"cuisine": "thai"}}).json()
+    assert body["cuisine"] == "thai" and provider.calls == 2
+
+
+def stream_app(provider, limit=2):
+    app = FastAPI()
+    app.include_router(recipes_router.router)
+    app.dependency_overrides[recipes_router.get_current_user] = lambda: SimpleNamespace(user_id=1)
+    app.dependency_overrides[recipes_router.stored_preferences] = lambda: {"cuisine": "thai"}
+    return app, recipes.RecipeGenerator(provider), recipes.UserConcurrencyLimit(limit)
+
+
+async def post_stream(app, prompt, disconnect_after=None):
+    """Прогоняет POST /recipes/generate/stream через ASGI напрямую.
+
+    -> (status, время до первого чанка тела, тело). disconnect_after — отключиться
+    после стольких чанков.
+    """
+    body = json.dumps({"prompt": prompt}).encode()
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/recipes/generate/stream", "raw_path": b"/recipes/generate/stream",
+             "query_string": b"", "headers": [(b"content-type", b"application/json")],
+             "client": ("test", 1), "server": ("test", 80), "root_path": ""}
+    disconnected = asyncio.Event()
+    request_sent = False
+    status, chunks, first_chunk_at = None, [], None
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first_chunk_at
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message.get("body"):
+            first_chunk_at = first_chunk_at or time.perf_counter() - started
+            chunks.append(message["body"])
+            if disconnect_after and len(chunks) >= disconnect_after:
+                disconnected.set()
+
+    await app(scope, receive, send)
+    return status, first_chunk_at, b"".join(chunks).decode()
+
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_tokens_before_completion_and_caches(monkeypatch):
+    provider = recipes.FakeRecipeProvider(latency=0.02, token_delay=0.01)
+    app, generator, limit = stream_app(provider)
+    monkeypatch.setattr(recipes, "generator", generator)
+    monkeypatch.setattr(recipes, "stream_limit", limit)
+
+    started = time.perf_counter()
+    status, ttfb, text = asyncio.run(post_stream(app, "curry"))
+    total = time.perf_counter() - started
+    events = sse_events(text)
+    assert status == 200
+    assert events[0][0] == "token" and ttfb < total / 2
+    assert {"title": "Thai curry"} in [data for kind, data in events if kind == "partial"]
+    kind, done = events[-1]
+    assert kind == "done" and done["recipe_hash"] == recipes.recipe_hash("curry", {"cuisine": "thai"})
+    assert limit.active(1) == 0
+
+    _, _, text = asyncio.run(post_stream(app, "Curry"))
+    assert sse_events(text) == [("done", {**done, "cached": True})]
+    assert provider.calls == 1
+
+
+def test_disconnect_cancels_upstream_and_releases_slot(monkeypatch):
+    provider = recipes.FakeRecipeProvider(latency=0, token_delay=0.05)
+    app, generator, limit = stream_app(provider)
+    monkeypatch.setattr(recipes, "generator", generator)
+    monkeypatch.setattr(recipes, "stream_limit", limit)
+
+    asyncio.run(post_stream(app, "curry", disconnect_after=2))
+    assert provider.cancelled == 1
+    assert limit.active(1) == 0
+    assert generator.cache.get(recipes.recipe_hash("curry", {"cuisine": "thai"})) is None
+
+
+def test_concurrent_streams_are_limited_per_user(monkeypatch):
+    provider = recipes.FakeRecipeProvider(latency=0.05, token_delay=0)
+    app, generator, limit = stream_app(provider, limit=1)
+    monkeypatch.setattr(recipes, "generator", generator)
+    monkeypatch.setattr(recipes, "stream_limit", limit)
+
+    async def run():
+        return await asyncio.gather(post_stream(app, "curry"), post_stream(app, "soup"))
+
+    statuses = sorted(status for status, _, _ in asyncio.run(run()))
+    assert statuses == [200, 429]
+    assert limit.rejected == 1 and limit.active(1) == 0
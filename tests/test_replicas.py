@@ -0,0 +1,150 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from starlette.websockets import WebSocketDisconnect
+
+from app import cache, database, hashing, replicas
+from app.auth import get_current_user
+from app.crud import sessions as sessions_crud, user as user_crud
+from app.hashing import PasswordHasher
+from app.database import Base
+from app.models import Role, User
+from app.replicas import ReplicaPool, RoutingSession
+from app.routers import chat, users
+
+
+def sqlite_file(path, email):
+    # Две независимые БД: "реплика" отстаёт по построению — в ней старый email
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Role), [{"name": "user"}])
+        conn.execute(insert(User), [{"email": email, "role_id": 1, "password_hash": "x"}])
+    return engine
+
+
+@pytest.fixture
+def primary(tmp_path):
+    engine = sqlite_file(tmp_path / "primary.db", "primary@example.com")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def replica(tmp_path):
+    engine = sqlite_file(tmp_path / "replica.db", "replica@example.com")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_client(primary, monkeypatch):
+    monkeypatch.setattr(replicas, "sticky", cache.TTLCache())
+
+    def make(pool):
+        # get_db не переопределяется: проверяем настоящую маршрутизацию
+        monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary, class_=RoutingSession,
+                                                                   replicas=pool, autoflush=False))
+        app = FastAPI()
+        app.include_router(users.router)
+        app.include_router(chat.router)
+        # Токены в тестах — только ключи окна; запись в /users/1 разрешена его владельцу
+        app.dependency_overrides[get_current_user] = lambda: User(user_id=1, role_id=1)
+        return TestClient(app)
+
+    return make
+
+
+def email(client, headers=None):
+    # Пользователь кэшируется: сбрасываем, чтобы ответ шёл из БД
+    cache.invalidate(user_crud._user_key(1))
+    return client.get("/users/1", headers=headers).json()["email"]
+
+
+def test_reads_go_to_replica_and_own_writes_stick_to_primary(make_client, replica, monkeypatch):
+    pool = ReplicaPool([replica])
+    client = make_client(pool)
+    alice, bob = {"Authorization": "Bearer alice"}, {"Authorization": "Bearer bob"}
+    assert email(client, alice) == "replica@example.com"
+    assert client.put("/users/1", json={"email": "new@example.com"}, headers=alice).status_code == 200
+    assert email(client, alice) == "new@example.com"
+    # Окно привязано к клиенту: остальные по-прежнему читают реплику
+    assert email(client, bob) == "replica@example.com"
+    assert pool.picks == [2]
+
+    monkeypatch.setattr(replicas, "REPLICA_STICKY_SECONDS", 0)
+    client.put("/users/1", json={"email": "newer@example.com"}, headers=alice)
+    assert email(client, alice) == "replica@example.com"
+
+
+def test_login_sticks_new_token_to_primary(make_client, replica, primary, monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    monkeypatch.setattr(sessions_crud, "token_cache", cache.TTLCache())
+    with primary.begin() as conn:
+        conn.execute(User.__table__.update().values(password_hash=hashing.hash_password("secret")))
+    client = make_client(ReplicaPool([replica]))
+    client.app.dependency_overrides.clear()
+    r = client.post("/users/login", json={"email": "primary@example.com", "password": "secret"})
+    token = r.json()["access_token"]
+    # Сессии на реплике ещё нет: без окна для нового токена здесь был бы 401
+    r = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200 and r.json()["email"] == "primary@example.com"
+    # Окна не в app.cache: не вытесняются пользователями
+    assert len(replicas.sticky) == 2
+
+def test_websocket_uses_real_get_db(make_client, replica):
+    pool = ReplicaPool([replica])
+    client = make_client(pool)
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/chat/ws/1?token=unknown") as ws:
+            ws.receive_text()
+    assert exc_info.value.code == 1008
+    # Токен сокета проверяется по основной БД
+    assert pool.picks == [0]
+
+
+def test_unhealthy_replica_falls_back_to_primary(make_client, replica, tmp_path):
+    pool = ReplicaPool([replica, create_engine(f"sqlite:///{tmp_path}/missing/replica.db")])
+    client = make_client(pool)
+    pool.check()
+    assert [status["healthy"] for status in pool.status()] == [True, False]
+    assert email(client) == email(client) == "replica@example.com"
+    assert pool.picks == [2, 0]
+
+    pool.mark(0, False)
+    assert email(client) == "primary@example.com"
+    pool.check()
+    assert email(client) == "replica@example.com"
+
+
+def test_round_robin_over_healthy_replicas(replica):
+    pool = ReplicaPool([replica, replica, replica])
+    pool.mark(1, False)
+    for _ in range(6):
+        pool.pick()
+    assert pool.picks == [3, 0, 3]
+    for i in range(3):
+        pool.mark(i, False)
+    assert pool.pick() is None
+
+
+def test_writes_in_replica_session_go_to_primary(primary, replica):
+    with sessionmaker(bind=primary, class_=RoutingSession, replicas=ReplicaPool([replica]))() as db:
+        db.info["use_replica"] = True
+        assert db.scalar(select(User.email)) == "replica@example.com"
+        db.add(User(email="written@example.com", role_id=1, password_hash="x"))
+        db.commit()
+    with primary.connect() as conn:
+        assert conn.scalar(select(User.email).where(User.user_id == 2)) == "written@example.com"
+    with replica.connect() as conn:
+        assert conn.scalar(select(User.email).where(User.user_id == 2)) is None
+
+
+def test_without_replicas_everything_reads_primary(primary):
+    with sessionmaker(bind=primary, class_=RoutingSession, replicas=ReplicaPool([]))() as db:
+        db.info["use_replica"] = True
+        assert db.scalar(select(User.email)) == "primary@example.com"
+        assert db.info["replica"] is False
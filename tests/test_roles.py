@@ -1,10 +1,10 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base
-from models import Role
-import crud.roles as crud
-from schemas import RoleCreate, RoleUpdate
+from app.database import Base
+from app.models import Role
+import app.crud.roles as crud
+from app.schemas import RoleCreate, RoleUpdate
 
 engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine)
@@ -0,0 +1,60 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import schemas
+from app.database import Base, get_db
+from app.models import Role, User
+from app.pagination import Page
+from app.routers import users
+from app.serialization import page_response
+import app.crud.user as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add(Role(name="user"))
+    session.add_all(User(role_id=1, email=f"u{i}@example.com", password_hash="x",
+                         created_at=datetime(2024, 1, 1, 12, 0, i, 1500)) for i in range(5))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+def test_fast_path_matches_validated_orm_response(client, db):
+    expected = jsonable_encoder(schemas.UserPage.from_orm(crud.get_users(db, limit=3)))
+    assert client.get("/users/", params={"limit": 3}).json() == expected
+
+def test_list_selects_only_output_columns(client):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client.get("/users/")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert "password_hash" not in statements[0]
+
+def test_untrusted_rows_are_validated():
+    page = Page([{"user_id": 1, "email": "not-an-email", "role_id": 1, "created_at": datetime(2024, 1, 1)}], None)
+    assert json.loads(page_response(page, schemas.UserOut, trusted=True).body)["items"][0]["email"] == "not-an-email"
+    with pytest.raises(ValueError):
+        page_response(page, schemas.UserOut, trusted=False)
@@ -1,10 +1,10 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from database import Base
-from models import Session
-import crud.sessions as crud
-from schemas import SessionCreate, SessionUpdate
+from app.database import Base
+from app.models import Session
+import app.crud.sessions as crud
+from app.schemas import SessionCreate, SessionUpdate
 
 engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine)
@@ -3,10 +3,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from werkzeug.security import check_password_hash
 
-from database import Base
-from models import Role
-from schemas import UserCreate, UserUpdate
-import crud.users as crud
+from app.database import Base
+from app.models import Role
+from app.schemas import UserCreate, UserUpdate
+import app.crud.user as crud
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
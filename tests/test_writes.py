@@ -0,0 +1,152 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import hashing
+from app.auth import get_current_user
+from app.database import Base, get_db
+from app.hashing import PasswordHasher
+from app.cache import TTLCache
+from app.idempotency import IdempotencyMiddleware
+from app.models import Role, User, UserPreference
+from app.routers import preferences, users
+from app.schemas import UserUpdate
+import app.crud.user as crud
+
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    monkeypatch.setattr(hashing, "hasher", PasswordHasher(method="pbkdf2:sha256:1000", workers=0))
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    session.add_all([Role(name="user"), Role(name="admin")])
+    session.add_all(User(role_id=1, email=f"u{i}@example.com", password_hash="x") for i in range(3))
+    session.add(UserPreference(user_id=1, cuisine="thai", max_cooking_time=30, difficulty="easy"))
+    session.add(User(role_id=2, email="admin@example.com", password_hash="x"))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(params=["returning", "rowcount"])
+def dialect(request, monkeypatch):
+    # rowcount — путь MySQL: без RETURNING
+    if request.param == "rowcount":
+        monkeypatch.setattr(engine.dialect, "update_returning", False)
+        monkeypatch.setattr(engine.dialect, "delete_returning", False)
+    return request.param
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(preferences.router)
+    app.add_middleware(IdempotencyMiddleware)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: db.get(User, 4)
+    return TestClient(app)
+
+def test_update_and_delete_statements(db, dialect, max_queries):
+    expected = 1 if dialect == "returning" else 2
+    with max_queries(expected) as statements:
+        user = crud.update_user(db, 2, UserUpdate(email="new@example.com"))
+    assert user.email == "new@example.com" and user.user_id == 2
+    assert statements[0].startswith("UPDATE users")
+    with max_queries(expected):
+        assert crud.delete_user(db, 2).email == "new@example.com"
+    with max_queries(1):
+        assert crud.update_user(db, 2, UserUpdate(email="gone@example.com")) is None
+    assert crud.delete_user(db, 2) is None
+
+def test_put_and_delete_endpoints_keep_404(client, dialect):
+    assert client.put("/users/1", json={"email": "put@example.com"}).json()["email"] == "put@example.com"
+    assert client.put("/users/99", json={"email": "x@example.com"}).status_code == 404
+    assert client.put("/preferences/1", json={"cuisine": "greek"}).json()["cuisine"] == "greek"
+    assert client.get("/preferences/1").json()["cuisine"] == "greek"
+    assert client.put("/preferences/2", json={"cuisine": "greek"}).status_code == 404
+    assert client.delete("/preferences/1").status_code == 200
+    assert client.delete("/preferences/1").status_code == 404
+
+def test_writes_need_owner_or_admin(client, db):
+    client.app.dependency_overrides[get_current_user] = lambda: db.get(User, 2)
+    assert client.put("/users/2", json={"email": "self@example.com"}).status_code == 200
+    for method, path in (("put", "/users/1"), ("delete", "/users/1"), ("put", "/preferences/1"),
+                         ("delete", "/preferences/1")):
+        kwargs = {"json": {"email": "x@example.com"}} if method == "put" else {}
+        assert getattr(client, method)(path, **kwargs).status_code == 403, (method, path)
+    assert db.get(User, 1).email == "u0@example.com"
+    del client.app.dependency_overrides[get_current_user]
+    assert client.put("/users/1", json={"email": "x@example.com"}).status_code == 401
+
+def test_loaded_instance_is_detached_after_delete(db):
+    user = db.get(User, 3)
+    crud.delete_user(db, 3)
+    assert user.email == "u2@example.com"
+    assert db.get(User, 3) is None
+
+def test_idempotency_key_replays_response(client, db):
+    payload = {"email": "once@example.com", "password": "pw", "role_id": 1}
+    headers = {"Idempotency-Key": "k1"}
+    first = client.post("/users/", json=payload, headers=headers)
+    second = client.post("/users/", json=payload, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json() and second.headers["idempotent-replayed"] == "true"
+    assert db.query(User).filter(User.email == "once@example.com").count() == 1
+
+    assert client.post("/users/", json={**payload, "email": "other@example.com"}, headers=headers).status_code == 422
+    # Тот же ключ у другого пользователя — отдельная запись
+    other = client.post("/users/", json={**payload, "email": "b@example.com"},
+                        headers={**headers, "Authorization": "Bearer t2"})
+    assert other.status_code == 200 and "idempotent-replayed" not in other.headers
+
+def test_delete_retry_gets_original_response(client):
+    first = client.delete("/users/1", headers={"Idempotency-Key": "d1"})
+    assert client.delete("/users/1", headers={"Idempotency-Key": "d1"}).json() == first.json()
+    assert client.delete("/users/1").status_code == 404
+
+def test_in_flight_key_conflicts_and_5xx_is_not_stored():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/flaky")
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            return JSONResponse({"detail": "boom"}, status_code=503)
+        # Пока обработчик выполняется, повтор с тем же ключом получает 409
+        retry = client.post("/flaky", headers={"Idempotency-Key": "f"})
+        return {"retry": retry.status_code, "retry_after": retry.headers.get("retry-after")}
+
+    app.add_middleware(IdempotencyMiddleware)
+    client = TestClient(app)
+    assert client.post("/flaky", headers={"Idempotency-Key": "f"}).status_code == 503
+    assert client.post("/flaky", headers={"Idempotency-Key": "f"}).json() == {"retry": 409, "retry_after": "1"}
+    assert len(calls) == 2
+
+def test_large_and_streaming_responses_are_not_stored():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/big")
+    def big():
+        calls.append("big")
+        return {"data": "x" * 200}
+
+    @app.post("/stream")
+    def stream():
+        calls.append("stream")
+        return StreamingResponse(iter(["event: done\ndata: {}\n\n"]), media_type="text/event-stream")
+
+    store = TTLCache()
+    app.add_middleware(IdempotencyMiddleware, store=store, max_body=100)
+    client = TestClient(app)
+    for path in ("/big", "/big", "/stream", "/stream"):
+        r = client.post(path, headers={"Idempotency-Key": path})
+        assert r.status_code == 200 and "idempotent-replayed" not in r.headers
+    assert calls == ["big", "big", "stream", "stream"] and len(store) == 0